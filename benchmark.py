@@ -0,0 +1,254 @@
+"""
+端到端性能基准测试
+
+启动本地模拟ERP（mock_erp.py），用无头浏览器按主程序流程运行若干个周期，
+统计每个周期的耗时、每个波次的耗时和WebDriver命令往返次数。
+散单模式下订单数不超过 ORDER_THRESHOLDS['few'] 时走订单配货（不生成波次）。
+使用 --selectors 时另外在模拟ERP的各页面中测量每个元素各定位方式的耗时，
+--cycles 0 时只测量定位耗时。
+不需要访问网络，可在Linux服务器上运行（需安装Chrome和chromedriver）。
+
+用法:
+    python benchmark.py --cycles 5 --orders 30 --mode wave --output logs/benchmark.json
+    python benchmark.py --cycles 0 --selectors --output logs/selectors.json
+"""
+import os
+import json
+import time
+import argparse
+import statistics
+from collections import Counter
+from datetime import time as datetime_time
+
+from config import (URLS, SELECTORS, ORDER_PROBE, BROWSER_CONFIG, MOCK_ERP_CONFIG, TRACE_CONFIG,
+                    build_urls, time_config)
+from logger import logger, log_dir
+from latency_tracker import latency_tracker
+from wave_journal import wave_journal
+from tracing import tracer
+from mock_erp import MockErpServer
+
+# 测量定位耗时的页面：(URLS中的页面, SELECTORS中的分组)
+SELECTOR_PAGES = (
+    ('login', 'login'),
+    ('home', 'home'),
+    ('wave_picking', 'wave'),
+    ('order_picking', 'order')
+)
+
+class RoundTripCounter:
+    """统计WebDriver命令的往返次数"""
+    def __init__(self):
+        self.counts = Counter()
+
+    def install(self, driver):
+        """包装driver的命令执行器，每条命令计数一次"""
+        executor = driver.command_executor
+        if getattr(executor, 'round_trip_counter', None) is self:
+            return
+        execute = executor.execute
+
+        def counted(command, params=None):
+            self.counts[command] += 1
+            return execute(command, params)
+        executor.execute = counted
+        executor.round_trip_counter = self
+
+    def take(self):
+        """返回并清空计数"""
+        counts, self.counts = self.counts, Counter()
+        return counts
+
+def metrics_snapshot():
+    """返回追踪器中各步骤的累计次数和耗时"""
+    return {name: (metric['count'], metric['sum']) for name, metric in tracer.metrics.items()}
+
+def metrics_delta(before, after):
+    """两次快照之间各步骤的次数和耗时"""
+    delta = {}
+    for name, (count, total) in after.items():
+        old_count, old_total = before.get(name, (0, 0.0))
+        if count > old_count:
+            delta[name] = (count - old_count, total - old_total)
+    return delta
+
+def ensure_browser(session, counter):
+    """保证会话中有浏览器实例，并给新启动的浏览器安装往返计数"""
+    from web_automation import WebAutomation
+    from browser_profile import BrowserProfile
+
+    if session.automation is None or not session.automation.is_alive():
+        session.reset()
+        session.automation = WebAutomation(BrowserProfile(session.profile_name))
+    counter.install(session.automation.driver)
+
+def prepare(server, args):
+    """把程序配置指向模拟ERP，并与正式运行的数据隔离"""
+    URLS.update(build_urls(server.base_url))
+    if args.probe:
+        ORDER_PROBE['url'] = f"{server.base_url}/api/order_count"
+        ORDER_PROBE['method'] = 'GET'
+        ORDER_PROBE['count_field'] = 'data.count'
+    BROWSER_CONFIG['headless'] = not args.show
+
+    # 整波模式全天都是波次时间；散单模式波次时间为空
+    middle = datetime_time(23, 59, 59) if args.mode == 'wave' else datetime_time(0, 0)
+    time_config.update_times(datetime_time(0, 0), middle, datetime_time(23, 59, 59))
+
+    # 耗时记录和追踪写入单独的文件，不影响正式运行的自适应超时
+    latency_tracker.path = os.path.join(log_dir, 'benchmark_step_latency.json')
+    latency_tracker.samples.clear()
+    wave_journal.use(os.path.join(log_dir, 'benchmark_wave_journal.db'))
+    TRACE_CONFIG['enabled'] = True
+    tracer.configure('benchmark')
+
+def run_cycles(server, args):
+    """按主程序流程运行若干个周期，返回每个周期的统计"""
+    from main import main as run_task
+    from session_manager import SessionManager
+
+    counter = RoundTripCounter()
+    # 基准测试直接管理浏览器并统计往返次数，不启动备用浏览器
+    session = SessionManager(profile_name='benchmark', use_pool=False)
+    results = []
+    try:
+        for cycle in range(1, args.cycles + 1):
+            server.state.reset(args.orders)
+            ensure_browser(session, counter)
+            counter.take()
+            before = metrics_snapshot()
+
+            start = time.monotonic()
+            success = run_task(session, MOCK_ERP_CONFIG['username'], MOCK_ERP_CONFIG['password'])
+            elapsed = time.monotonic() - start
+
+            steps = metrics_delta(before, metrics_snapshot())
+            round_trips = counter.take()
+            waves = server.state.stats['waves_confirmed']
+            orders = server.state.stats['orders_confirmed']
+            picking_time = steps.get('execute_wave_picking', (0, elapsed))[1]
+            result = {
+                'cycle': cycle,
+                'success': success,
+                'seconds': round(elapsed, 3),
+                'waves': waves,
+                'orders': orders,
+                'seconds_per_wave': round(picking_time / waves, 3) if waves else None,
+                'round_trips': sum(round_trips.values()),
+                'commands': dict(round_trips.most_common()),
+                'steps': {name: {'count': count, 'seconds': round(total, 3)}
+                          for name, (count, total) in sorted(steps.items())}
+            }
+            results.append(result)
+            per_wave = f"{result['seconds_per_wave']:.2f}秒/波次" if waves else f"订单配货{orders}个订单"
+            logger.info(f"第{cycle}个周期: {'成功' if success else '失败'}，耗时{elapsed:.2f}秒，"
+                        f"完成{waves}个波次（{per_wave}），WebDriver往返{result['round_trips']}次")
+    finally:
+        session.close()
+    return results
+
+def run_selector_benchmark(server, args):
+    """在模拟ERP的各页面中测量元素各定位方式的耗时
+
+    返回:
+        dict: 页面 -> 定位耗时列表（见SelectorRegistry.benchmark）
+    """
+    from web_automation import WebAutomation
+    from browser_profile import BrowserProfile
+
+    server.state.reset(args.orders)
+    automation = WebAutomation(BrowserProfile('benchmark'))
+    report = {}
+    try:
+        for page, section in SELECTOR_PAGES:
+            if page != 'login' and not automation.logged_in:
+                if not automation.login(MOCK_ERP_CONFIG['username'], MOCK_ERP_CONFIG['password']):
+                    raise RuntimeError("登录模拟ERP失败")
+            automation.navigate_to(URLS[page])
+            logger.info(f"{page}页面的元素定位耗时（每种方式执行{args.repeat}次取平均）:")
+            keys = [f"{section}.{name}" for name in SELECTORS[section]]
+            report[page] = automation.benchmark_selectors(keys, args.repeat)
+    finally:
+        automation.close()
+    return report
+
+def summarize(results):
+    """汇总各周期的统计"""
+    seconds = [r['seconds'] for r in results]
+    per_wave = [r['seconds_per_wave'] for r in results if r['seconds_per_wave'] is not None]
+    round_trips = [r['round_trips'] for r in results]
+    commands = Counter()
+    for r in results:
+        commands.update(r['commands'])
+
+    def percentile(values, percent):
+        ordered = sorted(values)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * percent / 100))]
+
+    return {
+        'cycles': len(results),
+        'failures': sum(1 for r in results if not r['success']),
+        'cycle_seconds': {'mean': round(statistics.mean(seconds), 3),
+                          'median': round(statistics.median(seconds), 3),
+                          'p95': round(percentile(seconds, 95), 3)},
+        'seconds_per_wave': round(statistics.mean(per_wave), 3) if per_wave else None,
+        'round_trips_per_cycle': round(statistics.mean(round_trips), 1),
+        'commands_per_cycle': {name: round(count / len(results), 1)
+                               for name, count in commands.most_common(10)}
+    }
+
+def log_summary(summary, results):
+    """输出汇总结果"""
+    cycle = summary['cycle_seconds']
+    logger.info(f"共{summary['cycles']}个周期，失败{summary['failures']}个")
+    logger.info(f"周期耗时: 平均{cycle['mean']:.2f}秒，中位数{cycle['median']:.2f}秒，P95 {cycle['p95']:.2f}秒")
+    if summary['seconds_per_wave'] is not None:
+        logger.info(f"每个波次平均耗时: {summary['seconds_per_wave']:.2f}秒")
+    logger.info(f"每个周期平均WebDriver往返: {summary['round_trips_per_cycle']}次")
+    for name, count in summary['commands_per_cycle'].items():
+        logger.info(f"  {name:<28} {count:>8}")
+
+    # 各步骤平均耗时（取最后一个周期，排除首次启动的影响）
+    steps = results[-1]['steps']
+    for name, step in sorted(steps.items(), key=lambda item: -item[1]['seconds'])[:15]:
+        logger.info(f"  {name:<36} {step['count']:>4}次 {step['seconds']:>8.2f}秒")
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='端到端性能基准测试（使用本地模拟ERP）')
+    parser.add_argument('--cycles', type=int, default=3, help='运行周期数')
+    parser.add_argument('--orders', type=int, default=MOCK_ERP_CONFIG['orders'], help='每个周期的待打单数量')
+    parser.add_argument('--mode', choices=['wave', 'scattered'], default='wave',
+                        help='wave: 波次时间（整波）；scattered: 截单后（散单）')
+    parser.add_argument('--probe', action='store_true', help='通过数据接口查询待打单数量')
+    parser.add_argument('--show', action='store_true', help='显示浏览器窗口（默认无头模式）')
+    parser.add_argument('--page-latency', type=float, default=MOCK_ERP_CONFIG['page_latency'])
+    parser.add_argument('--api-latency', type=float, default=MOCK_ERP_CONFIG['api_latency'])
+    parser.add_argument('--task-latency', type=float, default=MOCK_ERP_CONFIG['task_latency'])
+    parser.add_argument('--failure-rate', type=float, default=MOCK_ERP_CONFIG['failure_rate'])
+    parser.add_argument('--selectors', action='store_true', help='测量各页面中元素各定位方式的耗时')
+    parser.add_argument('--repeat', type=int, default=20, help='每种定位方式的执行次数')
+    parser.add_argument('--output', help='结果JSON文件路径')
+    return parser.parse_args()
+
+if __name__ == '__main__':
+    args = parse_args()
+    server = MockErpServer(port=0, orders=args.orders, page_latency=args.page_latency,
+                           api_latency=args.api_latency, task_latency=args.task_latency,
+                           failure_rate=args.failure_rate).start()
+    report = {}
+    try:
+        prepare(server, args)
+        if args.cycles > 0:
+            results = run_cycles(server, args)
+            report['summary'] = summarize(results)
+            report['cycles'] = results
+            log_summary(report['summary'], results)
+        if args.selectors:
+            report['selectors'] = run_selector_benchmark(server, args)
+    finally:
+        server.stop()
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        logger.info(f"结果已保存到 {args.output}")
@@ -0,0 +1,56 @@
+"""
+浏览器启动参数模块
+"""
+from selenium.webdriver.chrome.options import Options
+
+from config import BROWSER_CONFIG, BLOCKED_URL_PATTERNS
+from logger import logger
+
+def build_chrome_options(profile=None):
+    """根据配置生成浏览器启动参数"""
+    chrome_options = Options()
+    if BROWSER_CONFIG['headless']:
+        width, height = BROWSER_CONFIG['window_size']
+        chrome_options.add_argument('--headless=new')
+        chrome_options.add_argument(f'--window-size={width},{height}')
+        # 降低后台占用
+        chrome_options.add_argument('--mute-audio')
+        chrome_options.add_argument('--disable-extensions')
+        chrome_options.add_argument('--disable-background-networking')
+        chrome_options.add_argument('--disable-renderer-backgrounding')
+        chrome_options.add_argument('--disable-notifications')
+        if BROWSER_CONFIG['block_resources'] and 'image' in BROWSER_CONFIG['blocked_resources']:
+            chrome_options.add_experimental_option('prefs', {
+                'profile.managed_default_content_settings.images': 2
+            })
+    else:
+        chrome_options.add_argument('--start-maximized')
+    chrome_options.add_argument('--disable-gpu')
+    chrome_options.add_argument('--no-sandbox')
+    chrome_options.add_argument('--disable-dev-shm-usage')
+
+    # 使用持久化配置文件，保留Cookie和静态资源缓存
+    if profile:
+        profile.apply(chrome_options)
+    return chrome_options
+
+def get_blocked_url_patterns():
+    """返回需要拦截的URL规则"""
+    patterns = []
+    for resource in BROWSER_CONFIG['blocked_resources']:
+        patterns.extend(BLOCKED_URL_PATTERNS.get(resource, []))
+    return patterns
+
+def apply_resource_blocking(driver):
+    """无头模式下通过CDP拦截图片、字体、媒体和广告请求"""
+    if not (BROWSER_CONFIG['headless'] and BROWSER_CONFIG['block_resources']):
+        return
+    patterns = get_blocked_url_patterns()
+    if not patterns:
+        return
+    try:
+        driver.execute_cdp_cmd('Network.enable', {})
+        driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': patterns})
+        logger.info(f"已启用资源拦截: {', '.join(BROWSER_CONFIG['blocked_resources'])}")
+    except Exception as e:
+        logger.warning(f"启用资源拦截失败: {str(e)}")
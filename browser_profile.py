@@ -0,0 +1,133 @@
+"""
+浏览器配置文件管理模块
+"""
+import os
+import json
+import time
+import shutil
+
+from config import PROFILE_CONFIG
+from logger import logger, application_path
+
+# 可以安全删除的缓存目录（删除后浏览器会自动重建）
+CACHE_DIRS = [
+    os.path.join('Default', 'Cache'),
+    os.path.join('Default', 'Code Cache'),
+    os.path.join('Default', 'GPUCache'),
+    os.path.join('Default', 'Service Worker', 'CacheStorage'),
+    'GrShaderCache',
+    'ShaderCache',
+]
+
+# Network.setCookies 接受的Cookie字段
+COOKIE_FIELDS = ('name', 'value', 'domain', 'path', 'secure', 'httpOnly', 'sameSite')
+
+class BrowserProfile:
+    """持久化的浏览器配置文件，保存Cookie和静态资源缓存
+
+    同一个配置文件目录不能同时被两个浏览器使用，同一账号的多个浏览器（如备用浏览器）
+    使用不同的槽位目录，共用同一份保存的Cookie。
+    """
+    def __init__(self, name='default', slot=0):
+        self.name = name
+        self.slot = slot
+        dir_name = name if slot == 0 else f"{name}_{slot}"
+        self.root_dir = os.path.join(application_path, PROFILE_CONFIG['dir_name'])
+        self.profile_dir = os.path.join(self.root_dir, dir_name)
+        self.cookie_file = os.path.join(self.root_dir, f"{name}_cookies.json")
+        self.cleanup_marker = os.path.join(self.root_dir, f"{dir_name}_cleanup")
+        if not os.path.exists(self.profile_dir):
+            os.makedirs(self.profile_dir)
+
+    def apply(self, chrome_options):
+        """将配置文件目录和缓存设置应用到浏览器启动参数"""
+        self.maybe_cleanup()
+        cache_size = PROFILE_CONFIG['cache_size_mb'] * 1024 * 1024
+        chrome_options.add_argument(f'--user-data-dir={self.profile_dir}')
+        chrome_options.add_argument(f'--disk-cache-size={cache_size}')
+
+    def save_cookies(self, driver):
+        """保存浏览器中的全部Cookie（包括会话Cookie）"""
+        try:
+            cookies = driver.execute_cdp_cmd('Network.getAllCookies', {}).get('cookies', [])
+            with open(self.cookie_file, 'w', encoding='utf-8') as f:
+                json.dump({'saved_at': time.time(), 'cookies': cookies}, f, ensure_ascii=False)
+            logger.info(f"已保存登录Cookie，共{len(cookies)}条")
+        except Exception as e:
+            logger.warning(f"保存Cookie失败: {str(e)}")
+
+    def restore_cookies(self, driver):
+        """恢复保存的Cookie
+
+        返回:
+            bool: 成功恢复未过期的Cookie返回True，否则返回False
+        """
+        if not os.path.exists(self.cookie_file):
+            return False
+        try:
+            with open(self.cookie_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+
+            age = time.time() - data.get('saved_at', 0)
+            if age > PROFILE_CONFIG['cookie_max_age_hours'] * 3600:
+                logger.info("保存的Cookie已过期，需要重新登录")
+                return False
+
+            cookies = []
+            for cookie in data.get('cookies', []):
+                param = {key: cookie[key] for key in COOKIE_FIELDS if key in cookie}
+                # 会话Cookie的expires为-1，不传递过期时间
+                if cookie.get('expires', -1) > 0:
+                    param['expires'] = cookie['expires']
+                cookies.append(param)
+            if not cookies:
+                return False
+
+            driver.execute_cdp_cmd('Network.setCookies', {'cookies': cookies})
+            logger.info(f"已恢复登录Cookie，共{len(cookies)}条")
+            return True
+        except Exception as e:
+            logger.warning(f"恢复Cookie失败: {str(e)}")
+            return False
+
+    def clear_cookies(self):
+        """删除保存的Cookie"""
+        if os.path.exists(self.cookie_file):
+            os.remove(self.cookie_file)
+
+    def get_size(self):
+        """计算配置文件目录大小（字节）"""
+        total = 0
+        for root, _, files in os.walk(self.profile_dir):
+            for filename in files:
+                try:
+                    total += os.path.getsize(os.path.join(root, filename))
+                except OSError:
+                    pass
+        return total
+
+    def maybe_cleanup(self):
+        """按间隔检查配置文件大小，超过上限时清理缓存
+
+        必须在浏览器启动前调用，运行中的浏览器会锁定缓存文件。
+        """
+        if os.path.exists(self.cleanup_marker):
+            if time.time() - os.path.getmtime(self.cleanup_marker) < PROFILE_CONFIG['cleanup_interval']:
+                return
+        self.cleanup()
+        with open(self.cleanup_marker, 'w', encoding='utf-8') as f:
+            f.write(str(time.time()))
+
+    def cleanup(self):
+        """配置文件超过大小上限时删除缓存目录"""
+        size_mb = self.get_size() / 1024 / 1024
+        if size_mb <= PROFILE_CONFIG['max_size_mb']:
+            logger.info(f"浏览器配置文件大小: {size_mb:.1f}MB")
+            return
+
+        logger.info(f"浏览器配置文件大小{size_mb:.1f}MB超过上限，开始清理缓存")
+        for cache_dir in CACHE_DIRS:
+            path = os.path.join(self.profile_dir, cache_dir)
+            if os.path.exists(path):
+                shutil.rmtree(path, ignore_errors=True)
+        logger.info(f"清理完成，当前大小: {self.get_size() / 1024 / 1024:.1f}MB")
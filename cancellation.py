@@ -0,0 +1,99 @@
+"""
+任务取消模块
+
+停止程序时设置取消标记，自动化步骤在每个步骤开始时和等待的每次轮询中检查，
+不必等当前任务结束即可在一秒内退出。
+ERP后台任务开始后不能中途停止，每个任务放在保护区内执行，保护区内不响应取消，
+离开保护区时再退出。波次每完成一步都写入处理日志，步骤之间停止后下次从下一步继续，
+所以保护区只包含一步任务，停止最多等待一个后台任务完成。
+"""
+import time
+import threading
+from contextlib import contextmanager
+
+from logger import logger
+
+class CancelledError(BaseException):
+    """任务已被取消
+
+    继承BaseException，不会被各步骤中的 except Exception 当作普通错误记录或发送通知邮件。
+    """
+    pass
+
+class CancellationToken:
+    """协作式取消标记"""
+    def __init__(self):
+        self.event = threading.Event()
+        self.local = threading.local()  # 各线程的保护区嵌套深度
+        self.lock = threading.Lock()
+        self.active = 0                 # 正在保护区内的线程数
+
+    def bind(self, event):
+        """使用外部的停止事件（如多进程共享的事件）"""
+        self.event = event
+
+    def reset(self):
+        """开始新的运行前清除取消标记"""
+        self.event = threading.Event()
+
+    def cancel(self):
+        """请求取消"""
+        self.event.set()
+
+    def is_cancelled(self):
+        return self.event.is_set()
+
+    def shielded(self):
+        """当前线程是否在保护区内"""
+        return getattr(self.local, 'depth', 0) > 0
+
+    def busy(self):
+        """是否有线程正在保护区内（关闭窗口时据此等待当前任务完成）"""
+        with self.lock:
+            return self.active > 0
+
+    def check(self):
+        """已请求取消且不在保护区内时抛出CancelledError"""
+        if self.event.is_set() and not self.shielded():
+            raise CancelledError("任务已取消")
+
+    def wait(self, timeout):
+        """可被取消打断的等待，返回是否已请求取消
+
+        保护区内等待完整的时间，不被打断。
+        """
+        if self.shielded():
+            time.sleep(timeout)
+            return False
+        return self.event.wait(timeout)
+
+    def sleep(self, timeout):
+        """等待timeout秒，期间请求取消时抛出CancelledError"""
+        self.wait(timeout)
+        self.check()
+
+    @contextmanager
+    def shield(self, name):
+        """保护区：区内的操作完整执行，离开保护区时再响应取消
+
+        参数:
+            name: 操作名称（用于日志）
+        """
+        depth = getattr(self.local, 'depth', 0)
+        self.local.depth = depth + 1
+        if depth == 0:
+            with self.lock:
+                self.active += 1
+        try:
+            yield
+        finally:
+            self.local.depth = depth
+            if depth == 0:
+                with self.lock:
+                    self.active -= 1
+        if depth == 0 and self.event.is_set():
+            logger.info(f"{name}已完成，停止执行")
+            raise CancelledError("任务已取消")
+
+# 创建全局取消标记
+cancel_token = CancellationToken()
@@ -1,6 +1,7 @@
 """
 配置文件
 """
+import os
 from datetime import time
 
 class TimeConfig:
@@ -18,31 +19,279 @@ class TimeConfig:
 # 创建全局配置实例
 time_config = TimeConfig()
 
+# ERP地址，可通过环境变量指向本地模拟ERP（mock_erp.py）
+ERP_BASE_URL = os.getenv('ERP_BASE_URL', 'https://erp.hupun.com').rstrip('/')
+
+def build_urls(base_url):
+    """根据ERP地址生成各页面的URL"""
+    return {
+        'login': f'{base_url}/login',
+        'home': f'{base_url}/frame/home',
+        'order_picking': f'{base_url}/frame/332',
+        'wave_picking': f'{base_url}/frame/3321'
+    }
+
 # URL配置
-URLS = {
-    'login': 'https://erp.hupun.com/login',
-    'home': 'https://erp.hupun.com/frame/home',
-    'order_picking': 'https://erp.hupun.com/frame/332',
-    'wave_picking': 'https://erp.hupun.com/frame/3321'
+URLS = build_urls(ERP_BASE_URL)
+
+# ERP主框架设置：各页面在主框架标签页中的iframe位置和标签页标题
+# 目标页面已在主框架的标签页中打开时点击标签页切换，不重新加载页面
+FRAME_CONFIG = {
+    'default_iframe': '//*[@id="tabsetMain"]/contents/content/c-iframe/iframe',
+    'tab_xpath': '//*[@id="tabsetMain"]/tabs/tab[normalize-space(.)="{title}"]',  # {title}为标签页标题
+    'pages': {
+        'home': {
+            'iframe': '//*[@id="tabsetMain"]/contents/content/c-iframe/iframe',
+            'tab': '首页'
+        },
+        'order_picking': {
+            'iframe': '//*[@id="tabsetMain"]/contents/content[2]/c-iframe/iframe',
+            'tab': '订单配货'
+        },
+        'wave_picking': {
+            'iframe': '//*[@id="tabsetMain"]/contents/content[2]/c-iframe/iframe',
+            'tab': '波次配货'
+        }
+    }
 }
 
-# 等待时间配置（秒）
+# 等待时间配置（秒），作为各步骤完成条件的最长等待时间
 WAIT_TIME = {
     'short': 1,
     'medium': 5,
     'long': 10,
     'generate_express': 15,
     'page_load': 3,    # 页面加载等待时间
-    'iframe_load': 3    # iframe加载等待时间
+    'iframe_load': 3,    # iframe加载等待时间
+    'task_timeout': 60,    # 后台任务（生成波次、生成快递单）最长等待时间
+    'poll': 0.2    # 完成条件轮询间隔
+}
+
+# 自适应超时配置
+ADAPTIVE_TIMEOUT = {
+    'enabled': True,
+    'window': 50,          # 每个步骤保留最近的耗时样本数
+    'percentile': 95,      # 取耗时的百分位
+    'margin': 1.5,         # 安全系数
+    'min_samples': 5,      # 样本不足时使用默认超时
+    'save_interval': 10    # 每记录多少个样本保存一次
+}
+
+# 各步骤超时的下限和上限（秒），未列出的步骤以调用处的超时为上限
+# 批量处理波次的步骤（如generate_express_bulk）使用去掉_bulk后的步骤的上下限，上限按波次数放大
+STEP_TIMEOUT_BOUNDS = {
+    'page_load': (WAIT_TIME['page_load'], WAIT_TIME['long'] * 3),
+    'iframe_load': (WAIT_TIME['iframe_load'], WAIT_TIME['long']),
+    'generate_express': (WAIT_TIME['generate_express'], WAIT_TIME['task_timeout']),
+    'create_wave': (WAIT_TIME['long'], WAIT_TIME['task_timeout']),
+    'order_get_express': (WAIT_TIME['generate_express'], WAIT_TIME['task_timeout'])
+}
+
+# 步骤重试设置
+RETRY_CONFIG = {
+    'cycle_budget': 6,    # 每个周期所有步骤合计的最多重试次数，ERP整体变慢时不会反复重试
+    'backoff': 1,         # 第一次重试前的等待时间（秒），之后按指数增长
+    'max_backoff': 8,     # 重试前的最长等待时间（秒）
+    'jitter': 0.3         # 等待时间的随机抖动比例
+}
+
+# 各步骤的重试策略，未列出的步骤失败时不重试
+# attempts: 最多尝试次数；recover: 重试前重新切换iframe('reswitch')或重新加载页面('renavigate')；
+# idempotent: 操作能否重复执行，为False时操作已执行只重新等待完成条件，不再重复点击
+RETRY_POLICIES = {
+    'page_load': {'attempts': 2},
+    'iframe_load': {'attempts': 2},
+    'iframe_ready': {'attempts': 2},
+    'refresh_order_count': {'attempts': 3, 'recover': 'reswitch'},
+    'query_waves': {'attempts': 3, 'recover': 'reswitch'},
+    'open_create_wave': {'attempts': 2, 'recover': 'renavigate'},
+    'login_switch': {'attempts': 2, 'idempotent': False},
+    'create_wave': {'attempts': 2, 'idempotent': False},
+    'select_wave': {'attempts': 2, 'idempotent': False},
+    'generate_express': {'attempts': 2, 'idempotent': False},
+    'print_picking': {'attempts': 2, 'idempotent': False},
+    'print_express': {'attempts': 2, 'idempotent': False},
+    'confirm_picking': {'attempts': 2, 'idempotent': False},
+    'generate_express_bulk': {'attempts': 2, 'idempotent': False},
+    'print_picking_bulk': {'attempts': 2, 'idempotent': False},
+    'print_express_bulk': {'attempts': 2, 'idempotent': False},
+    'confirm_picking_bulk': {'attempts': 2, 'idempotent': False},
+    'query_orders': {'attempts': 3, 'recover': 'reswitch'},
+    'order_get_express': {'attempts': 2, 'idempotent': False},
+    'order_print_picking': {'attempts': 2, 'idempotent': False},
+    'order_confirm_picking': {'attempts': 2, 'idempotent': False}
+}
+
+# 浏览器启动设置
+BROWSER_CONFIG = {
+    'headless': os.getenv('BROWSER_HEADLESS', '0') == '1',  # 无头模式（不显示浏览器窗口）
+    'window_size': (1920, 1080),    # 无头模式固定窗口大小，保证绝对XPath能正确定位
+    'block_resources': True,        # 无头模式下拦截下列资源，降低页面加载时间和内存占用
+    'blocked_resources': ['image', 'font', 'media', 'ads'],
+    'driver_path': os.getenv('CHROMEDRIVER_PATH', './chromedriver.exe')  # 不存在时由Selenium自动查找
+}
+
+# 各类资源的拦截URL规则
+BLOCKED_URL_PATTERNS = {
+    'image': ['*.png', '*.jpg', '*.jpeg', '*.gif', '*.webp', '*.bmp', '*.ico'],
+    'font': ['*.woff', '*.woff2', '*.ttf', '*.otf', '*.eot'],
+    'media': ['*.mp4', '*.webm', '*.mp3', '*.ogg', '*.wav', '*.flv'],
+    'ads': ['*doubleclick.net*', '*googlesyndication.com*', '*google-analytics.com*',
+            '*googletagmanager.com*', '*hm.baidu.com*', '*cnzz.com*', '*growingio.com*',
+            '*sensorsdata.cn*']
+}
+
+# 浏览器配置文件设置
+PROFILE_CONFIG = {
+    'dir_name': 'chrome_profile',    # 配置文件目录名（与logs目录同级）
+    'max_size_mb': 500,              # 配置文件目录大小上限（MB）
+    'cache_size_mb': 200,            # 浏览器磁盘缓存大小（MB）
+    'cookie_max_age_hours': 12,      # 保存的Cookie有效期（小时）
+    'cleanup_interval': 6 * 60 * 60  # 清理检查间隔（秒）
+}
+
+# 浏览器驱动池设置：始终保持一个已启动的备用浏览器，当前浏览器崩溃时立即换上
+DRIVER_POOL_CONFIG = {
+    'enabled': True,          # 是否保持备用浏览器（会多占用一个浏览器进程的内存）
+    'slots': 2,               # 每个账号的浏览器配置文件槽位数（当前浏览器和备用浏览器各占一个）
+    'health_interval': 60,    # 备用浏览器健康检查间隔（秒）
+    'spare_timeout': 60       # 备用浏览器正在启动时最长等待时间（秒）
+}
+
+# 待打单数量接口查询设置（复用浏览器登录Cookie直接请求ERP数据接口，失败时回退到页面查询）
+ORDER_PROBE = {
+    'url': os.getenv('ORDER_COUNT_API', ''),   # 待打单数量数据接口地址，为空时只使用页面查询
+    'method': os.getenv('ORDER_COUNT_API_METHOD', 'GET'),
+    'params': {},                               # 请求参数（GET为查询参数，POST为JSON请求体）
+    'count_field': os.getenv('ORDER_COUNT_API_FIELD', 'data.count'),  # 返回JSON中数量字段的路径
+    'timeout': 3                                # 请求超时时间（秒）
 }
 
 # 订单数量阈值
 ORDER_THRESHOLDS = {
     'single': 1,
-    'few': 5,
+    'few': 5,     # 截单后订单数不超过该数量时直接在订单配货页面取号打单，不生成波次（0表示不使用）
     'wave': 25
 }
 
+# 调度设置
+SCHEDULE_CONFIG = {
+    'poll_interval': 60,      # 工作时间内查询待打单数量的间隔（秒）
+    'backoff_base': 30,       # 任务失败后的首次等待时间（秒），之后按指数增长
+    'backoff_max': 10 * 60,   # 任务失败后的最长等待时间（秒）
+    'jitter': 0.2,            # 等待时间的随机抖动比例
+    'crash_retry_delay': 5    # 浏览器崩溃后换上备用浏览器，等待该时间后立即重试（秒）
+}
+
+# 多账号运行设置
+MULTI_ACCOUNT_CONFIG = {
+    'accounts_file': 'accounts.json',  # 账号列表文件（程序目录下）
+    'max_concurrency': 2               # 同时执行任务的账号数上限
+}
+
+# 步骤追踪设置（输出到logs目录）
+TRACE_CONFIG = {
+    'enabled': True,
+    'jsonl_file': 'trace.jsonl',         # 每个步骤一行JSON记录
+    'max_bytes': 10 * 1024 * 1024,       # 单个追踪文件大小上限，超过后轮转
+    'backup_count': 5,                   # 保留的轮转文件数
+    'prom_file': 'autoprint.prom',       # Prometheus textfile collector 指标文件
+    'prom_interval': 10,                 # 指标文件刷新间隔（秒）
+    'queue_size': 10000,                 # 等待后台写入的追踪记录数上限
+    'buckets': [0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300]  # 耗时直方图分桶（秒）
+}
+
+# 邮件通知队列设置
+MAIL_QUEUE_CONFIG = {
+    'max_size': 50,          # 待发送邮件数上限，队列满时丢弃最早的邮件
+    'timeout': 15,           # SMTP连接和发送的超时时间（秒）
+    'idle_timeout': 60,      # SMTP连接空闲超过该时间后关闭，下次发送时重新连接（秒）
+    'flush_timeout': 10      # 程序退出时等待队列发送完成的最长时间（秒）
+}
+
+# 错误通知合并设置：同一错误在时间窗口内只立即发送第一封，其余合并为摘要邮件
+ERROR_DIGEST_CONFIG = {
+    'enabled': True,
+    'window': 30 * 60,       # 合并时间窗口（秒），窗口结束时发送摘要
+    'check_interval': 30,    # 检查是否需要发送摘要的间隔（秒）
+    'max_entries': 200       # 最多跟踪的不同错误数
+}
+
+# 停止程序设置
+CANCEL_CONFIG = {
+    'check_interval': 0.5,    # 浏览器内等待元素时每段的最长时间（秒），每段之间检查是否已停止
+    'close_timeout': 10       # 关闭窗口时等待任务停止并关闭浏览器的最长时间（秒），正在执行的ERP后台任务会等到完成
+}
+
+# 启动设置
+STARTUP_CONFIG = {
+    'prewarm_browser': True,   # 界面显示后在后台预先启动浏览器
+    'prewarm_timeout': 60      # 点击启动后等待预启动完成的最长时间（秒）
+}
+
+# 日志输出设置：日志先放入有界队列，由后台线程写入文件和界面，不阻塞自动化步骤
+LOG_CONFIG = {
+    'file_queue_size': 20000,     # 文件日志队列上限，队列满时丢弃最早的日志
+    'ui_queue_size': 2000,        # 界面日志队列上限
+    'console_queue_size': 5000,   # 控制台日志队列上限（开发环境）
+    'file_buffer_size': 64 * 1024,  # 文件写入缓冲区大小（字节）
+    'flush_interval': 1.0,        # 文件缓冲区定时刷新间隔（秒）
+    'retention_days': 30          # 日志文件保留天数
+}
+
+# 界面日志显示设置
+UI_LOG_CONFIG = {
+    'max_lines': 5000,       # 界面最多保留的日志行数
+    'flush_interval': 100    # 日志批量刷新到界面的间隔（毫秒）
+}
+
+# 模拟ERP设置（mock_erp.py，用于本地测试和性能基准）
+MOCK_ERP_CONFIG = {
+    'host': '127.0.0.1',
+    'port': 8765,
+    'username': 'test',
+    'password': 'test123',
+    'login_mode': 'qrcode',     # 登录页初始登录方式：'qrcode'（扫码）或 'password'（账号密码）
+    'page_latency': 0.1,        # 页面请求的延迟（秒）
+    'api_latency': 0.2,         # 数据接口请求的延迟（秒）
+    'task_latency': 1.0,        # 后台任务（生成波次、生成快递单等）每个波次的耗时（秒）
+    'order_task_latency': 0.1,  # 订单配货页面后台任务（取号打单等）每个订单的耗时（秒）
+    'jitter': 0.2,              # 延迟的随机抖动比例
+    'failure_rate': 0.0,        # 后台任务随机失败的概率
+    'ad_rate': 0.5,             # 首页出现广告弹窗的概率
+    'session_ttl': 0,           # 登录会话有效期（秒），0表示不过期
+    'orders': 30,               # 初始待打单数量
+    'orders_per_wave': 10       # 生成波次时每个波次包含的订单数
+}
+
+# 波次批量处理设置
+WAVE_CONFIG = {
+    'bulk': True,       # 多选波次，一次性生成快递单、打印和确认配货
+    'batch_size': 0     # 每批勾选的波次数，0表示全部
+}
+
+# ERP任务面板设置：生成波次、生成快递单、打印等后台任务的进度显示在任务面板中
+# 状态元素按失败、完成、执行中的顺序匹配状态文字；找不到状态元素时使用整个面板的文字，
+# 先匹配执行中（面板中可能还留有之前任务的结果）。完成和失败只在看到执行中之后才采用。
+# 选择器按模拟ERP的任务面板填写，正式ERP的面板结构不同时需要相应修改
+TASK_PANEL = {
+    'panel': '#panelTask',          # 任务面板（CSS选择器）
+    'title': '.task-title',         # 任务名称
+    'status': '.task-status',       # 任务状态
+    'message': '.task-message',     # 任务结果或错误信息
+    'running': ['执行中', '处理中', '进行中'],
+    'done': ['已完成', '成功'],
+    'failed': ['失败', '错误', '异常']
+}
+
+# 波次处理日志设置：记录每个波次已完成的步骤，失败后重新运行时从中断处继续
+WAVE_JOURNAL_CONFIG = {
+    'enabled': True,
+    'file': 'wave_journal.db',   # 数据库文件（保存在logs目录）
+    'busy_timeout': 5,           # 数据库被其他进程占用时的最长等待时间（秒）
+    'retention_days': 7          # 记录保留天数
+}
+
 # XPath选择器
 SELECTORS = {
     'login': {
@@ -68,6 +317,8 @@ SELECTORS = {
         'create_wave_2': '/html/body/div[3]/div/div[3]/div/div[2]/button[1]',  # 生成波次按钮
         'close_window': '//*[@id="panelTask"]/div[1]/div[2]',  # 关闭弹窗
         'first_row': '//*[@id="app"]/div/div[2]/div/div[1]/div/div[1]/div[2]/div[2]/div/div[2]/table/tbody/tr/td[2]/div/span/span[2]',  # 勾选第一行
+        'wave_rows': '//*[@id="app"]/div/div[2]/div/div[1]/div/div[1]/div[2]/div[2]/div/div[2]/table/tbody/tr',  # 波次列表行
+        'row_checkbox': './td[2]/div/span/span[2]',  # 行内勾选框（相对于波次列表行）
         'generate_express': '//*[@id="add-guide-step3-box"]/div[3]/div/div/button[1]',  # 生成快递单
         'print_picking': '//*[@id="add-guide-step3-box"]/div[7]/div/div/button[1]',  # 打配货单
         'print_express': '//*[@id="add-guide-step3-box"]/div[5]/div/div/button[1]',  # 打快递单
@@ -75,10 +326,33 @@ SELECTORS = {
     },
     'order': {
         'query_button': '//*[@id="app"]/div/div[1]/div[1]/div[1]/div/button[1]',  # 查询按钮
-        'order_count': '//*[@id="app"]/div/div[1]/div[2]/div[2]/div[3]/div[4]/div[3]/div[2]/span',  # 波次数量
+        'order_count': '//*[@id="app"]/div/div[1]/div[2]/div[2]/div[3]/div[4]/div[3]/div[2]/span',  # 订单数量
         'checkbox_all': '//*[@id="app"]/div/div[2]/div/div/div/div[1]/div[2]/div[2]/div/div[1]/table/thead/tr/th[2]/div[1]/span/span/span',  # 全选框
         'get_express': '//*[@id="add-guide-step3-box"]/div[6]/button',  # 取号打单按钮
         'print_picking': '//*[@id="add-guide-step3-box"]/div[9]/div/div/button[1]',  # 打配货单按钮
         'confirm_picking': '//*[@id="add-guide-step3-box"]/div[1]/button',  # 确认配货按钮
     }
 }
+
+# 元素定位策略：按顺序尝试，SELECTORS中的绝对XPath作为最后的备选
+# ('css', 选择器) 为以ID或数据属性为锚点的CSS选择器，('text', 标签, 文本, 容器) 在以ID为锚点的容器内按元素文字精确匹配，
+# 不会匹配到挂在body下的弹窗中同名的按钮；每个定位方式只取可见的元素，都不可见时才尝试下一个。
+# 不使用按位置（nth-of-type）翻译的选择器，页面层级变化时它们和绝对XPath一起失效
+TOOLBAR_XPATH = '//*[@id="add-guide-step3-box"]'  # 波次和订单配货页面的操作按钮区域
+SELECTOR_STRATEGIES = {
+    'login.password': [('css', '#input-password')],
+    'login.submit': [('text', 'button', '登录', '//*[@id="app"]')],
+    'wave.query_button': [('text', 'button', '查询', '//*[@id="app"]')],
+    'wave.create_wave': [('text', 'button', '生成波次', TOOLBAR_XPATH)],
+    'wave.first_checkbox': [('css', 'tr[rowid="503871746583168614"] td[colid="col_76"]')],
+    'wave.first_checkbox_2': [('css', 'tr[rowid="778233247578105467"] td[colid="col_76"]')],
+    'wave.second_checkbox': [('css', 'tr[rowid="863005655571211718"] td[colid="col_76"]')],
+    'wave.generate_express': [('text', 'button', '生成快递单', TOOLBAR_XPATH)],
+    'wave.print_picking': [('text', 'button', '打配货单', TOOLBAR_XPATH)],
+    'wave.print_express': [('text', 'button', '打快递单', TOOLBAR_XPATH)],
+    'wave.confirm_picking': [('text', 'button', '确认配货', TOOLBAR_XPATH)],
+    'order.query_button': [('text', 'button', '查询', '//*[@id="app"]')],
+    'order.get_express': [('text', 'button', '取号打单', TOOLBAR_XPATH)],
+    'order.print_picking': [('text', 'button', '打配货单', TOOLBAR_XPATH)],
+    'order.confirm_picking': [('text', 'button', '确认配货', TOOLBAR_XPATH)]
+}
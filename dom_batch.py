@@ -0,0 +1,197 @@
+"""
+批量DOM操作模块
+
+一次execute_script调用内完成一组元素的定位、可见/可用检查和有序操作，
+减少WebDriver往返次数。元素未就绪时浏览器内的等待分段进行，每段之间检查是否已停止程序。
+"""
+import time
+from selenium.common.exceptions import TimeoutException, ElementNotInteractableException
+
+from config import WAIT_TIME, CANCEL_CONFIG
+from logger import logger
+from cancellation import cancel_token
+
+# 浏览器内每段等待的最长时间（保护区内不检查停止，使用较长的分段）
+MAX_SLICE = WAIT_TIME['medium']
+# 异步脚本超时，在创建浏览器时设置一次（最长分段加余量）
+SCRIPT_TIMEOUT = MAX_SLICE + WAIT_TIME['medium']
+
+# 在浏览器内轮询，直到所有元素可见且可用，再按顺序执行操作
+BATCH_SCRIPT = """
+var items = arguments[0], timeout = arguments[1], poll = arguments[2];
+var done = arguments[arguments.length - 1];
+var deadline = Date.now() + timeout;
+
+function matches(l) {
+    var out = [];
+    try {
+        if (l.type === 'css') return Array.prototype.slice.call(document.querySelectorAll(l.value));
+        var snapshot = document.evaluate(l.value, document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+        for (var i = 0; i < snapshot.snapshotLength; i++) out.push(snapshot.snapshotItem(i));
+    } catch (e) {}
+    return out;
+}
+// 按顺序取第一个可见的元素；定位方式只匹配到隐藏元素时尝试下一个，都不可见时返回第一个匹配到的元素
+function find(locators) {
+    var hidden = {el: null, strategy: -1};
+    for (var i = 0; i < locators.length; i++) {
+        var els = matches(locators[i]);
+        for (var j = 0; j < els.length; j++) {
+            if (visible(els[j])) return {el: els[j], strategy: i};
+        }
+        if (els.length && !hidden.el) hidden = {el: els[0], strategy: i};
+    }
+    return hidden;
+}
+function visible(el) {
+    if (!el.getClientRects().length) return false;
+    var style = window.getComputedStyle(el);
+    return style.visibility !== 'hidden' && style.display !== 'none';
+}
+function enabled(el) {
+    if (el.disabled) return false;
+    if (el.getAttribute('aria-disabled') === 'true') return false;
+    return !(el.classList && el.classList.contains('is-disabled'));
+}
+function inspect() {
+    var results = [], ready = true;
+    for (var i = 0; i < items.length; i++) {
+        var hit = find(items[i].locators), el = hit.el;
+        var r = {name: items[i].name, found: !!el, strategy: hit.strategy, visible: false,
+                 enabled: false, done: false, text: null, error: null};
+        if (el) {
+            r.visible = visible(el);
+            r.enabled = enabled(el);
+            r.text = (el.innerText || el.value || '').trim();
+        }
+        if (items[i].required && !(r.visible && r.enabled)) ready = false;
+        results.push([el, r]);
+    }
+    return {ready: ready, results: results};
+}
+function setValue(el, value) {
+    var proto = el.tagName === 'TEXTAREA' ? HTMLTextAreaElement.prototype : HTMLInputElement.prototype;
+    Object.getOwnPropertyDescriptor(proto, 'value').set.call(el, value);
+    el.dispatchEvent(new Event('input', {bubbles: true}));
+    el.dispatchEvent(new Event('change', {bubbles: true}));
+}
+function perform(state) {
+    var out = [];
+    for (var i = 0; i < items.length; i++) {
+        var el = state.results[i][0], r = state.results[i][1], action = items[i].action;
+        try {
+            if (action === 'click' && el) {
+                el.scrollIntoView({block: 'center'});
+                el.click();
+                r.done = true;
+            } else if (action === 'input' && el) {
+                el.focus();
+                setValue(el, items[i].value);
+                r.done = true;
+            } else if (!action || action === 'none') {
+                r.done = !!el;
+            }
+        } catch (e) {
+            r.error = String(e);
+        }
+        out.push(r);
+    }
+    return out;
+}
+(function check() {
+    var state = inspect();
+    if (state.ready) {
+        done({timed_out: false, results: perform(state)});
+    } else if (Date.now() >= deadline) {
+        done({timed_out: true, results: state.results.map(function(p) { return p[1]; })});
+    } else {
+        setTimeout(check, poll);
+    }
+})();
+"""
+
+# 勾选列表中的前N行，返回各行的rowid
+SELECT_ROWS_SCRIPT = """
+var rows = document.evaluate(arguments[0], document, null,
+    XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+var checkboxXpath = arguments[1], limit = arguments[2], click = arguments[3], only = arguments[4];
+var ids = [];
+for (var i = 0; i < rows.snapshotLength && (limit <= 0 || ids.length < limit); i++) {
+    var row = rows.snapshotItem(i);
+    if (only && only.indexOf(row.getAttribute('rowid')) < 0) continue;
+    var box = document.evaluate(checkboxXpath, row, null,
+        XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+    if (!box) continue;
+    if (click) box.click();
+    ids.push(row.getAttribute('rowid'));
+}
+return ids;
+"""
+
+class DomBatch:
+    """批量DOM操作"""
+    def __init__(self, driver, registry):
+        self.driver = driver
+        self.registry = registry
+
+    def run(self, items, timeout=WAIT_TIME['medium']):
+        """等待一组元素就绪后按顺序执行操作
+
+        参数:
+            items: 操作列表，每项为 (名称, 逻辑元素名或xpath, 操作[, 值])，
+                   操作可为 'click'、'input'（设置输入框的值）或 'none'（只检查和读取文本）
+            timeout: 等待元素就绪的截止时间（秒）
+        返回:
+            dict: 名称 -> 结果（found、visible、enabled、done、text、error）
+        """
+        payload = []
+        targets = {}
+        for item in items:
+            name, target, action = item[0], item[1], item[2]
+            targets[name] = target
+            payload.append({
+                'name': name,
+                'locators': self.registry.locators(target),
+                'action': action,
+                'value': item[3] if len(item) > 3 else None,
+                'required': True
+            })
+
+        # 元素都已就绪时一次调用即完成；未就绪时分段等待，超时的一段不执行任何操作，可以安全重试
+        deadline = time.monotonic() + timeout
+        while True:
+            cancel_token.check()
+            remaining = max(deadline - time.monotonic(), 0)
+            wait = min(remaining, MAX_SLICE if cancel_token.shielded() else CANCEL_CONFIG['check_interval'])
+            response = self.driver.execute_async_script(
+                BATCH_SCRIPT, payload, int(wait * 1000), int(WAIT_TIME['poll'] * 1000)
+            )
+            if not response['timed_out'] or wait >= remaining:
+                break
+        results = {r['name']: r for r in response['results']}
+        # 记录命中的定位策略，下次优先使用
+        for name, result in results.items():
+            self.registry.remember(targets[name], result['strategy'])
+
+        if response['timed_out']:
+            not_ready = [r['name'] for r in response['results'] if not (r['visible'] and r['enabled'])]
+            raise TimeoutException(f"批量操作在{timeout}秒内未就绪: {', '.join(not_ready)}")
+
+        failed = [f"{r['name']}({r['error']})" for r in response['results'] if not r['done']]
+        if failed:
+            raise ElementNotInteractableException(f"批量操作执行失败: {', '.join(failed)}")
+
+        logger.debug(f"批量操作完成: {', '.join(results)}")
+        return results
+
+    def select_rows(self, rows_xpath, checkbox_xpath, limit=0, ids=None):
+        """一次调用勾选列表中的前limit行（0表示全部），返回所选行的rowid列表
+
+        参数:
+            ids: 只勾选rowid在其中的行，为None时不限制
+        """
+        return self.driver.execute_script(SELECT_ROWS_SCRIPT, rows_xpath, checkbox_xpath, limit, True, ids)
+
+    def row_ids(self, rows_xpath, checkbox_xpath):
+        """返回列表中所有可勾选行的rowid"""
+        return self.driver.execute_script(SELECT_ROWS_SCRIPT, rows_xpath, checkbox_xpath, 0, False, None)
@@ -0,0 +1,170 @@
+"""
+浏览器驱动池模块
+
+在当前使用的浏览器之外始终保持一个已启动的备用浏览器，并定期检查其是否可用。
+当前浏览器崩溃或被回收时立即换上备用浏览器，同时在后台启动新的备用浏览器，
+恢复只需几秒钟，不必等到下一个调度周期重新启动浏览器。
+
+同一个浏览器配置目录不能同时被两个浏览器使用，因此每个浏览器占用一个配置文件槽位，
+各槽位共用同一份登录Cookie。
+"""
+import threading
+
+import time
+
+from config import DRIVER_POOL_CONFIG, CANCEL_CONFIG
+from logger import logger
+from cancellation import cancel_token
+from browser_profile import BrowserProfile
+
+class DriverPool:
+    """浏览器驱动池"""
+    def __init__(self, profile_name='default', enabled=None):
+        """
+        参数:
+            profile_name: 浏览器配置文件名称（每个账号一个）
+            enabled: 是否保持备用浏览器，为None时使用配置
+        """
+        self.profile_name = profile_name
+        self.enabled = DRIVER_POOL_CONFIG['enabled'] if enabled is None else enabled
+        slots = DRIVER_POOL_CONFIG['slots'] if self.enabled else 1
+        self.free_slots = set(range(slots))
+        self.spare = None
+        self.building = False
+        self.closed = False
+        self.started = False
+        self.condition = threading.Condition()
+        self.stop_event = threading.Event()
+        self.health_thread = None
+
+    def create(self, slot):
+        """在指定槽位启动一个浏览器"""
+        from web_automation import WebAutomation
+        return WebAutomation(BrowserProfile(self.profile_name, slot))
+
+    def start(self):
+        """启动后台备用浏览器和健康检查"""
+        if not self.enabled or self.started:
+            return
+        self.started = True
+        self.closed = False
+        # 每次启动使用新的停止事件，避免关闭后立即重新启动时旧的检查线程不退出
+        self.stop_event = threading.Event()
+        self.health_thread = threading.Thread(target=self.health_loop, args=(self.stop_event,),
+                                              name='driver-pool-health', daemon=True)
+        self.health_thread.start()
+        self.build_spare()
+
+    def adopt(self, automation):
+        """登记在池外启动的浏览器（如预启动的浏览器）占用的槽位"""
+        with self.condition:
+            self.free_slots.discard(automation.profile.slot)
+        self.start()
+
+    def build_spare(self):
+        """有空闲槽位且没有备用浏览器时，在后台启动一个备用浏览器"""
+        with self.condition:
+            if (not self.enabled or self.closed or self.spare is not None
+                    or self.building or not self.free_slots):
+                return
+            slot = min(self.free_slots)
+            self.free_slots.discard(slot)
+            self.building = True
+        threading.Thread(target=self._build_spare, args=(slot,), name='driver-pool-spare',
+                         daemon=True).start()
+
+    def _build_spare(self, slot):
+        try:
+            automation = self.create(slot)
+        except Exception as e:
+            logger.warning(f"启动备用浏览器失败: {str(e)}")
+            with self.condition:
+                self.free_slots.add(slot)
+                self.building = False
+                self.condition.notify_all()
+            return
+
+        with self.condition:
+            self.building = False
+            if not self.closed:
+                self.spare, automation = automation, None
+            self.condition.notify_all()
+        if automation is not None:
+            # 驱动池已关闭，不再需要备用浏览器
+            self.discard(automation)
+        else:
+            logger.info("备用浏览器已就绪")
+
+    def acquire(self):
+        """返回一个可用的浏览器，优先使用备用浏览器"""
+        self.start()
+        with self.condition:
+            # 备用浏览器正在启动时等待它完成，通常比重新启动更快；等待期间可被停止打断
+            deadline = time.monotonic() + DRIVER_POOL_CONFIG['spare_timeout']
+            while self.spare is None and self.building and time.monotonic() < deadline:
+                self.condition.wait(CANCEL_CONFIG['check_interval'])
+                cancel_token.check()
+            spare, self.spare = self.spare, None
+
+        if spare is not None:
+            if spare.is_alive():
+                logger.info("使用备用浏览器")
+                self.build_spare()
+                return spare
+            logger.warning("备用浏览器已失效，重新启动浏览器")
+            self.discard(spare)
+
+        with self.condition:
+            if not self.free_slots:
+                raise RuntimeError("没有可用的浏览器配置文件槽位")
+            slot = min(self.free_slots)
+            self.free_slots.discard(slot)
+        try:
+            automation = self.create(slot)
+        except Exception:
+            with self.condition:
+                self.free_slots.add(slot)
+            raise
+        self.build_spare()
+        return automation
+
+    def release(self, automation):
+        """回收当前浏览器（已崩溃或需要重启），并补充备用浏览器"""
+        self.discard(automation)
+        self.build_spare()
+
+    def discard(self, automation):
+        """关闭浏览器并释放其槽位"""
+        try:
+            automation.close()
+        except Exception as e:
+            logger.warning(f"关闭浏览器异常: {str(e)}")
+        with self.condition:
+            self.free_slots.add(automation.profile.slot)
+            self.condition.notify_all()
+
+    def health_loop(self, stop_event):
+        """定期检查备用浏览器，失效时重新启动"""
+        while not stop_event.wait(DRIVER_POOL_CONFIG['health_interval']):
+            with self.condition:
+                spare = self.spare
+            if spare is not None and not spare.is_alive():
+                with self.condition:
+                    if self.spare is spare:
+                        self.spare = None
+                    else:
+                        continue
+                logger.warning("备用浏览器已失效，重新启动备用浏览器")
+                self.discard(spare)
+            # 备用浏览器缺失（启动失败或已失效）时补充
+            self.build_spare()
+
+    def close(self):
+        """关闭备用浏览器并停止健康检查"""
+        with self.condition:
+            self.closed = True
+            spare, self.spare = self.spare, None
+        self.stop_event.set()
+        self.started = False
+        if spare is not None:
+            self.discard(spare)
@@ -0,0 +1,150 @@
+"""
+错误通知合并模块
+
+按异常类型、消息模板和出错位置给错误生成指纹，同一指纹在时间窗口内
+只立即通知第一次，之后的重复错误只计数，窗口结束时汇总为一封摘要。
+"""
+import re
+import os
+import time
+import threading
+from datetime import datetime
+
+from config import ERROR_DIGEST_CONFIG
+
+# 匹配 traceback 中的调用帧
+FRAME_PATTERN = re.compile(r'^\s*File "([^"]+)", line (\d+), in (.+)$')
+
+def message_template(message):
+    """把消息中的数字、引号内容和地址替换为占位符，得到消息模板"""
+    message = re.sub(r"'[^']*'|\"[^\"]*\"", '<str>', message)
+    message = re.sub(r'0x[0-9a-fA-F]+', '<hex>', message)
+    message = re.sub(r'\d+(\.\d+)?', '<n>', message)
+    return message.strip()
+
+def parse_stack_trace(stack_trace):
+    """从traceback文本中提取最内层的出错位置和异常行
+
+    返回:
+        tuple: (出错位置 '文件:行号:函数', 异常行 '类型: 消息')，无法解析的部分为None
+    """
+    lines = stack_trace.splitlines()
+    site, exception = None, None
+    for index in range(len(lines) - 1, -1, -1):
+        match = FRAME_PATTERN.match(lines[index])
+        if not match:
+            continue
+        site = f"{os.path.basename(match.group(1))}:{match.group(2)}:{match.group(3)}"
+        # 调用帧之后第一行不缩进的内容是异常行
+        for line in lines[index + 1:]:
+            if line and not line[0].isspace():
+                exception = line
+                break
+        break
+    return site, exception
+
+def fingerprint(subject, error_message, stack_trace=None):
+    """生成错误指纹
+
+    有堆栈时使用异常类型、消息模板和出错位置，同一根因在不同层级的
+    处理代码中重复上报时得到相同的指纹；没有堆栈时使用标题和消息模板。
+    """
+    if stack_trace:
+        site, exception = parse_stack_trace(stack_trace)
+        if exception:
+            exception_type, _, message = exception.partition(':')
+            return (exception_type.strip(), message_template(message), site)
+    return (subject, message_template(error_message), None)
+
+class ErrorDigest:
+    """错误通知合并器"""
+    def __init__(self):
+        self.entries = {}
+        self.lock = threading.Lock()
+
+    def record(self, subject, error_message, stack_trace=None):
+        """记录一次错误
+
+        返回:
+            bool: 需要立即发送通知返回True，已合并到摘要返回False
+        """
+        if not ERROR_DIGEST_CONFIG['enabled']:
+            return True
+        key = fingerprint(subject, error_message, stack_trace)
+        now = time.time()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry and now - entry['last_seen'] < ERROR_DIGEST_CONFIG['window']:
+                entry['count'] += 1
+                entry['suppressed'] += 1
+                entry['last_seen'] = now
+                entry['error_message'] = error_message
+                entry['stack_trace'] = stack_trace
+                return False
+
+            if len(self.entries) >= ERROR_DIGEST_CONFIG['max_entries']:
+                # 丢弃最久未出现的错误
+                oldest = min(self.entries, key=lambda k: self.entries[k]['last_seen'])
+                del self.entries[oldest]
+            self.entries[key] = {
+                'subject': subject,
+                'error_message': error_message,
+                'stack_trace': stack_trace,
+                'count': 1,
+                'suppressed': 0,
+                'first_seen': now,
+                'last_seen': now,
+                'window_start': now
+            }
+            return True
+
+    def due(self, force=False):
+        """返回需要发送摘要的错误，并开始新的时间窗口
+
+        参数:
+            force: 忽略时间窗口，返回全部有未通知重复错误的记录（程序退出时使用）
+        返回:
+            list: 每项为错误记录的副本
+        """
+        now = time.time()
+        window = ERROR_DIGEST_CONFIG['window']
+        digest = []
+        with self.lock:
+            for key in list(self.entries):
+                entry = self.entries[key]
+                if entry['suppressed'] and (force or now - entry['window_start'] >= window):
+                    digest.append(dict(entry))
+                    entry['suppressed'] = 0
+                    entry['window_start'] = now
+                elif not entry['suppressed'] and now - entry['last_seen'] >= window:
+                    # 一个窗口内没有再出现，下次出现时重新立即通知
+                    del self.entries[key]
+        return digest
+
+def format_digest(entries):
+    """生成摘要邮件的标题和HTML正文"""
+    def fmt(timestamp):
+        return datetime.fromtimestamp(timestamp).strftime('%Y-%m-%d %H:%M:%S')
+
+    total = sum(entry['suppressed'] for entry in entries)
+    subject = f"错误摘要：{len(entries)}类错误重复{total}次"
+    rows = ''.join(
+        f"<tr><td>{entry['subject']}</td><td>{entry['error_message']}</td>"
+        f"<td>{entry['suppressed']}</td><td>{entry['count']}</td>"
+        f"<td>{fmt(entry['first_seen'])}</td><td>{fmt(entry['last_seen'])}</td></tr>"
+        for entry in sorted(entries, key=lambda e: -e['suppressed'])
+    )
+    content = f"""
+    <html>
+    <body>
+        <h2>自动化打单配货程序错误摘要</h2>
+        <p>以下错误首次出现时已单独通知，之后的重复错误合并在本摘要中。</p>
+        <table border="1" cellspacing="0" cellpadding="4">
+            <tr><th>标题</th><th>最近一次错误信息</th><th>本次合并次数</th><th>累计次数</th>
+                <th>首次出现</th><th>最近出现</th></tr>
+            {rows}
+        </table>
+    </body>
+    </html>
+    """
+    return subject, content
@@ -0,0 +1,91 @@
+"""
+步骤耗时记录与自适应超时模块
+"""
+import os
+import json
+import math
+import atexit
+import threading
+from collections import deque
+
+from config import WAIT_TIME, ADAPTIVE_TIMEOUT, STEP_TIMEOUT_BOUNDS
+from logger import logger, log_dir
+
+class LatencyTracker:
+    """记录每个步骤的实际耗时，并根据历史耗时推算超时时间"""
+    def __init__(self, path=None):
+        self.path = path or os.path.join(log_dir, 'step_latency.json')
+        self.samples = {}
+        self.unsaved = 0
+        self.lock = threading.Lock()
+        self.load()
+
+    def load(self):
+        """从文件加载历史耗时"""
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            for name, values in data.items():
+                self.samples[name] = deque(values, maxlen=ADAPTIVE_TIMEOUT['window'])
+        except Exception as e:
+            logger.warning(f"加载步骤耗时记录失败: {str(e)}")
+
+    def save(self):
+        """保存耗时记录到文件"""
+        with self.lock:
+            data = {name: list(values) for name, values in self.samples.items()}
+            self.unsaved = 0
+        try:
+            tmp_path = self.path + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            logger.warning(f"保存步骤耗时记录失败: {str(e)}")
+
+    def record(self, name, seconds):
+        """记录一次步骤耗时"""
+        with self.lock:
+            if name not in self.samples:
+                self.samples[name] = deque(maxlen=ADAPTIVE_TIMEOUT['window'])
+            self.samples[name].append(round(seconds, 3))
+            self.unsaved += 1
+            need_save = self.unsaved >= ADAPTIVE_TIMEOUT['save_interval']
+        if need_save:
+            self.save()
+
+    def percentile(self, name, percent=None):
+        """返回步骤耗时的百分位值，没有样本时返回None"""
+        percent = percent or ADAPTIVE_TIMEOUT['percentile']
+        with self.lock:
+            values = sorted(self.samples.get(name, []))
+        if not values:
+            return None
+        index = max(0, math.ceil(percent / 100 * len(values)) - 1)
+        return values[index]
+
+    def timeout_for(self, name, default, units=1):
+        """根据历史耗时计算步骤的超时时间
+
+        取最近耗时的高百分位乘以安全系数，并限制在该步骤的上下限之间；
+        样本不足时返回默认值。
+        批量步骤（如一批波次）记录的是每个单位的耗时，超时时间和上限按units放大。
+        """
+        if not ADAPTIVE_TIMEOUT['enabled']:
+            return default * units
+        with self.lock:
+            count = len(self.samples.get(name, []))
+        if count < ADAPTIVE_TIMEOUT['min_samples']:
+            return default * units
+
+        # 批量步骤（名称以_bulk结尾）使用对应单个步骤的上下限
+        base = name[:-len('_bulk')] if name.endswith('_bulk') else name
+        floor, ceiling = STEP_TIMEOUT_BOUNDS.get(name, STEP_TIMEOUT_BOUNDS.get(base, (WAIT_TIME['short'], default)))
+        timeout = self.percentile(name) * ADAPTIVE_TIMEOUT['margin'] * units
+        return min(max(timeout, floor), ceiling * units)
+
+# 创建全局耗时记录实例
+latency_tracker = LatencyTracker()
+atexit.register(latency_tracker.save)
@@ -0,0 +1,136 @@
+"""
+界面日志显示模块
+
+日志先放入待显示缓冲区，由界面线程定时批量刷新到模型，避免每行日志触发一次重绘；
+模型只保留最近固定行数的日志，级别过滤在模型中完成；两个标签页的列表视图共用同一个模型，
+列表视图只绘制可见的行，长时间运行也不会变慢。
+"""
+import threading
+
+from PyQt6.QtCore import Qt, QAbstractListModel, QModelIndex, QTimer
+from PyQt6.QtGui import QColor
+from PyQt6.QtWidgets import QListView, QAbstractItemView
+
+from config import UI_LOG_CONFIG
+
+# 日志级别
+LEVELS = {'DEBUG': 10, 'INFO': 20, 'SUCCESS': 25, 'WARNING': 30, 'ERROR': 40, 'CRITICAL': 50}
+
+# 各级别的显示颜色
+LEVEL_COLORS = {30: QColor('#b36b00'), 40: QColor('#c00000'), 50: QColor('#c00000')}
+
+class LogModel(QAbstractListModel):
+    """日志模型（固定容量的环形缓冲区）"""
+    def __init__(self, max_lines=None, flush_interval=None, parent=None):
+        super().__init__(parent)
+        self.max_lines = max_lines or UI_LOG_CONFIG['max_lines']
+        self.min_level = LEVELS['INFO']
+        self.lines = []      # 缓冲区中的全部日志，每项为 (级别, 文本)
+        self.visible = []    # 通过级别过滤的日志
+        self.pending = []    # 等待刷新到模型的日志（任意线程写入）
+        self.lock = threading.Lock()
+
+        self.timer = QTimer(self)
+        self.timer.setInterval(flush_interval or UI_LOG_CONFIG['flush_interval'])
+        self.timer.timeout.connect(self.flush)
+        self.timer.start()
+
+    def append(self, message):
+        """添加一条日志，可在任意线程调用
+
+        message为loguru的日志消息（带record）或普通文本。
+        """
+        record = getattr(message, 'record', None)
+        level = record['level'].no if record else LEVELS['INFO']
+        text = str(message).rstrip('\n')
+        with self.lock:
+            self.pending.append((level, text))
+            # 界面长时间未刷新时只保留最新的日志
+            if len(self.pending) > self.max_lines:
+                del self.pending[:len(self.pending) - self.max_lines]
+
+    def flush(self):
+        """把待显示的日志批量加入模型（在界面线程中由定时器调用）"""
+        with self.lock:
+            batch, self.pending = self.pending, []
+        if not batch:
+            return
+
+        # 超出容量时先移除最早的日志
+        overflow = len(self.lines) + len(batch) - self.max_lines
+        if overflow > 0:
+            overflow = min(overflow, len(self.lines))
+            removed = sum(1 for level, _ in self.lines[:overflow] if level >= self.min_level)
+            if removed:
+                self.beginRemoveRows(QModelIndex(), 0, removed - 1)
+                del self.visible[:removed]
+                del self.lines[:overflow]
+                self.endRemoveRows()
+            else:
+                del self.lines[:overflow]
+
+        self.lines.extend(batch)
+        added = [line for line in batch if line[0] >= self.min_level]
+        if added:
+            first = len(self.visible)
+            self.beginInsertRows(QModelIndex(), first, first + len(added) - 1)
+            self.visible.extend(added)
+            self.endInsertRows()
+
+    def set_min_level(self, level):
+        """只显示不低于该级别的日志"""
+        self.flush()
+        self.beginResetModel()
+        self.min_level = level
+        self.visible = [line for line in self.lines if line[0] >= level]
+        self.endResetModel()
+
+    def clear(self):
+        """清除全部日志"""
+        with self.lock:
+            self.pending = []
+        self.beginResetModel()
+        self.lines = []
+        self.visible = []
+        self.endResetModel()
+
+    def to_text(self):
+        """返回缓冲区中的全部日志文本（不受级别过滤影响）"""
+        self.flush()
+        return '\n'.join(text for _, text in self.lines)
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.visible)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid() or index.row() >= len(self.visible):
+            return None
+        level, text = self.visible[index.row()]
+        if role == Qt.ItemDataRole.DisplayRole:
+            return text
+        if role == Qt.ItemDataRole.ForegroundRole:
+            return LEVEL_COLORS.get(level)
+        return None
+
+class LogView(QListView):
+    """日志列表视图，新日志到达时如果已在底部则自动滚动"""
+    def __init__(self, model, parent=None):
+        super().__init__(parent)
+        self.setModel(model)
+        # 所有行等高，视图只计算和绘制可见的行
+        self.setUniformItemSizes(True)
+        self.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.setSelectionMode(QAbstractItemView.SelectionMode.ExtendedSelection)
+        self.setWordWrap(False)
+        self.follow = True
+        model.rowsAboutToBeInserted.connect(self.before_insert)
+        model.rowsInserted.connect(self.after_insert)
+        model.modelReset.connect(self.scrollToBottom)
+
+    def before_insert(self, *args):
+        scroll_bar = self.verticalScrollBar()
+        self.follow = scroll_bar.value() >= scroll_bar.maximum()
+
+    def after_insert(self, *args):
+        if self.follow:
+            self.scrollToBottom()
@@ -1,19 +1,167 @@
 """
 日志处理模块
+
+日志格式化后放入各输出的有界队列，由后台线程写入文件、界面和控制台，
+记录日志不会在自动化步骤中引入文件读写或界面刷新的耗时。
+队列满时丢弃最早的日志，并记录丢弃数量。
 """
 import sys
 import os
+import glob
+import time
+import atexit
+import threading
+from collections import deque
 from loguru import logger
-from datetime import datetime
+from datetime import datetime, timedelta
+
+from config import LOG_CONFIG
 
 class UILogHandler:
     """UI日志处理器"""
     def __init__(self):
-        self.signal = None
+        self.callback = None
+
+    def write(self, message):
+        if self.callback:
+            self.callback(message)
+
+class DailyLogFile:
+    """按天切换的日志文件，带写入缓冲区，过期文件自动删除"""
+    def __init__(self, directory, prefix='automation'):
+        self.directory = directory
+        self.prefix = prefix
+        self.date = None
+        self.file = None
+        self.dirty = False
+        self.lock = threading.RLock()
 
     def write(self, message):
-        if self.signal:
-            self.signal.emit(message)
+        with self.lock:
+            today = datetime.now().strftime('%Y%m%d')
+            if today != self.date:
+                self.open(today)
+            self.file.write(message)
+            self.dirty = True
+
+    def open(self, date):
+        """打开指定日期的日志文件，并删除过期的日志"""
+        self.close()
+        self.date = date
+        path = os.path.join(self.directory, f"{self.prefix}_{date}.log")
+        self.file = open(path, 'a', encoding='utf-8', buffering=LOG_CONFIG['file_buffer_size'])
+        self.remove_expired()
+
+    def remove_expired(self):
+        cutoff = (datetime.now() - timedelta(days=LOG_CONFIG['retention_days'])).strftime('%Y%m%d')
+        for path in glob.glob(os.path.join(self.directory, f"{self.prefix}_*.log")):
+            date = os.path.basename(path)[len(self.prefix) + 1:-len('.log')]
+            if date.isdigit() and date < cutoff:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    def flush(self):
+        with self.lock:
+            if self.file and self.dirty:
+                self.file.flush()
+                self.dirty = False
+
+    def close(self):
+        with self.lock:
+            if self.file:
+                self.file.close()
+                self.file = None
+                self.dirty = False
+
+class QueuedSink:
+    """后台写入的日志输出
+
+    调用方只把日志放入有界队列，由后台线程写入目标；队列满时丢弃最早的日志。
+    """
+    def __init__(self, name, target, max_size, flush=None, flush_interval=None):
+        """
+        参数:
+            name: 输出名称（用于统计）
+            target: 写入一条日志的函数，在后台线程中调用
+            max_size: 队列上限
+            flush: 刷新缓冲区的函数，队列空闲且到达刷新间隔时调用
+            flush_interval: 刷新间隔（秒）
+        """
+        self.name = name
+        self.target = target
+        self.max_size = max_size
+        self.flush_target = flush
+        self.flush_interval = flush_interval or LOG_CONFIG['flush_interval']
+        self.written = 0
+        self.dropped = 0
+        self.errors = 0
+        self.reset()
+
+    def reset(self):
+        """初始化队列和后台线程（fork出的子进程中需要重新初始化）"""
+        self.pid = os.getpid()
+        self.queue = deque()
+        self.condition = threading.Condition()
+        self.stopped = False
+        self.worker = None
+
+    def write(self, message):
+        """loguru输出入口：放入队列后立即返回"""
+        if self.pid != os.getpid():
+            self.reset()
+        with self.condition:
+            if len(self.queue) >= self.max_size:
+                self.queue.popleft()
+                self.dropped += 1
+            self.queue.append(message)
+            if self.worker is None:
+                self.worker = threading.Thread(target=self.run, name=f"log-{self.name}", daemon=True)
+                self.worker.start()
+            self.condition.notify()
+
+    def run(self):
+        """后台线程：批量取出日志写入目标，空闲时按间隔刷新缓冲区"""
+        last_flush = time.monotonic()
+        while True:
+            with self.condition:
+                if not self.queue and not self.stopped:
+                    self.condition.wait(self.flush_interval)
+                batch = list(self.queue)
+                self.queue.clear()
+                stopped = self.stopped
+            for message in batch:
+                try:
+                    self.target(message)
+                    self.written += 1
+                except Exception:
+                    self.errors += 1
+            if self.flush_target and (stopped or time.monotonic() - last_flush >= self.flush_interval):
+                try:
+                    self.flush_target()
+                except Exception:
+                    self.errors += 1
+                last_flush = time.monotonic()
+            if stopped:
+                with self.condition:
+                    if not self.queue:
+                        return
+
+    def stop(self, timeout=5):
+        """写完队列中的日志并刷新缓冲区后停止后台线程"""
+        with self.condition:
+            worker = self.worker
+            if worker is None or self.pid != os.getpid():
+                return
+            self.stopped = True
+            self.condition.notify_all()
+        worker.join(timeout)
+
+    def stats(self):
+        """返回队列深度、已写入、丢弃和写入失败的日志数"""
+        return {'depth': len(self.queue), 'written': self.written,
+                'dropped': self.dropped, 'errors': self.errors}
 
 # 创建UI日志处理器实例
 ui_handler = UILogHandler()
@@ -34,30 +182,57 @@ if not os.path.exists(log_dir):
 # 配置日志格式
 logger.remove()
 
-# 添加文件日志
-log_file = os.path.join(log_dir, f"automation_{datetime.now().strftime('%Y%m%d')}.log")
+# 添加文件日志（缓冲写入，按间隔和退出时刷新）
+log_file = DailyLogFile(log_dir)
+file_sink = QueuedSink('file', log_file.write, LOG_CONFIG['file_queue_size'], flush=log_file.flush)
 logger.add(
-    log_file,
-    rotation="00:00",
-    retention="30 days",
-    format="{time:YYYY-MM-DD HH:mm:ss} | {level: <8} | {name}:{function}:{line} - {message}",
-    encoding="utf-8"
+    file_sink.write,
+    format="{time:YYYY-MM-DD HH:mm:ss} | {level: <8} | {name}:{function}:{line} - {message}"
 )
 
 # 添加UI日志处理器
+ui_sink = QueuedSink('ui', ui_handler.write, LOG_CONFIG['ui_queue_size'])
 logger.add(
-    ui_handler.write,
+    ui_sink.write,
     format="{time:YYYY-MM-DD HH:mm:ss} | {level: <8} | {message}",
     level="INFO"  # 只显示 INFO 及以上级别的日志
 )
 
+sinks = [file_sink, ui_sink]
+
 # 如果是开发环境，添加控制台输出
 if not getattr(sys, 'frozen', False):
+    console_sink = QueuedSink('console', sys.stdout.write, LOG_CONFIG['console_queue_size'],
+                              flush=sys.stdout.flush)
     logger.add(
-        sys.stdout,
+        console_sink.write,
+        colorize=sys.stdout.isatty(),
         format="<green>{time:YYYY-MM-DD HH:mm:ss}</green> | <level>{level: <8}</level> | <cyan>{name}</cyan>:<cyan>{function}</cyan>:<cyan>{line}</cyan> - <level>{message}</level>"
     )
+    sinks.append(console_sink)
+
+def log_stats():
+    """返回各日志输出的队列统计"""
+    return {sink.name: sink.stats() for sink in sinks}
+
+def shutdown_logging():
+    """程序退出时写完队列中的日志并刷新文件"""
+    for sink in sinks:
+        sink.stop()
+    log_file.close()
+
+def _after_fork_in_child():
+    # 子进程中后台线程不存在，丢弃继承来的队列（由父进程写入）
+    log_file.lock = threading.RLock()
+    for sink in sinks:
+        sink.reset()
+
+if hasattr(os, 'register_at_fork'):
+    # fork前刷新文件缓冲区，避免子进程重复写入父进程未刷新的内容
+    os.register_at_fork(before=log_file.flush, after_in_child=_after_fork_in_child)
+
+atexit.register(shutdown_logging)
 
-def set_ui_signal(signal):
-    """设置UI信号"""
-    ui_handler.signal = signal 
\ No newline at end of file
+def set_ui_callback(callback):
+    """设置接收UI日志的回调（在日志后台线程中调用）"""
+    ui_handler.callback = callback
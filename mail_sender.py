@@ -2,16 +2,28 @@
 邮件发送模块
 """
 import smtplib
+import queue
+import time
+import atexit
+import threading
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from email.header import Header
 from email.utils import formataddr
 import os
 from datetime import datetime
+
+from config import MAIL_QUEUE_CONFIG, ERROR_DIGEST_CONFIG
+from error_digest import ErrorDigest, format_digest
 from logger import logger
 
 class EmailSender:
-    """邮件发送类"""
+    """邮件发送类
+
+    错误通知放入队列后立即返回，由后台线程发送，不阻塞自动化任务和界面。
+    后台线程复用同一个已登录的SMTP连接，连接空闲过久或断开时重新连接。
+    同一错误重复出现时只立即发送第一封，其余合并为摘要邮件。
+    """
     def __init__(self):
         # 读取环境变量中的邮箱配置
         self.smtp_server = os.getenv('SMTP_SERVER', 'smtp.qq.com')
@@ -19,67 +31,250 @@ class EmailSender:
         self.sender_email = os.getenv('SENDER_EMAIL', '')
         self.sender_password = os.getenv('SENDER_PASSWORD', '')
         self.receiver_email = os.getenv('RECEIVER_EMAIL', '')
-        
+
+        self.queue = queue.Queue(maxsize=MAIL_QUEUE_CONFIG['max_size'])
+        self.worker = None
+        self.worker_lock = threading.Lock()
+        self.connection = None
+        self.connection_key = None
+        self.last_used = 0
+        self.digest = ErrorDigest()
+
     def is_configured(self):
         """检查邮件配置是否完整"""
-        return (self.smtp_server and self.sender_email and 
+        return (self.smtp_server and self.sender_email and
                 self.sender_password and self.receiver_email)
-    
-    def send_error_notification(self, subject, error_message, stack_trace=None):
-        """发送错误通知邮件"""
+
+    def new_message(self, subject, content):
+        """生成HTML邮件"""
+        message = MIMEMultipart()
+        # 正确设置From头，使用formataddr确保符合RFC标准
+        message['From'] = formataddr(("自动化打单配货程序", self.sender_email))
+        message['To'] = self.receiver_email
+        message['Subject'] = Header(subject, 'utf-8')
+        message.attach(MIMEText(content, 'html', 'utf-8'))
+        return message
+
+    def build_message(self, subject, error_message, stack_trace=None, error_time=None):
+        """生成错误通知邮件"""
+        error_time = (error_time or datetime.now()).strftime('%Y-%m-%d %H:%M:%S')
+
+        # 邮件正文
+        content = f"""
+        <html>
+        <body>
+            <h2>自动化打单配货程序异常通知</h2>
+            <p><strong>错误时间：</strong>{error_time}</p>
+            <p><strong>错误信息：</strong>{error_message}</p>
+        """
+
+        if stack_trace:
+            content += f"""
+            <p><strong>错误堆栈：</strong></p>
+            <pre>{stack_trace}</pre>
+            """
+
+        content += """
+        </body>
+        </html>
+        """
+
+        return self.new_message(f"{subject} - {error_time}", content)
+
+    def build_digest_message(self, entries):
+        """生成错误摘要邮件"""
+        subject, content = format_digest(entries)
+        return self.new_message(f"{subject} - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}", content)
+
+    def connect(self):
+        """建立并登录SMTP连接"""
+        timeout = MAIL_QUEUE_CONFIG['timeout']
+        if self.smtp_port == 465:
+            # 使用SSL连接
+            server = smtplib.SMTP_SSL(self.smtp_server, self.smtp_port, timeout=timeout)
+        else:
+            # 使用普通连接
+            server = smtplib.SMTP(self.smtp_server, self.smtp_port, timeout=timeout)
+            server.starttls()  # 启用TLS加密
+        server.login(self.sender_email, self.sender_password)
+        return server
+
+    def get_connection(self):
+        """返回可用的SMTP连接，配置变更、空闲过久或已断开时重新连接"""
+        key = (self.smtp_server, self.smtp_port, self.sender_email, self.sender_password)
+        if self.connection is not None:
+            idle = time.monotonic() - self.last_used
+            if key != self.connection_key or idle > MAIL_QUEUE_CONFIG['idle_timeout']:
+                self.close_connection()
+            else:
+                try:
+                    if self.connection.noop()[0] != 250:
+                        self.close_connection()
+                except (smtplib.SMTPException, OSError):
+                    self.close_connection()
+
+        if self.connection is None:
+            self.connection = self.connect()
+            self.connection_key = key
+        return self.connection
+
+    def close_connection(self):
+        """关闭SMTP连接"""
+        if self.connection is None:
+            return
+        try:
+            self.connection.quit()
+        except (smtplib.SMTPException, OSError):
+            pass
+        self.connection = None
+
+    def deliver(self, message):
+        """通过复用的连接发送邮件"""
+        message = message.as_string()
+        try:
+            self.get_connection().sendmail(self.sender_email, self.receiver_email, message)
+        except (smtplib.SMTPServerDisconnected, smtplib.SMTPResponseException, OSError):
+            # 复用的连接可能已被服务器关闭，重新连接后重试一次
+            self.close_connection()
+            self.get_connection().sendmail(self.sender_email, self.receiver_email, message)
+        self.last_used = time.monotonic()
+
+    def send_now(self, subject, error_message, stack_trace=None, error_time=None):
+        """同步发送错误通知邮件（在后台线程中调用）"""
         if not self.is_configured():
             logger.error("邮件配置不完整，无法发送邮件")
             return False
-        
+
         try:
-            # 创建邮件内容
-            message = MIMEMultipart()
-            # 正确设置From头，使用formataddr确保符合RFC标准
-            message['From'] = formataddr(("自动化打单配货程序", self.sender_email))
-            message['To'] = self.receiver_email
-            message['Subject'] = Header(f"{subject} - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}", 'utf-8')
-            
-            # 邮件正文
-            content = f"""
-            <html>
-            <body>
-                <h2>自动化打单配货程序异常通知</h2>
-                <p><strong>错误时间：</strong>{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}</p>
-                <p><strong>错误信息：</strong>{error_message}</p>
-            """
-            
-            if stack_trace:
-                content += f"""
-                <p><strong>错误堆栈：</strong></p>
-                <pre>{stack_trace}</pre>
-                """
-                
-            content += """
-            </body>
-            </html>
-            """
-            
-            message.attach(MIMEText(content, 'html', 'utf-8'))
-            
-            # 发送邮件
-            if self.smtp_port == 465:
-                # 使用SSL连接
-                server = smtplib.SMTP_SSL(self.smtp_server, self.smtp_port)
-            else:
-                # 使用普通连接
-                server = smtplib.SMTP(self.smtp_server, self.smtp_port)
-                server.starttls()  # 启用TLS加密
-                
-            server.login(self.sender_email, self.sender_password)
-            server.sendmail(self.sender_email, self.receiver_email, message.as_string())
-            server.quit()
-            
+            self.deliver(self.build_message(subject, error_message, stack_trace, error_time))
             logger.info(f"错误通知邮件已发送至 {self.receiver_email}")
             return True
-            
+
         except Exception as e:
+            self.close_connection()
             logger.error(f"发送邮件失败: {str(e)}")
             return False
 
+    def send_digest(self, entries):
+        """同步发送错误摘要邮件（在后台线程中调用）"""
+        if not self.is_configured():
+            return False
+        try:
+            self.deliver(self.build_digest_message(entries))
+            logger.info(f"错误摘要邮件已发送，共{len(entries)}类错误")
+            return True
+        except Exception as e:
+            self.close_connection()
+            logger.error(f"发送错误摘要邮件失败: {str(e)}")
+            return False
+
+    def send_error_notification(self, subject, error_message, stack_trace=None, callback=None,
+                                aggregate=True):
+        """将错误通知放入发送队列，立即返回
+
+        同一错误在合并窗口内重复出现时不再单独发送，合并到摘要邮件中。
+
+        参数:
+            callback: 发送完成后在后台线程中调用，参数为是否发送成功
+            aggregate: 是否参与重复错误合并（测试邮件不合并）
+        返回:
+            bool: 成功放入队列或已合并返回True，邮件配置不完整返回False
+        """
+        if not self.is_configured():
+            logger.error("邮件配置不完整，无法发送邮件")
+            if callback:
+                callback(False)
+            return False
+
+        if aggregate and not self.digest.record(subject, error_message, stack_trace):
+            logger.info(f"相同的错误已通知过，合并到摘要邮件: {subject}")
+            return True
+
+        self.enqueue(('error', (subject, error_message, stack_trace, datetime.now()), callback))
+        return True
+
+    def enqueue(self, item):
+        """放入发送队列，队列已满时丢弃最早的邮件，保留最新的错误"""
+        self.start_worker()
+        while True:
+            try:
+                self.queue.put_nowait(item)
+                return
+            except queue.Full:
+                try:
+                    dropped = self.queue.get_nowait()
+                    self.queue.task_done()
+                    if dropped is None:
+                        continue
+                    logger.warning(f"邮件队列已满，丢弃未发送的通知: {dropped[1][0]}")
+                    if dropped[2]:
+                        dropped[2](False)
+                except queue.Empty:
+                    pass
+
+    def start_worker(self):
+        """启动后台发送线程"""
+        with self.worker_lock:
+            if self.worker is None or not self.worker.is_alive():
+                self.worker = threading.Thread(target=self.run, name='email-sender', daemon=True)
+                self.worker.start()
+
+    def run(self):
+        """后台线程：依次发送队列中的邮件，定期发送到期的摘要，空闲时关闭连接"""
+        while True:
+            try:
+                item = self.queue.get(timeout=ERROR_DIGEST_CONFIG['check_interval'])
+            except queue.Empty:
+                item = False
+            try:
+                if item is None:
+                    self.close_connection()
+                    return
+                if item:
+                    self.process(item)
+                entries = self.digest.due()
+                if entries:
+                    self.send_digest(entries)
+                if time.monotonic() - self.last_used > MAIL_QUEUE_CONFIG['idle_timeout']:
+                    self.close_connection()
+            finally:
+                if item is not False:
+                    self.queue.task_done()
+
+    def process(self, item):
+        """发送一个队列项"""
+        kind, args, callback = item
+        if kind == 'digest':
+            result = self.send_digest(*args)
+        else:
+            result = self.send_now(*args)
+        if callback:
+            try:
+                callback(result)
+            except Exception as e:
+                logger.warning(f"邮件发送回调执行失败: {str(e)}")
+
+    def shutdown(self, timeout=None):
+        """发送完队列中剩余的邮件和未到期的摘要后停止后台线程（最多等待timeout秒）"""
+        timeout = MAIL_QUEUE_CONFIG['flush_timeout'] if timeout is None else timeout
+        worker = self.worker
+        if worker is None or not worker.is_alive():
+            return
+        entries = self.digest.due(force=True)
+        if entries:
+            self.enqueue(('digest', (entries,), None))
+        pending = self.queue.qsize()
+        if pending:
+            logger.info(f"等待发送剩余的{pending}封通知邮件")
+        try:
+            self.queue.put(None, timeout=timeout)
+        except queue.Full:
+            logger.warning("邮件队列未能在退出前发送完成")
+            return
+        worker.join(timeout)
+        if worker.is_alive():
+            logger.warning("邮件队列未能在退出前发送完成")
+
 # 创建全局邮件发送器实例
-email_sender = EmailSender() 
\ No newline at end of file
+email_sender = EmailSender()
+atexit.register(email_sender.shutdown)
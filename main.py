@@ -2,15 +2,18 @@
 主程序文件
 """
 import os
-import time
 import traceback
 from datetime import datetime
 from dotenv import load_dotenv
 
-from web_automation import WebAutomation
+from session_manager import SessionManager
+from scheduler import Scheduler
+from web_automation import SessionExpiredError
 from config import ORDER_THRESHOLDS, time_config
 from logger import logger
 from mail_sender import email_sender
+from tracing import traced, tracer
+from retry_policy import retry_budget
 
 # 加载环境变量
 load_dotenv()
@@ -18,31 +21,45 @@ load_dotenv()
 def is_work_time():
     """判断当前是否是工作时间"""
     current_time = datetime.now().time()
-    logger.info(f"当前时间: {current_time.strftime('%H:%M')}")
-    logger.info(f"工作时间: {time_config.WORK_START_TIME.strftime('%H:%M')} - {time_config.WORK_END_TIME.strftime('%H:%M')}")
+    logger.debug(f"当前时间: {current_time.strftime('%H:%M')}")
+    logger.debug(f"工作时间: {time_config.WORK_START_TIME.strftime('%H:%M')} - {time_config.WORK_END_TIME.strftime('%H:%M')}")
     return time_config.WORK_START_TIME <= current_time <= time_config.WORK_END_TIME
 
 def is_wave_time():
     """判断当前是否是波次时间"""
     current_time = datetime.now().time()
-    logger.info(f"波次时间: {time_config.WORK_START_TIME.strftime('%H:%M')} - {time_config.WORK_MIDDLE_TIME.strftime('%H:%M')}")
+    logger.debug(f"波次时间: {time_config.WORK_START_TIME.strftime('%H:%M')} - {time_config.WORK_MIDDLE_TIME.strftime('%H:%M')}")
     return time_config.WORK_START_TIME <= current_time < time_config.WORK_MIDDLE_TIME
 
-def main():
-    """主程序入口"""
+@traced('cycle')
+def main(session=None, username=None, password=None):
+    """主程序入口
+    
+    参数:
+        session: 跨周期复用的浏览器会话，为None时本次任务结束后关闭浏览器
+        username, password: 登录凭证，为None时从环境变量读取
+    """
     current_time = datetime.now()
+    # 每个周期重新计算步骤重试次数上限
+    retry_budget.reset()
     logger.info(f"开始执行任务，当前时间: {current_time.strftime('%Y-%m-%d %H:%M:%S')}")
     
     # 首先检查是否是工作时间
     if not is_work_time():
         logger.info("当前不是工作时间，不执行任务")
+        # 非工作时间释放浏览器
+        if session:
+            session.close()
         return False
     
-    automation = None
+    own_session = session is None
+    if own_session:
+        # 单次运行结束即关闭浏览器，不需要备用浏览器
+        session = SessionManager(use_pool=False)
     try:
         # 获取登录凭证
-        username = os.getenv('USERNAME')
-        password = os.getenv('PASSWORD')
+        username = username or os.getenv('USERNAME')
+        password = password or os.getenv('PASSWORD')
 
         if not username or not password:
             error_msg = "未找到登录凭证，请检查环境变量"
@@ -52,19 +69,18 @@ def main():
         
         logger.info(f"获取到登录凭证: {username}")
         
-        # 只有在工作时间才初始化浏览器
-        automation = WebAutomation()
         try:
-            # 登录系统
-            login_success = automation.login(username, password)
+            # 获取已登录的浏览器会话（必要时启动浏览器并登录）
+            automation = session.acquire(username, password)
             
             # 如果登录失败，直接返回False结束任务
-            if not login_success:
+            if automation is None:
                 logger.error("登录失败，终止任务")
                 return False
 
             # 查询待打单数量
             order_count = automation.order_count()
+            tracer.current().set(order_count=order_count)
 
             # 根据时间执行不同的波次配货
             wave_time = is_wave_time()
@@ -75,23 +91,36 @@ def main():
                 automation.execute_wave_picking()
             elif wave_time and not wave_order_count:
                 logger.info("当前订单数量不够整波，不执行任务")
+            elif order_count == 0:
+                logger.info("当前没有待打单订单，不执行任务")
+            elif order_count <= ORDER_THRESHOLDS['few']:
+                # 订单较少时直接取号打单，省去生成波次和处理波次
+                logger.info("执行订单配货任务")
+                if not automation.execute_order_picking():
+                    logger.info("改为执行散单配货任务")
+                    automation.create_wave(wave_time)
+                    automation.execute_wave_picking()
             else:
                 logger.info("执行散单配货任务")
                 automation.create_wave(wave_time)
                 automation.execute_wave_picking()
             
-            logger.info("任务执行完成，等待10分钟后重新执行")
+            logger.info("任务执行完成")
             return True
+        except SessionExpiredError:
+            # 登录会话过期，下个周期重新登录，不需要重启浏览器
+            logger.info("登录会话已过期，下个周期重新登录")
+            session.logged_in = False
+            return False
         except Exception as e:
             error_msg = f"任务执行失败: {str(e)}"
             stack_trace = traceback.format_exc()
             logger.error(error_msg)
             # 发送邮件通知
             email_sender.send_error_notification("任务执行失败", error_msg, stack_trace)
+            # 浏览器状态未知，下个周期重新启动
+            session.reset()
             return False
-        finally:
-            if automation:
-                automation.close()
             
     except Exception as e:
         error_msg = f"程序运行异常: {str(e)}"
@@ -100,10 +129,15 @@ def main():
         # 发送邮件通知
         email_sender.send_error_notification("程序异常", error_msg, stack_trace)
         return False
+    finally:
+        if own_session:
+            session.close()
 
 if __name__ == "__main__":
     logger.info("程序启动")
     
+    # 跨周期复用的浏览器会话
+    session = SessionManager()
     try:
         # 验证邮件配置
         if email_sender.is_configured():
@@ -111,19 +145,8 @@ if __name__ == "__main__":
         else:
             logger.warning("邮件配置不完整，异常通知将不可用")
             
-        while True:
-            try:
-                # 执行任务
-                main()
-            except Exception as e:
-                error_msg = f"主任务执行异常: {str(e)}"
-                stack_trace = traceback.format_exc()
-                logger.error(error_msg)
-                # 发送邮件通知
-                email_sender.send_error_notification("主任务异常", error_msg, stack_trace)
-                
-            # 等待10分钟
-            time.sleep(10 * 60)
+        # 按工作时间和订单数量调度任务
+        Scheduler(main, session).run()
                 
     except KeyboardInterrupt:
         logger.info("程序被手动停止")
@@ -132,4 +155,6 @@ if __name__ == "__main__":
         stack_trace = traceback.format_exc()
         logger.error(error_msg)
         # 发送邮件通知
-        email_sender.send_error_notification("程序崩溃", error_msg, stack_trace)
\ No newline at end of file
+        email_sender.send_error_notification("程序崩溃", error_msg, stack_trace)
+    finally:
+        session.close()
\ No newline at end of file
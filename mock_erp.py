@@ -0,0 +1,790 @@
+"""
+模拟ERP服务器
+
+在本地提供与ERP结构一致的页面（登录页、首页、订单配货页、波次配货页和任务面板），
+页面元素的层级与 config.py 中的 SELECTORS 完全对应，可在没有网络的环境下
+运行自动化流程，用于功能验证和性能基准测试。支持配置延迟和随机失败。
+
+用法:
+    python mock_erp.py --port 8765 --orders 30
+    然后设置环境变量 ERP_BASE_URL=http://127.0.0.1:8765 运行主程序
+"""
+import json
+import math
+import time
+import random
+import argparse
+import threading
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from http.cookies import SimpleCookie
+from urllib.parse import urlparse
+
+from config import MOCK_ERP_CONFIG
+from logger import logger
+
+SESSION_COOKIE = 'mock_erp_session'
+
+# 生成波次弹窗中的波次类型（rowid与SELECTORS中的勾选框对应）
+WAVE_TYPES = {
+    '503871746583168614': '整波',
+    '778233247578105467': '单品',
+    '863005655571211718': '散单'
+}
+
+# 波次操作及其前置条件
+WAVE_ACTIONS = {
+    'generate_express': ('生成快递单', None),
+    'print_picking': ('打配货单', 'generate_express'),
+    'print_express': ('打快递单', 'generate_express'),
+    'confirm_picking': ('确认配货', 'print_express')
+}
+
+# 订单操作及其前置条件
+ORDER_ACTIONS = {
+    'get_express': ('取号打单', None),
+    'print_picking': ('打配货单', 'get_express'),
+    'confirm_picking': ('确认配货', 'get_express')
+}
+
+PAGE_STYLE = """
+<style>
+body { position: relative; margin: 0; font-family: sans-serif; font-size: 14px; min-height: 100vh; }
+button { margin: 4px; padding: 4px 12px; }
+i { display: inline-block; min-width: 16px; cursor: pointer; font-style: normal; }
+.el-loading-mask { display: none; position: absolute; top: 0; left: 0; right: 0; bottom: 0;
+                   background: rgba(255, 255, 255, 0.6); z-index: 100; }
+.cb-inner { display: inline-block; width: 14px; height: 14px; border: 1px solid #999; cursor: pointer; }
+tr.checked .cb-inner, td.checked { background: #409eff; }
+td { padding: 2px 8px; border-bottom: 1px solid #eee; }
+#panelTask { display: none; position: absolute; right: 20px; bottom: 20px; width: 300px;
+             border: 1px solid #ccc; background: #fff; z-index: 200; }
+#panelTask > div:first-child { display: flex; justify-content: space-between; padding: 4px; background: #eee; }
+</style>
+"""
+
+# 页面公用脚本：带遮罩的数据请求和任务面板
+COMMON_SCRIPT = """
+<script>
+var mask = document.getElementById('loadingMask');
+var maskCount = 0;
+function showMask() { maskCount++; mask.style.display = 'block'; }
+function hideMask() { if (--maskCount <= 0) { maskCount = 0; mask.style.display = 'none'; } }
+function api(method, url, body) {
+    var options = {method: method, headers: {'Content-Type': 'application/json'}};
+    if (body !== undefined) options.body = JSON.stringify(body);
+    return fetch(url, options).then(function(r) {
+        if (r.redirected && r.url.indexOf('/login') >= 0) { top.location.href = '/login'; }
+        return r.json().then(function(data) {
+            if (!r.ok) throw new Error(data.message || ('HTTP ' + r.status));
+            return data;
+        });
+    });
+}
+function withMask(promise) {
+    showMask();
+    return promise.finally(hideMask);
+}
+var panel = document.getElementById('panelTask');
+function runTask(title, method, url, body) {
+    if (!panel) return withMask(api(method, url, body));
+    panel.querySelector('.task-title').innerText = title;
+    panel.querySelector('.task-status').innerText = '执行中';
+    panel.querySelector('.task-message').innerText = '';
+    panel.style.display = 'block';
+    return withMask(api(method, url, body).then(function(data) {
+        panel.querySelector('.task-status').innerText = '已完成';
+        panel.querySelector('.task-message').innerText = data.message || '';
+        setTimeout(function() { panel.style.display = 'none'; }, 500);
+        return data;
+    }, function(e) {
+        panel.querySelector('.task-status').innerText = '失败';
+        panel.querySelector('.task-message').innerText = e.message;
+        throw e;
+    }));
+}
+if (panel) {
+    panel.querySelector('.task-close').addEventListener('click', function() { panel.style.display = 'none'; });
+}
+</script>
+"""
+
+MASK_HTML = '<div id="loadingMask" class="el-loading-mask"></div>'
+
+PANEL_HTML = """
+<div id="panelTask">
+    <div><div class="task-title">任务</div><div class="task-close">×</div></div>
+    <div><span class="task-status"></span> <span class="task-message"></span></div>
+</div>
+"""
+
+LOGIN_PAGE = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>登录</title>__STYLE__</head>
+<body>
+<div id="app"><div>
+  <div>ERP</div>
+  <div>
+    <div></div>
+    <div>
+      <div></div>
+      <div>
+        <div><div><div>
+          <div><div id="loginType">__LOGIN_TYPE__</div></div>
+          <div id="passwordBox" style="__FORM_STYLE__">
+            <div>
+              <form onsubmit="return false">
+                <div><div><div><input type="text" placeholder="用户名"></div></div></div>
+                <div><div><div><input id="input-password" type="password" placeholder="密码"></div></div></div>
+              </form>
+              <div><div><span id="loginError"></span></div></div>
+              <button id="loginSubmit" type="button">登录</button>
+            </div>
+          </div>
+          <div></div>
+          <div></div>
+          <div><button id="switchLogin" type="button">账号登录</button></div>
+        </div></div></div>
+      </div>
+    </div>
+  </div>
+</div></div>
+__MASK__
+__COMMON__
+<script>
+document.getElementById('switchLogin').addEventListener('click', function() {
+    document.getElementById('loginType').innerText = '账号登录';
+    document.getElementById('passwordBox').style.display = 'block';
+});
+document.getElementById('loginSubmit').addEventListener('click', function() {
+    var inputs = document.querySelectorAll('#passwordBox input');
+    document.getElementById('loginError').innerText = '';
+    withMask(api('POST', '/api/login', {username: inputs[0].value, password: inputs[1].value}))
+        .then(function() { location.href = '/frame/home'; },
+              function(e) { document.getElementById('loginError').innerText = e.message; });
+});
+</script>
+</body></html>
+"""
+
+# 外层框架页，各功能页放在 #tabsetMain 下的iframe中
+FRAME_PAGE = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>ERP</title>
+<style>body { margin: 0; } iframe { width: 100%; height: 900px; border: 0; }</style></head>
+<body>
+<div id="tabsetMain"><tabs>
+__TABS__
+</tabs><contents>
+__CONTENTS__
+</contents></div>
+<script>
+// 点击标签页只切换显示的内容，不重新加载iframe
+var tabs = document.querySelectorAll('#tabsetMain > tabs > tab');
+var contents = document.querySelectorAll('#tabsetMain > contents > content');
+for (var i = 0; i < tabs.length; i++) {
+    tabs[i].addEventListener('click', function(e) {
+        for (var j = 0; j < tabs.length; j++) {
+            contents[j].style.display = tabs[j] === e.target ? '' : 'none';
+        }
+    });
+}
+</script>
+</body></html>
+"""
+
+FRAME_TAB = '<tab>__TITLE__</tab>'
+
+FRAME_CONTENT = '<content style="__STYLE__"><c-iframe><iframe src="__SRC__"></iframe></c-iframe></content>'
+
+# 主框架标签页标题
+PAGE_TITLES = {'home': '首页', '332': '订单配货', '3321': '波次配货'}
+
+HOME_PAGE = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>首页</title>__STYLE__</head>
+<body>
+<div id="app"><div><div>
+  <div></div><div></div><div></div><div></div><div></div>
+  <div>
+    <div>
+      <div>
+        <div>待办事项</div>
+        <div><ul><li>待打单 <strong id="orderCount">__ORDERS__</strong></li><li>待发货 <strong>0</strong></li></ul></div>
+      </div>
+      <div><i id="refreshButton">⟳</i></div>
+    </div>
+  </div>
+  <div></div>
+  <div id="adPopup" style="__AD_STYLE__"><div>广告 <i id="adClose">×</i></div></div>
+</div></div></div>
+__MASK__
+__COMMON__
+<script>
+document.getElementById('adClose').addEventListener('click', function() {
+    document.getElementById('adPopup').style.display = 'none';
+});
+document.getElementById('refreshButton').addEventListener('click', function() {
+    withMask(api('GET', '/api/order_count')).then(function(data) {
+        document.getElementById('orderCount').innerText = data.data.count;
+    });
+});
+</script>
+</body></html>
+"""
+
+ORDER_PAGE = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>订单配货</title>__STYLE__</head>
+<body>
+<div id="app"><div>
+  <div>
+    <div>
+      <div><div><button id="queryButton" type="button">查询</button><button type="button">重置</button></div></div>
+      <div id="add-guide-step3-box">
+        <div><button type="button" data-action="confirm_picking">确认配货</button></div>
+        <div></div><div></div><div></div><div></div>
+        <div><button type="button" data-action="get_express">取号打单</button></div>
+        <div></div><div></div>
+        <div><div><div><button type="button" data-action="print_picking">打配货单</button></div></div></div>
+      </div>
+    </div>
+    <div>
+      <div></div>
+      <div>
+        <div></div><div></div>
+        <div>
+          <div></div><div></div><div></div>
+          <div>
+            <div></div><div></div>
+            <div><div>共</div><div><span id="orderCount">0</span></div></div>
+          </div>
+        </div>
+      </div>
+    </div>
+  </div>
+  <div>
+    <div><div><div>
+      <div>
+        <div></div>
+        <div>
+          <div></div>
+          <div><div>
+            <div><table><thead><tr id="orderHead"><th>序号</th>
+              <th><div><span class="cb"><span><span id="checkAll" class="cb-inner"></span></span></span></div></th>
+              <th>订单号</th><th>状态</th></tr></thead></table></div>
+            <div><table><tbody id="orderBody"></tbody></table></div>
+          </div></div>
+        </div>
+      </div>
+    </div></div></div>
+  </div>
+</div></div>
+__PANEL__
+__MASK__
+__COMMON__
+<script>
+var head = document.getElementById('orderHead');
+var body = document.getElementById('orderBody');
+function render(data) {
+    var html = '';
+    for (var i = 0; i < data.orders.length; i++) {
+        var o = data.orders[i];
+        html += '<tr rowid="' + o.id + '"><td>' + (i + 1) + '</td>'
+              + '<td><div><span class="cb"><span></span><span class="cb-inner"></span></span></div></td>'
+              + '<td>' + o.id + '</td><td>' + o.status.join(',') + '</td></tr>';
+    }
+    body.innerHTML = html;
+    head.classList.remove('checked');
+    document.getElementById('orderCount').innerText = data.count;
+}
+function loadOrders() { return withMask(api('GET', '/api/orders')).then(render); }
+function selectedIds() {
+    var rows = body.querySelectorAll('tr.checked'), ids = [];
+    for (var i = 0; i < rows.length; i++) ids.push(rows[i].getAttribute('rowid'));
+    return ids;
+}
+document.getElementById('checkAll').addEventListener('click', function() {
+    var checked = head.classList.toggle('checked');
+    var rows = body.querySelectorAll('tr');
+    for (var i = 0; i < rows.length; i++) rows[i].classList.toggle('checked', checked);
+});
+body.addEventListener('click', function(e) {
+    if (e.target.classList.contains('cb-inner')) e.target.closest('tr').classList.toggle('checked');
+});
+document.getElementById('queryButton').addEventListener('click', loadOrders);
+var buttons = document.querySelectorAll('#add-guide-step3-box button[data-action]');
+for (var i = 0; i < buttons.length; i++) {
+    buttons[i].addEventListener('click', function(e) {
+        var action = e.target.getAttribute('data-action');
+        var task = runTask(e.target.innerText, 'POST', '/api/order/' + action, {ids: selectedIds()});
+        // 确认配货后订单离开列表
+        if (action === 'confirm_picking') task = task.then(loadOrders);
+        task.catch(function() {});
+    });
+}
+render(__ORDERS__);
+</script>
+</body></html>
+"""
+
+WAVE_BUTTON = '<div><div><div><button type="button" data-action="__ACTION__">__TEXT__</button></div></div></div>'
+
+WAVE_PAGE = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>波次配货</title>__STYLE__</head>
+<body>
+<div id="app"><div>
+  <div>
+    <div>
+      <div><div><button id="queryButton" type="button">查询</button><button type="button">重置</button></div></div>
+      <div id="add-guide-step3-box">
+        <div><button type="button" data-action="confirm_picking">确认配货</button></div>
+        <div><div><div><button id="createWave" type="button">生成波次</button></div></div></div>
+        __GENERATE_EXPRESS__
+        <div></div>
+        __PRINT_EXPRESS__
+        <div></div>
+        __PRINT_PICKING__
+      </div>
+    </div>
+    <div>
+      <div></div>
+      <div>
+        <div></div><div></div>
+        <div>
+          <div></div><div></div><div></div>
+          <div>
+            <div></div><div></div>
+            <div><div>共</div><div><span id="waveCount">0</span></div></div>
+          </div>
+        </div>
+      </div>
+    </div>
+  </div>
+  <div>
+    <div>
+      <div><div>
+        <div>
+          <div></div>
+          <div>
+            <div></div>
+            <div><div>
+              <div><table><thead><tr><th>序号</th><th></th><th>波次号</th><th>订单数</th><th>状态</th></tr></thead></table></div>
+              <div><table><tbody id="waveBody"></tbody></table></div>
+            </div></div>
+          </div>
+        </div>
+      </div></div>
+    </div>
+  </div>
+</div></div>
+__PANEL__
+<div id="createDialog" style="display: none">
+  <div>
+    <div>生成波次</div>
+    <div><table><tbody>__WAVE_TYPES__</tbody></table></div>
+    <div><div>
+      <div>按所选类型生成波次</div>
+      <div><button id="createWaveConfirm" type="button">生成波次</button><button id="createWaveCancel" type="button">取消</button></div>
+    </div></div>
+  </div>
+</div>
+__MASK__
+__COMMON__
+<script>
+var body = document.getElementById('waveBody');
+function render(data) {
+    var html = '';
+    for (var i = 0; i < data.waves.length; i++) {
+        var w = data.waves[i];
+        html += '<tr rowid="' + w.id + '"><td>' + (i + 1) + '</td>'
+              + '<td><div><span class="cb"><span></span><span class="cb-inner"></span></span></div></td>'
+              + '<td>' + w.id + '</td><td>' + w.orders + '</td><td>' + w.status.join(',') + '</td></tr>';
+    }
+    body.innerHTML = html;
+    document.getElementById('waveCount').innerText = data.count;
+}
+function loadWaves() { return withMask(api('GET', '/api/waves')).then(render); }
+function selectedIds() {
+    var rows = body.querySelectorAll('tr.checked'), ids = [];
+    for (var i = 0; i < rows.length; i++) ids.push(rows[i].getAttribute('rowid'));
+    return ids;
+}
+body.addEventListener('click', function(e) {
+    if (e.target.classList.contains('cb-inner')) e.target.closest('tr').classList.toggle('checked');
+});
+document.getElementById('queryButton').addEventListener('click', loadWaves);
+var dialog = document.getElementById('createDialog');
+document.getElementById('createWave').addEventListener('click', function() { dialog.style.display = 'block'; });
+document.getElementById('createWaveCancel').addEventListener('click', function() { dialog.style.display = 'none'; });
+dialog.addEventListener('click', function(e) {
+    var cell = e.target.closest('td[colid="col_76"]');
+    if (cell) cell.classList.toggle('checked');
+});
+document.getElementById('createWaveConfirm').addEventListener('click', function() {
+    var cells = dialog.querySelectorAll('td.checked'), types = [];
+    for (var i = 0; i < cells.length; i++) {
+        types.push(cells[i].closest('tr').getAttribute('rowid'));
+        cells[i].classList.remove('checked');
+    }
+    dialog.style.display = 'none';
+    runTask('生成波次', 'POST', '/api/wave/create', {types: types}).then(loadWaves, function() {});
+});
+var buttons = document.querySelectorAll('#add-guide-step3-box button[data-action]');
+for (var i = 0; i < buttons.length; i++) {
+    buttons[i].addEventListener('click', function(e) {
+        var action = e.target.getAttribute('data-action');
+        var task = runTask(e.target.innerText, 'POST', '/api/wave/' + action, {ids: selectedIds()});
+        // 确认配货后波次离开列表
+        if (action === 'confirm_picking') task = task.then(loadWaves);
+        task.catch(function() {});
+    });
+}
+render(__WAVES__);
+</script>
+</body></html>
+"""
+
+class MockErpState:
+    """模拟ERP的数据：登录会话、待打单数量和波次列表"""
+    def __init__(self, config):
+        self.config = config
+        self.lock = threading.Lock()
+        self.sessions = {}
+        self.reset()
+
+    def reset(self, orders=None):
+        """重置订单和波次数据"""
+        with self.lock:
+            self.orders = self.config['orders'] if orders is None else orders
+            self.order_status = {}  # 订单配货页面中订单的序号 -> 已执行的操作
+            self.waves = []
+            self.stats = {'waves_created': 0, 'waves_confirmed': 0, 'orders_confirmed': 0, 'failures': 0}
+
+    def login(self, username, password):
+        """校验账号密码，成功返回会话令牌"""
+        if username != self.config['username'] or password != self.config['password']:
+            return None
+        token = uuid.uuid4().hex
+        with self.lock:
+            self.sessions[token] = time.time()
+        return token
+
+    def is_valid(self, token):
+        """会话是否有效"""
+        with self.lock:
+            created = self.sessions.get(token)
+        if created is None:
+            return False
+        ttl = self.config['session_ttl']
+        return not ttl or time.time() - created < ttl
+
+    def expire_sessions(self):
+        """使全部登录会话失效"""
+        with self.lock:
+            self.sessions.clear()
+
+    def wave_list(self):
+        with self.lock:
+            waves = [{'id': w['id'], 'orders': w['orders'], 'status': sorted(w['status'])}
+                     for w in self.waves]
+        return {'count': len(waves), 'waves': waves}
+
+    def order_list(self):
+        """订单配货页面中的待打单订单（未生成波次的订单）"""
+        with self.lock:
+            orders = [{'id': f'DD{index + 1:06d}', 'status': sorted(self.order_status.get(index, ()))}
+                      for index in range(self.orders)]
+        return {'count': len(orders), 'orders': orders}
+
+    def create_waves(self, types):
+        """按所选类型把待打单订单生成为波次，返回生成的波次数"""
+        if not types:
+            raise ValueError("请选择波次类型")
+        with self.lock:
+            count = math.ceil(self.orders / self.config['orders_per_wave'])
+            for index in range(count):
+                orders = min(self.config['orders_per_wave'], self.orders)
+                self.orders -= orders
+                wave_id = str(random.randint(10 ** 17, 10 ** 18 - 1))
+                self.waves.append({'id': wave_id, 'orders': orders, 'status': set()})
+            self.order_status = {}
+            self.stats['waves_created'] += count
+        return count
+
+    def apply_action(self, action, ids):
+        """对所选波次执行操作，确认配货后波次离开列表"""
+        if not ids:
+            raise ValueError("请先勾选波次")
+        text, required = WAVE_ACTIONS[action]
+        with self.lock:
+            waves = {w['id']: w for w in self.waves}
+            missing = [wave_id for wave_id in ids if wave_id not in waves]
+            if missing:
+                raise ValueError(f"波次不存在: {', '.join(missing)}")
+            for wave_id in ids:
+                if required and required not in waves[wave_id]['status']:
+                    raise ValueError(f"波次{wave_id}未完成{WAVE_ACTIONS[required][0]}，不能{text}")
+            for wave_id in ids:
+                waves[wave_id]['status'].add(action)
+            if action == 'confirm_picking':
+                self.waves = [w for w in self.waves if w['id'] not in ids]
+                self.stats['waves_confirmed'] += len(ids)
+        return len(ids)
+
+    def apply_order_action(self, action, ids):
+        """对所选订单执行操作，确认配货后订单离开列表"""
+        if not ids:
+            raise ValueError("请先勾选订单")
+        text, required = ORDER_ACTIONS[action]
+        with self.lock:
+            indexes = []
+            for order_id in ids:
+                index = int(order_id[2:]) - 1 if order_id.startswith('DD') and order_id[2:].isdigit() else -1
+                if not 0 <= index < self.orders:
+                    raise ValueError(f"订单不存在: {order_id}")
+                if required and required not in self.order_status.get(index, ()):
+                    raise ValueError(f"订单{order_id}未完成{ORDER_ACTIONS[required][0]}，不能{text}")
+                indexes.append(index)
+            for index in indexes:
+                self.order_status.setdefault(index, set()).add(action)
+            if action == 'confirm_picking':
+                # 剩余订单重新编号
+                remaining = [status for index, status in sorted(self.order_status.items())
+                             if index not in indexes]
+                self.orders -= len(indexes)
+                self.order_status = dict(enumerate(remaining))
+                self.stats['orders_confirmed'] += len(indexes)
+        return len(ids)
+
+class MockErpHandler(BaseHTTPRequestHandler):
+    """模拟ERP请求处理"""
+    protocol_version = 'HTTP/1.1'
+
+    @property
+    def mock(self):
+        return self.server.mock
+
+    @property
+    def state(self):
+        return self.server.mock.state
+
+    def log_message(self, format, *args):
+        logger.debug(f"模拟ERP请求: {format % args}")
+
+    def delay(self, seconds):
+        """模拟网络和服务器延迟"""
+        if seconds > 0:
+            jitter = self.mock.config['jitter']
+            time.sleep(seconds * random.uniform(1 - jitter, 1 + jitter))
+
+    def session_token(self):
+        cookie = SimpleCookie(self.headers.get('Cookie', ''))
+        return cookie[SESSION_COOKIE].value if SESSION_COOKIE in cookie else None
+
+    def send_body(self, status, body, content_type='text/html; charset=utf-8', headers=None):
+        data = body.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(data)))
+        self.send_header('Cache-Control', 'no-store')
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def send_json(self, status, data, headers=None):
+        self.send_body(status, json.dumps(data, ensure_ascii=False),
+                       'application/json; charset=utf-8', headers)
+
+    def redirect(self, location):
+        self.send_response(302)
+        self.send_header('Location', location)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def read_json(self):
+        length = int(self.headers.get('Content-Length', 0))
+        if not length:
+            return {}
+        return json.loads(self.rfile.read(length).decode('utf-8'))
+
+    def do_GET(self):
+        path = urlparse(self.path).path
+        config = self.mock.config
+        if path == '/login':
+            self.delay(config['page_latency'])
+            return self.send_body(200, self.mock.render_login())
+        if path in ('/', '/favicon.ico'):
+            return self.redirect('/login') if path == '/' else self.send_body(404, '')
+
+        # 以下页面和接口需要登录
+        if not self.state.is_valid(self.session_token()):
+            return self.redirect('/login')
+        if path.startswith('/frame/'):
+            self.delay(config['page_latency'])
+            return self.send_body(200, self.mock.render_frame(path[len('/frame/'):]))
+        if path == '/inner/home':
+            self.delay(config['page_latency'])
+            return self.send_body(200, self.mock.render_home())
+        if path == '/inner/332':
+            self.delay(config['page_latency'])
+            return self.send_body(200, self.mock.render_orders())
+        if path == '/inner/3321':
+            self.delay(config['page_latency'])
+            return self.send_body(200, self.mock.render_waves())
+        if path == '/api/order_count':
+            self.delay(config['api_latency'])
+            return self.send_json(200, {'data': {'count': self.state.orders}})
+        if path == '/api/orders':
+            self.delay(config['api_latency'])
+            return self.send_json(200, self.state.order_list())
+        if path == '/api/waves':
+            self.delay(config['api_latency'])
+            return self.send_json(200, self.state.wave_list())
+        self.send_body(404, '页面不存在')
+
+    def do_POST(self):
+        path = urlparse(self.path).path
+        config = self.mock.config
+        try:
+            data = self.read_json()
+        except ValueError:
+            return self.send_json(400, {'message': '请求数据格式错误'})
+
+        if path == '/api/login':
+            self.delay(config['api_latency'])
+            token = self.state.login(data.get('username'), data.get('password'))
+            if not token:
+                return self.send_json(401, {'message': '用户名或密码错误'})
+            return self.send_json(200, {'message': '登录成功'},
+                                  {'Set-Cookie': f'{SESSION_COOKIE}={token}; Path=/; HttpOnly'})
+        if path == '/api/mock/reset':
+            self.state.reset(data.get('orders'))
+            return self.send_json(200, {'message': '已重置'})
+
+        if not self.state.is_valid(self.session_token()):
+            return self.send_json(401, {'message': '登录已过期'})
+        if path == '/api/wave/create':
+            return self.run_task(lambda: self.state.create_waves(data.get('types')), '生成波次')
+        if path.startswith('/api/order/') and path[len('/api/order/'):] in ORDER_ACTIONS:
+            action = path[len('/api/order/'):]
+            return self.run_task(lambda: self.state.apply_order_action(action, data.get('ids')),
+                                 ORDER_ACTIONS[action][0], '订单', config['order_task_latency'])
+        if path.startswith('/api/wave/') and path[len('/api/wave/'):] in WAVE_ACTIONS:
+            action = path[len('/api/wave/'):]
+            return self.run_task(lambda: self.state.apply_action(action, data.get('ids')),
+                                 WAVE_ACTIONS[action][0])
+        self.send_json(404, {'message': '接口不存在'})
+
+    def run_task(self, task, title, unit='波次', latency=None):
+        """执行后台任务：耗时与波次数（订单操作为订单数）成正比，并按配置随机失败"""
+        config = self.mock.config
+        latency = config['task_latency'] if latency is None else latency
+        try:
+            count = task()
+        except ValueError as e:
+            self.delay(config['api_latency'])
+            return self.send_json(400, {'message': str(e)})
+        self.delay(latency * max(count, 1))
+        if random.random() < config['failure_rate']:
+            with self.state.lock:
+                self.state.stats['failures'] += 1
+            return self.send_json(500, {'message': f"{title}失败：模拟服务器错误"})
+        self.send_json(200, {'message': f"{title}完成，共{count}个{unit}", 'count': count})
+
+class MockErpServer:
+    """模拟ERP服务器"""
+    def __init__(self, host=None, port=None, **options):
+        self.config = dict(MOCK_ERP_CONFIG)
+        self.config.update(options)
+        host = host or self.config['host']
+        port = self.config['port'] if port is None else port
+        self.state = MockErpState(self.config)
+        self.httpd = ThreadingHTTPServer((host, port), MockErpHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.mock = self
+        self.thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def render(self, template, **values):
+        page = template.replace('__STYLE__', PAGE_STYLE)
+        page = page.replace('__MASK__', MASK_HTML).replace('__COMMON__', COMMON_SCRIPT)
+        page = page.replace('__PANEL__', PANEL_HTML)
+        for name, value in values.items():
+            page = page.replace(f'__{name}__', str(value))
+        return page
+
+    def render_login(self):
+        qrcode = self.config['login_mode'] == 'qrcode'
+        return self.render(LOGIN_PAGE, LOGIN_TYPE='扫码登录' if qrcode else '账号登录',
+                           FORM_STYLE='display: none' if qrcode else '')
+
+    def render_frame(self, page):
+        # 首页标签页总是打开，其他页面在其后打开并显示
+        pages = ['home'] if page == 'home' else ['home', page]
+        tabs = [FRAME_TAB.replace('__TITLE__', PAGE_TITLES.get(name, name)) for name in pages]
+        contents = [FRAME_CONTENT.replace('__SRC__', f'/inner/{name}')
+                    .replace('__STYLE__', '' if name == page else 'display: none') for name in pages]
+        return (FRAME_PAGE.replace('__TABS__', '\n'.join(tabs))
+                .replace('__CONTENTS__', '\n'.join(contents)))
+
+    def render_home(self):
+        show_ad = random.random() < self.config['ad_rate']
+        return self.render(HOME_PAGE, ORDERS=self.state.orders,
+                           AD_STYLE='' if show_ad else 'display: none')
+
+    def render_orders(self):
+        return self.render(ORDER_PAGE, ORDERS=json.dumps(self.state.order_list(), ensure_ascii=False))
+
+    def render_waves(self):
+        def button(action):
+            return WAVE_BUTTON.replace('__ACTION__', action).replace('__TEXT__', WAVE_ACTIONS[action][0])
+        wave_types = ''.join(
+            f'<tr rowid="{rowid}"><td colid="col_75">{name}</td><td colid="col_76">□</td></tr>'
+            for rowid, name in WAVE_TYPES.items()
+        )
+        return self.render(WAVE_PAGE, GENERATE_EXPRESS=button('generate_express'),
+                           PRINT_EXPRESS=button('print_express'), PRINT_PICKING=button('print_picking'),
+                           WAVE_TYPES=wave_types,
+                           WAVES=json.dumps(self.state.wave_list(), ensure_ascii=False))
+
+    def start(self):
+        """在后台线程中启动服务器"""
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        logger.info(f"模拟ERP已启动: {self.base_url}")
+        return self
+
+    def serve_forever(self):
+        logger.info(f"模拟ERP已启动: {self.base_url}")
+        self.httpd.serve_forever()
+
+    def stop(self):
+        """停止服务器"""
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        logger.info("模拟ERP已停止")
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='模拟ERP服务器')
+    parser.add_argument('--host', default=MOCK_ERP_CONFIG['host'])
+    parser.add_argument('--port', type=int, default=MOCK_ERP_CONFIG['port'])
+    parser.add_argument('--orders', type=int, default=MOCK_ERP_CONFIG['orders'], help='初始待打单数量')
+    parser.add_argument('--page-latency', type=float, default=MOCK_ERP_CONFIG['page_latency'])
+    parser.add_argument('--api-latency', type=float, default=MOCK_ERP_CONFIG['api_latency'])
+    parser.add_argument('--task-latency', type=float, default=MOCK_ERP_CONFIG['task_latency'])
+    parser.add_argument('--failure-rate', type=float, default=MOCK_ERP_CONFIG['failure_rate'])
+    parser.add_argument('--session-ttl', type=float, default=MOCK_ERP_CONFIG['session_ttl'])
+    return parser.parse_args()
+
+if __name__ == '__main__':
+    args = parse_args()
+    server = MockErpServer(args.host, args.port, orders=args.orders,
+                           page_latency=args.page_latency, api_latency=args.api_latency,
+                           task_latency=args.task_latency, failure_rate=args.failure_rate,
+                           session_ttl=args.session_ttl)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
@@ -0,0 +1,120 @@
+"""
+多账号并行运行程序
+
+每个账号在独立的子进程中运行，拥有自己的浏览器配置文件、工作时间和订单阈值，
+全局并发上限控制同时执行任务的账号数，避免一台电脑负载过高。
+
+账号列表文件格式（accounts.json）:
+[
+    {
+        "name": "shop_a",
+        "username": "账号",
+        "password": "密码",
+        "start_time": "07:30",
+        "middle_time": "17:00",
+        "end_time": "17:30",
+        "thresholds": {"wave": 25}
+    }
+]
+"""
+import os
+import sys
+import json
+import multiprocessing
+from datetime import time as datetime_time
+
+from config import MULTI_ACCOUNT_CONFIG
+from logger import logger, application_path
+
+def parse_time(value, default):
+    """解析 HH:MM 格式的时间"""
+    if not value:
+        return default
+    hour, minute = value.split(':')
+    return datetime_time(int(hour), int(minute))
+
+def load_accounts(path=None):
+    """读取账号列表"""
+    path = path or os.path.join(application_path, MULTI_ACCOUNT_CONFIG['accounts_file'])
+    with open(path, 'r', encoding='utf-8') as f:
+        accounts = json.load(f)
+
+    names = set()
+    for account in accounts:
+        if not account.get('username') or not account.get('password'):
+            raise ValueError(f"账号配置缺少用户名或密码: {account.get('name', '')}")
+        account.setdefault('name', account['username'])
+        if account['name'] in names:
+            raise ValueError(f"账号名称重复: {account['name']}")
+        names.add(account['name'])
+    return accounts
+
+def run_account(account, semaphore, stop_event):
+    """子进程入口：按账号配置运行调度器"""
+    # 子进程中的配置互不影响
+    from config import ORDER_THRESHOLDS, time_config
+    from main import main as run_task
+    from session_manager import SessionManager
+    from scheduler import Scheduler
+    from tracing import tracer
+    from cancellation import cancel_token
+
+    name = account['name']
+    logger.configure(patcher=lambda record: record.update(message=f"[{name}] {record['message']}"))
+    tracer.configure(name)
+
+    time_config.update_times(
+        parse_time(account.get('start_time'), time_config.WORK_START_TIME),
+        parse_time(account.get('middle_time'), time_config.WORK_MIDDLE_TIME),
+        parse_time(account.get('end_time'), time_config.WORK_END_TIME)
+    )
+    ORDER_THRESHOLDS.update(account.get('thresholds', {}))
+    # 停止时正在执行的步骤也尽快退出
+    cancel_token.bind(stop_event)
+
+    def task(session):
+        # 全局并发上限：同一时间只允许有限个账号执行任务
+        with semaphore:
+            return run_task(session, account['username'], account['password'])
+
+    # 不保持备用浏览器：每个账号进程只占用一个浏览器，浏览器总数不超过账号数
+    session = SessionManager(profile_name=name, use_pool=False)
+    logger.info(f"账号进程已启动，工作时间 {time_config.WORK_START_TIME.strftime('%H:%M')} - "
+                f"{time_config.WORK_END_TIME.strftime('%H:%M')}")
+    try:
+        Scheduler(task, session, stop_event).run()
+    finally:
+        session.close()
+        logger.info("账号进程已退出")
+
+def run_all(accounts, max_concurrency=None):
+    """为每个账号启动一个子进程，并等待全部退出"""
+    max_concurrency = max_concurrency or MULTI_ACCOUNT_CONFIG['max_concurrency']
+    semaphore = multiprocessing.Semaphore(max_concurrency)
+    stop_event = multiprocessing.Event()
+
+    processes = []
+    for account in accounts:
+        process = multiprocessing.Process(target=run_account, args=(account, semaphore, stop_event),
+                                          name=f"account-{account['name']}")
+        process.start()
+        processes.append(process)
+    logger.info(f"已启动{len(processes)}个账号进程，并发上限{max_concurrency}")
+
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        logger.info("程序被手动停止，等待账号进程退出")
+        stop_event.set()
+        for process in processes:
+            process.join()
+
+if __name__ == '__main__':
+    multiprocessing.freeze_support()
+    try:
+        accounts = load_accounts(sys.argv[1] if len(sys.argv) > 1 else None)
+    except Exception as e:
+        logger.error(f"读取账号列表失败: {str(e)}")
+        sys.exit(1)
+    run_all(accounts)
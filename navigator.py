@@ -0,0 +1,192 @@
+"""
+ERP页面导航模块
+
+记录主文档当前加载的页面、主框架中激活的标签页和当前所在的iframe：
+已在目标页面时不重新加载；目标页面已在主框架的标签页中打开时点击标签页切换；
+各页面的iframe元素在本次页面加载中缓存，再次进入时不重新定位。
+"""
+from selenium.webdriver.common.by import By
+from selenium.common.exceptions import WebDriverException
+
+from config import URLS, WAIT_TIME, FRAME_CONFIG
+from logger import logger
+from tracing import tracer
+from step_engine import element_present, element_visible, url_contains, document_ready, any_of
+
+class SessionExpiredError(Exception):
+    """登录会话已过期（页面被重定向回登录页）"""
+    pass
+
+def strip_url(url):
+    """去掉URL中的锚点和查询参数"""
+    return url.split('#')[0].split('?')[0].rstrip('/')
+
+def page_name(url):
+    """返回URL对应的页面名称（URLS中的键），未知页面返回None"""
+    url = strip_url(url)
+    for name, page_url in URLS.items():
+        if url == page_url:
+            return name
+    return None
+
+class Navigator:
+    """ERP页面导航"""
+    def __init__(self, driver, steps, selectors):
+        self.driver = driver
+        self.steps = steps
+        self.selectors = selectors
+        self.reset()
+
+    def reset(self):
+        """清空导航状态，下次导航时重新加载页面"""
+        self.page = None        # 主文档当前加载的页面URL
+        self.loaded_url = None  # 主文档加载完成时的实际URL
+        self.tab = None         # 主框架中当前激活的标签页对应的页面URL
+        self.frame = None       # 当前所在的iframe对应的页面URL，None表示在主文档
+        self.frames = {}        # 页面URL -> iframe元素，只在本次页面加载中有效
+
+    @staticmethod
+    def iframe_xpath(url):
+        """返回页面在主框架中的iframe XPath"""
+        page = FRAME_CONFIG['pages'].get(page_name(url), {})
+        return page.get('iframe', FRAME_CONFIG['default_iframe'])
+
+    def goto(self, url, reload=False):
+        """导航到页面，ERP页面导航后进入其iframe
+
+        参数:
+            url: 目标页面URL
+            reload: 为True时总是重新加载（如需要确认登录会话仍然有效）
+        """
+        if URLS['login'] in url:
+            self.load(url)
+            return
+
+        if not reload and self.tab is not None and self.page_intact():
+            if self.tab == url:
+                if self.frame == url:
+                    logger.debug(f"已在目标页面，跳过导航: {url}")
+                self.enter_frame(url)
+                return
+            if self.switch_tab(url):
+                return
+
+        self.load(url)
+        self.enter_frame(url)
+
+    def page_intact(self):
+        """检查主文档仍是上次加载的页面（只需一次浏览器调用）
+
+        页面已被重定向回登录页时抛出SessionExpiredError。
+        """
+        current_url = self.driver.current_url
+        if URLS['login'] in current_url:
+            self.reset()
+            raise SessionExpiredError("登录会话已过期，页面被重定向到登录页")
+        if strip_url(current_url) != self.loaded_url:
+            logger.info("页面已变化，重新加载")
+            self.reset()
+            return False
+        return True
+
+    def load(self, url):
+        """重新加载页面"""
+        self.leave_frame()
+        self.reset()
+        # 页面重新加载后缓存的元素全部失效
+        self.selectors.invalidate()
+        if URLS['login'] in url:
+            self.steps.run('page_load', lambda: self.driver.get(url),
+                           until=document_ready(), timeout=WAIT_TIME['long'])
+        else:
+            # 页面加载完成的标志：iframe出现，或被重定向回登录页
+            self.steps.run('page_load', lambda: self.driver.get(url),
+                           until=any_of(element_present(self.iframe_xpath(url)),
+                                        url_contains(URLS['login'])),
+                           timeout=WAIT_TIME['long'])
+            # 被重定向回登录页，说明登录会话已过期
+            if URLS['login'] in self.driver.current_url:
+                raise SessionExpiredError("登录会话已过期，页面被重定向到登录页")
+            self.tab = url
+        self.page = url
+        self.loaded_url = strip_url(self.driver.current_url)
+
+    def switch_tab(self, url):
+        """目标页面已在主框架的标签页中打开时点击标签页切换
+
+        返回:
+            bool: 切换成功返回True，标签页未打开返回False
+        """
+        title = FRAME_CONFIG['pages'].get(page_name(url), {}).get('tab')
+        if not title:
+            return False
+        self.leave_frame()
+        tabs = self.driver.find_elements(By.XPATH, FRAME_CONFIG['tab_xpath'].format(title=title))
+        if not tabs:
+            return False
+        try:
+            self.steps.run('switch_tab', tabs[0].click, until=element_visible(self.iframe_xpath(url)),
+                           timeout=WAIT_TIME['medium'])
+        except Exception as e:
+            logger.info(f"切换标签页失败，重新加载页面: {str(e)}")
+            return False
+        logger.info(f"切换到已打开的标签页: {title}")
+        self.tab = url
+        self.enter_frame(url)
+        return True
+
+    def enter_frame(self, url):
+        """进入页面的iframe，优先使用缓存的iframe元素"""
+        if self.frame == url:
+            return
+        with tracer.span('switch_to_iframe'):
+            self.leave_frame()
+            element = self.frames.get(url)
+            if element is not None:
+                try:
+                    self.driver.switch_to.frame(element)
+                    self.frame = url
+                    return
+                except WebDriverException:
+                    # iframe已被移除或重新创建，重新定位
+                    self.frames.pop(url, None)
+                    self.driver.switch_to.default_content()
+
+            try:
+                xpath = self.iframe_xpath(url)
+                found = {}
+
+                def entered(driver):
+                    element = driver.find_element(By.XPATH, xpath)
+                    driver.switch_to.frame(element)
+                    found['element'] = element
+                    return True
+
+                self.steps.run('iframe_load', until=entered, timeout=WAIT_TIME['medium'])
+                # 等待iframe文档加载完成，并安装网络请求计数钩子
+                self.steps.run('iframe_ready', until=document_ready(), timeout=WAIT_TIME['medium'])
+                self.steps.install_network_hook()
+            except Exception as e:
+                logger.error(f"切换iframe失败: {str(e)}")
+                raise
+            self.frames[url] = found['element']
+            self.frame = url
+            # 新定位的iframe可能已重新加载
+            self.selectors.invalidate()
+            logger.info("切换iframe成功")
+
+    def refresh_frame(self):
+        """重新定位并进入当前页面的iframe（iframe元素可能已失效）"""
+        url = self.frame or self.tab
+        if url is None:
+            return
+        self.leave_frame()
+        self.frames.pop(url, None)
+        self.enter_frame(url)
+
+    def leave_frame(self):
+        """切换回主文档"""
+        if self.frame is not None:
+            self.driver.switch_to.default_content()
+            self.frame = None
+            logger.info("切换回主文档")
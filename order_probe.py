@@ -0,0 +1,69 @@
+"""
+待打单数量接口查询模块
+"""
+import requests
+from requests.adapters import HTTPAdapter
+
+from config import URLS, ORDER_PROBE
+from logger import logger
+
+class OrderCountProbe:
+    """复用浏览器登录Cookie，通过HTTP接口直接查询待打单数量"""
+    def __init__(self):
+        # 使用连接池复用与ERP的连接
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=2, max_retries=0)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.synced = False
+
+    def is_enabled(self):
+        """是否配置了数据接口"""
+        return bool(ORDER_PROBE['url'])
+
+    def sync_cookies(self, driver):
+        """从浏览器同步登录Cookie和User-Agent"""
+        self.session.cookies.clear()
+        for cookie in driver.get_cookies():
+            self.session.cookies.set(cookie['name'], cookie['value'],
+                                     domain=cookie.get('domain'), path=cookie.get('path', '/'))
+        self.session.headers['User-Agent'] = driver.execute_script('return navigator.userAgent')
+        self.session.headers['Referer'] = URLS['home']
+        self.synced = True
+
+    def query(self):
+        """请求数据接口并返回待打单数量"""
+        if ORDER_PROBE['method'].upper() == 'POST':
+            response = self.session.post(ORDER_PROBE['url'], json=ORDER_PROBE['params'],
+                                         timeout=ORDER_PROBE['timeout'], allow_redirects=False)
+        else:
+            response = self.session.get(ORDER_PROBE['url'], params=ORDER_PROBE['params'],
+                                        timeout=ORDER_PROBE['timeout'], allow_redirects=False)
+        # 登录失效时接口会重定向到登录页
+        if response.status_code != 200:
+            raise ValueError(f"接口返回状态码 {response.status_code}")
+
+        value = response.json()
+        for key in ORDER_PROBE['count_field'].split('.'):
+            if isinstance(value, list):
+                value = value[int(key)]
+            elif isinstance(value, dict) and key in value:
+                value = value[key]
+            else:
+                raise ValueError(f"接口返回数据中没有字段 {ORDER_PROBE['count_field']}")
+        return int(value)
+
+    def get_count(self, driver):
+        """查询待打单数量，失败时同步一次Cookie后重试"""
+        if not self.synced:
+            self.sync_cookies(driver)
+        try:
+            return self.query()
+        except Exception as e:
+            logger.info(f"接口查询失败，同步登录Cookie后重试: {str(e)}")
+            self.sync_cookies(driver)
+            return self.query()
+
+    def close(self):
+        """关闭连接池"""
+        self.session.close()
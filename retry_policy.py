@@ -0,0 +1,71 @@
+"""
+步骤重试策略模块
+
+每个步骤可以声明重试策略：最多尝试次数、退避时间（带随机抖动）、重试前的恢复操作
+（重新切换iframe或重新加载页面），以及步骤的操作能否重复执行。
+不能重复执行的步骤（如生成快递单、打印）只在操作还未执行时重试操作，
+操作已执行时只重新等待完成条件。
+每个周期的重试次数有总上限，ERP整体变慢时不会反复重试。
+"""
+import random
+import threading
+
+from config import RETRY_CONFIG, RETRY_POLICIES
+from logger import logger
+
+class RetryPolicy:
+    """单个步骤的重试策略"""
+    def __init__(self, attempts=1, backoff=None, max_backoff=None, jitter=None, recover=None,
+                 idempotent=True):
+        """
+        参数:
+            attempts: 最多尝试次数（1表示不重试）
+            backoff: 第一次重试前的等待时间（秒），之后按指数增长
+            max_backoff: 最长等待时间（秒）
+            jitter: 等待时间的随机抖动比例
+            recover: 重试前的恢复操作，'reswitch'重新切换iframe，'renavigate'重新加载页面
+            idempotent: 操作能否重复执行
+        """
+        self.attempts = attempts
+        self.backoff = RETRY_CONFIG['backoff'] if backoff is None else backoff
+        self.max_backoff = RETRY_CONFIG['max_backoff'] if max_backoff is None else max_backoff
+        self.jitter = RETRY_CONFIG['jitter'] if jitter is None else jitter
+        self.recover = recover
+        self.idempotent = idempotent
+
+    def delay(self, attempt):
+        """第attempt次失败后的等待时间"""
+        delay = min(self.backoff * 2 ** (attempt - 1), self.max_backoff)
+        return delay * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+def retry_policy(name):
+    """返回步骤的重试策略，未配置的步骤不重试"""
+    return RetryPolicy(**RETRY_POLICIES.get(name, {}))
+
+class RetryBudget:
+    """每个周期的重试次数上限（所有步骤共用）"""
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """开始新周期时恢复重试次数"""
+        with self.lock:
+            self.remaining = RETRY_CONFIG['cycle_budget']
+            self.used = 0
+            self.exhausted = False
+
+    def take(self):
+        """占用一次重试，次数已用完返回False"""
+        with self.lock:
+            if self.remaining <= 0:
+                if not self.exhausted:
+                    self.exhausted = True
+                    logger.warning(f"本周期已重试{self.used}次，达到上限，不再重试")
+                return False
+            self.remaining -= 1
+            self.used += 1
+            return True
+
+# 创建全局实例
+retry_budget = RetryBudget()
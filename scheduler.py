@@ -0,0 +1,92 @@
+"""
+任务调度模块
+"""
+import random
+from datetime import datetime, timedelta
+
+from config import SCHEDULE_CONFIG, time_config
+from logger import logger
+from cancellation import cancel_token, CancelledError
+
+class Scheduler:
+    """自适应任务调度器
+
+    非工作时间一直休眠到下一个开始时间；工作时间内按较短间隔查询待打单数量，
+    订单达到阈值或过了截单时间立即执行任务；任务失败后按指数退避加随机抖动等待，
+    因浏览器崩溃失败时换上备用浏览器后立即重试。
+    """
+    def __init__(self, task, session, stop_event=None):
+        """
+        参数:
+            task: 每个周期执行的任务，接收session，成功返回True，失败返回False
+            session: 跨周期复用的浏览器会话
+            stop_event: 设置后调度器尽快退出，默认使用全局取消标记的事件
+        """
+        self.task = task
+        self.session = session
+        self.stop_event = stop_event or cancel_token.event
+        self.failures = 0
+
+    def is_work_time(self, now):
+        """判断是否在工作时间内"""
+        return time_config.WORK_START_TIME <= now.time() <= time_config.WORK_END_TIME
+
+    def next_work_start(self, now):
+        """返回下一个工作开始时间"""
+        start = datetime.combine(now.date(), time_config.WORK_START_TIME)
+        if now >= start:
+            start += timedelta(days=1)
+        return start
+
+    def backoff_delay(self):
+        """失败后的等待时间（指数退避加随机抖动）"""
+        delay = min(SCHEDULE_CONFIG['backoff_base'] * 2 ** (self.failures - 1),
+                    SCHEDULE_CONFIG['backoff_max'])
+        jitter = SCHEDULE_CONFIG['jitter']
+        return delay * random.uniform(1 - jitter, 1 + jitter)
+
+    def tick(self):
+        """执行一次调度，返回距下一次调度的秒数"""
+        now = datetime.now()
+        if not self.is_work_time(now):
+            # 非工作时间释放浏览器，一直休眠到下一个开始时间
+            self.session.close()
+            start = self.next_work_start(now)
+            logger.info(f"当前不是工作时间，休眠至 {start.strftime('%Y-%m-%d %H:%M')}")
+            return (start - now).total_seconds()
+
+        success = self.task(self.session)
+        crashed = self.session.take_crashed()
+        if success:
+            self.failures = 0
+            return SCHEDULE_CONFIG['poll_interval']
+
+        self.failures += 1
+        if crashed and self.failures == 1:
+            # 浏览器崩溃时已换上备用浏览器，不必等待退避时间；连续失败时仍按退避等待
+            delay = SCHEDULE_CONFIG['crash_retry_delay']
+            logger.warning(f"浏览器崩溃，已切换到备用浏览器，{delay}秒后重试")
+            return delay
+
+        delay = self.backoff_delay()
+        logger.warning(f"任务连续失败{self.failures}次，{delay:.0f}秒后重试")
+        return delay
+
+    def run(self):
+        """持续调度，直到stop_event被设置"""
+        while not self.stop_event.is_set():
+            try:
+                delay = self.tick()
+            except CancelledError:
+                logger.info("任务已停止")
+                return
+            except Exception as e:
+                logger.error(f"调度执行异常: {str(e)}")
+                self.failures += 1
+                delay = self.backoff_delay()
+            # 可被stop_event立即打断的等待
+            self.stop_event.wait(max(delay, 0))
+
+    def stop(self):
+        """通知调度器退出"""
+        self.stop_event.set()
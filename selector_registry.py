@@ -0,0 +1,107 @@
+"""
+元素选择器注册表
+
+每个逻辑元素（如 'wave.print_picking'）对应一组按顺序尝试的定位策略：
+以ID或数据属性为锚点的CSS选择器、按文字匹配，最后是SELECTORS中的绝对XPath。
+记录本次页面加载中命中的策略，下次优先尝试；页面重新加载后重新选择。
+"""
+from config import SELECTORS, SELECTOR_STRATEGIES
+from logger import logger
+
+# 在浏览器内测量每个定位方式的执行耗时
+BENCHMARK_SCRIPT = """
+var locators = arguments[0], repeat = arguments[1], results = [];
+for (var i = 0; i < locators.length; i++) {
+    var l = locators[i], found = false, start = performance.now();
+    for (var n = 0; n < repeat; n++) {
+        var el = l.type === 'css' ? document.querySelector(l.value)
+            : document.evaluate(l.value, document, null,
+                  XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+        found = !!el;
+    }
+    results.push({found: found, ms: (performance.now() - start) / repeat});
+}
+return results;
+"""
+
+def text_xpath(tag, text, scope=''):
+    """生成按文字精确匹配的XPath，scope为容器的XPath"""
+    return f"{scope}//{tag}[normalize-space(.)='{text}']"
+
+class SelectorRegistry:
+    """元素选择器注册表"""
+    def __init__(self, driver):
+        self.driver = driver
+        self.winners = {}   # 逻辑元素 -> 本次页面加载中命中的策略序号
+
+    @staticmethod
+    def is_key(target):
+        """判断是否为注册的逻辑元素名（'分组.名称'）"""
+        if '.' not in target or target.startswith(('/', '(')):
+            return False
+        section, name = target.split('.', 1)
+        return name in SELECTORS.get(section, {})
+
+    @staticmethod
+    def strategies(key):
+        """返回逻辑元素的全部定位方式，每项为 {'type': 'css'|'xpath', 'value': ...}"""
+        section, name = key.split('.', 1)
+        locators = []
+        for strategy in SELECTOR_STRATEGIES.get(key, []):
+            if strategy[0] == 'css':
+                locators.append({'type': 'css', 'value': strategy[1]})
+            elif strategy[0] == 'text':
+                locators.append({'type': 'xpath', 'value': text_xpath(*strategy[1:])})
+            else:
+                locators.append({'type': 'xpath', 'value': strategy[1]})
+        # 绝对XPath作为最后的备选
+        locators.append({'type': 'xpath', 'value': SELECTORS[section][name]})
+        return locators
+
+    def locators(self, target):
+        """返回定位方式列表，上次命中的策略排在最前
+
+        target可以是逻辑元素名，也可以是XPath。
+        """
+        if not self.is_key(target):
+            return [{'type': 'xpath', 'value': target}]
+        locators = self.strategies(target)
+        winner = self.winners.get(target)
+        if winner is not None and winner < len(locators):
+            locators.insert(0, locators.pop(winner))
+        return locators
+
+    def remember(self, target, index):
+        """记录命中的策略（index为locators()返回列表中的序号）"""
+        if index is None or index < 0 or not self.is_key(target):
+            return
+        locator = self.locators(target)[index]
+        self.winners[target] = self.strategies(target).index(locator)
+
+    def invalidate(self):
+        """页面或iframe文档重新加载后清空命中的策略"""
+        self.winners.clear()
+
+    def benchmark(self, keys=None, repeat=20):
+        """测量每个逻辑元素各定位方式的执行耗时
+
+        返回:
+            list: 每项为 {'key', 'type', 'value', 'found', 'ms'}
+        """
+        keys = keys or [f"{section}.{name}" for section in SELECTORS for name in SELECTORS[section]]
+        report = []
+        for key in keys:
+            locators = self.strategies(key)
+            results = self.driver.execute_script(BENCHMARK_SCRIPT, locators, repeat)
+            for locator, result in zip(locators, results):
+                report.append({'key': key, 'type': locator['type'], 'value': locator['value'],
+                               'found': result['found'], 'ms': round(result['ms'], 4)})
+        return report
+
+    def log_benchmark(self, keys=None, repeat=20):
+        """测量定位耗时并输出到日志"""
+        report = self.benchmark(keys, repeat)
+        for row in report:
+            status = "命中" if row['found'] else "未找到"
+            logger.info(f"{row['key']:<24} {row['type']:<5} {row['ms']:>8.4f}ms {status}  {row['value']}")
+        return report
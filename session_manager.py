@@ -0,0 +1,95 @@
+"""
+浏览器会话管理模块
+"""
+from driver_pool import DriverPool
+from logger import logger
+
+class SessionManager:
+    """浏览器会话管理类，跨调度周期复用同一个浏览器和登录状态
+
+    浏览器由驱动池提供，当前浏览器崩溃时换上已启动的备用浏览器。
+    """
+    def __init__(self, profile_name='default', use_pool=None):
+        """
+        参数:
+            profile_name: 浏览器配置文件名称
+            use_pool: 是否保持备用浏览器，为None时使用配置
+        """
+        self.profile_name = profile_name
+        self.pool = DriverPool(profile_name, enabled=use_pool)
+        self.automation = None
+        self.username = None
+        self.logged_in = False
+        self.crashed = False
+
+    def acquire(self, username, password):
+        """获取一个已登录的自动化实例
+
+        浏览器不存在或已崩溃时换上备用浏览器，登录会话过期时重新登录，
+        其余情况直接复用上一周期的浏览器。
+
+        返回:
+            WebAutomation: 登录成功返回自动化实例，登录失败返回None
+        """
+        # 浏览器已崩溃或被手动关闭，换上备用浏览器
+        if self.automation and not self.automation.is_alive():
+            logger.warning("浏览器已失效，切换浏览器")
+            self.reset()
+
+        if self.automation is None:
+            self.automation = self.pool.acquire()
+            self.logged_in = False
+
+        # 切换了账号需要重新登录
+        if self.logged_in and username != self.username:
+            logger.info("登录账号已变更，重新登录")
+            self.logged_in = False
+
+        if self.logged_in:
+            # 配置了数据接口时由接口查询确认登录有效（失效时回退到重新加载首页），
+            # 每次轮询不必重新加载页面
+            if self.automation.order_probe.is_enabled():
+                logger.debug("复用已登录的浏览器会话")
+                return self.automation
+            if self.automation.check_session():
+                logger.info("复用已登录的浏览器会话")
+                return self.automation
+            logger.info("登录会话已过期，重新登录")
+            self.logged_in = False
+
+        if not self.automation.login(username, password):
+            return None
+
+        self.logged_in = True
+        self.username = username
+        return self.automation
+
+    def attach(self, automation):
+        """使用已启动的浏览器（如预启动的浏览器），下次获取时在其中登录"""
+        self.reset()
+        self.pool.adopt(automation)
+        self.automation = automation
+        self.logged_in = False
+
+    def reset(self):
+        """回收当前浏览器，下次获取时换上备用浏览器
+
+        记录浏览器是否已崩溃，调度器据此立即重试而不必等待退避时间。
+        """
+        if self.automation:
+            self.crashed = not self.automation.is_alive()
+            self.pool.release(self.automation)
+        self.automation = None
+        self.logged_in = False
+
+    def take_crashed(self):
+        """返回上次回收的浏览器是否已崩溃，并清除该标记"""
+        crashed, self.crashed = self.crashed, False
+        return crashed
+
+    def close(self):
+        """关闭会话，释放浏览器和备用浏览器"""
+        if self.automation:
+            logger.info("关闭浏览器会话")
+        self.pool.close()
+        self.reset()
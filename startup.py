@@ -0,0 +1,107 @@
+"""
+启动加速模块
+
+界面只依赖Qt和配置即可显示，Selenium等较重的模块在后台线程中导入；
+用户填写表单时在后台预先启动chromedriver和浏览器，点击启动后直接开始登录。
+同时记录启动各阶段的耗时。
+"""
+import time
+import threading
+
+from config import STARTUP_CONFIG, BROWSER_CONFIG, CANCEL_CONFIG
+from logger import logger
+from cancellation import cancel_token
+
+class StartupProfiler:
+    """记录启动各阶段距程序启动的耗时"""
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.marks = {}
+
+    def set_start(self, start):
+        """设置程序启动的时间点（time.perf_counter()），如入口文件第一行记录的时间"""
+        self.start = start
+
+    def mark(self, name, description, at=None):
+        """记录一个阶段，每个阶段只记录第一次
+
+        参数:
+            at: 阶段完成的时间点（time.perf_counter()），为None时取当前时间
+        """
+        if name in self.marks:
+            return
+        elapsed = (at if at is not None else time.perf_counter()) - self.start
+        self.marks[name] = elapsed
+        logger.info(f"启动耗时 - {description}: {elapsed:.2f}秒")
+
+class BrowserPrewarmer:
+    """后台预先启动浏览器"""
+    def __init__(self):
+        self.thread = None
+        self.automation = None
+        self.headless = None
+        self.cancelled = False
+        self.lock = threading.Lock()
+
+    def start(self, profile_name='default'):
+        """在后台线程中导入自动化模块并启动浏览器"""
+        if not STARTUP_CONFIG['prewarm_browser'] or self.thread is not None:
+            return
+        self.headless = BROWSER_CONFIG['headless']
+        self.cancelled = False
+        self.thread = threading.Thread(target=self.run, args=(profile_name,),
+                                       name='browser-prewarm', daemon=True)
+        self.thread.start()
+
+    def run(self, profile_name):
+        try:
+            from web_automation import WebAutomation
+            from browser_profile import BrowserProfile
+            startup_profiler.mark('modules_loaded', "自动化模块加载完成")
+            automation = WebAutomation(BrowserProfile(profile_name))
+            with self.lock:
+                if not self.cancelled:
+                    self.automation, automation = automation, None
+            # 预启动期间已放弃使用（如窗口已关闭），直接关闭浏览器
+            if automation is not None:
+                automation.close()
+                return
+            startup_profiler.mark('browser_ready', "浏览器预启动完成")
+        except Exception as e:
+            logger.warning(f"浏览器预启动失败，将在启动任务时重新启动: {str(e)}")
+
+    def take(self):
+        """取出预启动的浏览器（在工作线程中调用，会等待预启动完成）
+
+        无头模式设置已变更或浏览器已失效时关闭它并返回None；等待期间停止程序时返回None。
+        """
+        if self.thread is None:
+            return None
+        deadline = time.monotonic() + STARTUP_CONFIG['prewarm_timeout']
+        while (self.thread.is_alive() and time.monotonic() < deadline
+               and not cancel_token.is_cancelled()):
+            self.thread.join(CANCEL_CONFIG['check_interval'])
+        with self.lock:
+            automation, self.automation = self.automation, None
+            self.cancelled = True
+        self.thread = None
+        if automation is None:
+            return None
+        if self.headless != BROWSER_CONFIG['headless'] or not automation.is_alive():
+            logger.info("浏览器设置已变更，重新启动浏览器")
+            automation.close()
+            return None
+        return automation
+
+    def discard(self):
+        """关闭未使用的预启动浏览器"""
+        with self.lock:
+            automation, self.automation = self.automation, None
+            self.cancelled = True
+        self.thread = None
+        if automation is not None:
+            automation.close()
+
+# 创建全局实例
+startup_profiler = StartupProfiler()
+browser_prewarmer = BrowserPrewarmer()
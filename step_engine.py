@@ -0,0 +1,202 @@
+"""
+步骤执行引擎
+
+每个操作（点击、导航、切换iframe）声明表示完成的条件，
+引擎在截止时间内轮询该条件，条件满足立即返回，不再固定等待。
+步骤开始时和每次轮询时检查是否已停止程序。
+"""
+import time
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.common.exceptions import (TimeoutException, NoSuchElementException,
+                                        StaleElementReferenceException, NoSuchFrameException,
+                                        ElementNotInteractableException,
+                                        ElementClickInterceptedException)
+
+from config import WAIT_TIME
+from logger import logger
+from latency_tracker import latency_tracker
+from tracing import tracer
+from cancellation import cancel_token
+from retry_policy import retry_policy, retry_budget
+
+# 拦截XHR和fetch，统计页面中未完成的网络请求数
+NETWORK_HOOK_SCRIPT = """
+if (window.__autoPrintPending === undefined) {
+    window.__autoPrintPending = 0;
+    var open = XMLHttpRequest.prototype.open;
+    XMLHttpRequest.prototype.open = function() {
+        this.addEventListener('loadend', function() { window.__autoPrintPending--; });
+        return open.apply(this, arguments);
+    };
+    var send = XMLHttpRequest.prototype.send;
+    XMLHttpRequest.prototype.send = function() {
+        window.__autoPrintPending++;
+        return send.apply(this, arguments);
+    };
+    if (window.fetch) {
+        var fetch = window.fetch;
+        window.fetch = function() {
+            window.__autoPrintPending++;
+            return fetch.apply(this, arguments).finally(function() { window.__autoPrintPending--; });
+        };
+    }
+}
+"""
+
+# 查询页面是否空闲：文档加载完成、没有未完成请求、没有可见的加载遮罩
+PAGE_IDLE_SCRIPT = """
+if (document.readyState !== 'complete') return false;
+if (window.__autoPrintPending > 0) return false;
+var masks = document.querySelectorAll(arguments[0]);
+for (var i = 0; i < masks.length; i++) {
+    if (masks[i].offsetParent !== null) return false;
+}
+return true;
+"""
+
+# 可以通过重试恢复的异常（页面渲染慢、元素被遮挡或重新渲染）
+RETRYABLE_ERRORS = (TimeoutException, NoSuchElementException, StaleElementReferenceException,
+                    NoSuchFrameException, ElementNotInteractableException,
+                    ElementClickInterceptedException)
+
+# 加载遮罩的CSS选择器
+LOADING_MASK_SELECTOR = '.el-loading-mask, [class*="loading-mask"]'
+
+def element_present(xpath):
+    """元素出现在DOM中"""
+    return EC.presence_of_element_located((By.XPATH, xpath))
+
+def element_visible(xpath):
+    """元素出现在DOM中且可见"""
+    return EC.visibility_of_element_located((By.XPATH, xpath))
+
+def element_clickable(xpath):
+    """元素可见且可点击"""
+    return EC.element_to_be_clickable((By.XPATH, xpath))
+
+def element_gone(xpath):
+    """元素消失或不可见（如弹窗关闭）"""
+    return EC.invisibility_of_element_located((By.XPATH, xpath))
+
+def url_contains(fragment):
+    """当前URL包含指定片段"""
+    return EC.url_contains(fragment)
+
+def url_not_contains(fragment):
+    """当前URL不再包含指定片段"""
+    return lambda driver: fragment not in driver.current_url
+
+def document_ready():
+    """当前文档加载完成"""
+    return lambda driver: driver.execute_script('return document.readyState') == 'complete'
+
+def page_idle(quiet=0.5):
+    """页面空闲并持续quiet秒（没有未完成的请求和加载遮罩）"""
+    state = {'since': None}
+
+    def condition(driver):
+        if not driver.execute_script(PAGE_IDLE_SCRIPT, LOADING_MASK_SELECTOR):
+            state['since'] = None
+            return False
+        if state['since'] is None:
+            state['since'] = time.monotonic()
+        return time.monotonic() - state['since'] >= quiet
+    return condition
+
+def any_of(*conditions):
+    """任一条件满足"""
+    return EC.any_of(*conditions)
+
+def all_of(*conditions):
+    """所有条件同时满足"""
+    return EC.all_of(*conditions)
+
+class StepEngine:
+    """步骤执行引擎"""
+    def __init__(self, driver, poll=WAIT_TIME['poll']):
+        self.driver = driver
+        self.poll = poll
+        self.recover = None  # 重试前的恢复操作，接收恢复方式（'reswitch'或'renavigate'）
+
+    def run(self, name, action=None, until=None, timeout=None, units=1):
+        """执行一个步骤：先执行动作，再轮询等待完成条件
+
+        失败时按步骤的重试策略重试（见RETRY_POLICIES）：不能重复执行的操作已执行时
+        只重新等待完成条件，操作执行了一部分时不重试。
+
+        参数:
+            name: 步骤名称
+            action: 要执行的操作，可为None（仅等待条件）
+            until: 表示步骤完成的条件，接收driver返回真值
+            timeout: 等待条件的默认截止时间（秒），有足够历史耗时后自动调整
+            units: 批量步骤处理的单位数（如波次数），耗时按单位记录，超时时间按单位数放大
+        返回:
+            action的返回值
+        """
+        cancel_token.check()
+        # 根据历史耗时调整超时时间
+        timeout = latency_tracker.timeout_for(name, timeout or WAIT_TIME['medium'], units)
+        policy = retry_policy(name)
+        with tracer.span(f"step.{name}", timeout=round(timeout, 2)) as span:
+            result = None
+            performed = False
+            attempt = 1
+            while True:
+                start = time.monotonic()
+                waiting = False
+                try:
+                    if action is not None and (policy.idempotent or not performed):
+                        result = action()
+                        performed = True
+                    if until is not None:
+                        waiting = True
+                        self.wait(until, timeout, name)
+                    break
+                except RETRYABLE_ERRORS as e:
+                    if waiting and isinstance(e, TimeoutException):
+                        # 超时也计入耗时，ERP变慢时超时会随之放宽
+                        latency_tracker.record(name, (time.monotonic() - start) / units)
+                    # 操作超时说明元素未就绪、操作未执行；其他异常时不能重复的操作可能已执行了一部分
+                    safe = policy.idempotent or waiting or isinstance(e, TimeoutException)
+                    if not safe or attempt >= policy.attempts or not retry_budget.take():
+                        raise
+                    delay = policy.delay(attempt)
+                    logger.warning(f"步骤[{name}]第{attempt}次失败，{delay:.1f}秒后重试: {str(e).strip()}")
+                    cancel_token.sleep(delay)
+                    if policy.recover and self.recover and (policy.idempotent or not performed):
+                        self.recover(policy.recover)
+                    attempt += 1
+            elapsed = time.monotonic() - start
+            latency_tracker.record(name, elapsed / units)
+            if attempt > 1:
+                span.set(attempts=attempt)
+                logger.info(f"步骤[{name}]第{attempt}次尝试成功")
+            logger.debug(f"步骤[{name}]完成，耗时{elapsed:.2f}秒")
+            return result
+
+    def wait(self, condition, timeout=None, name='wait'):
+        """在截止时间内轮询条件，返回条件的结果"""
+        if timeout is None:
+            timeout = WAIT_TIME['medium']
+
+        def cancellable(driver):
+            # 每次轮询前检查是否已停止程序，保护区内不中断
+            cancel_token.check()
+            return condition(driver)
+
+        try:
+            return WebDriverWait(
+                self.driver, timeout, poll_frequency=self.poll,
+                ignored_exceptions=(NoSuchElementException, StaleElementReferenceException)
+            ).until(cancellable)
+        except TimeoutException:
+            raise TimeoutException(f"步骤[{name}]在{timeout}秒内未完成")
+
+    def install_network_hook(self):
+        """在当前文档中安装网络请求计数钩子"""
+        try:
+            self.driver.execute_script(NETWORK_HOOK_SCRIPT)
+        except Exception as e:
+            logger.debug(f"安装网络请求钩子失败: {str(e)}")
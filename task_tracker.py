@@ -0,0 +1,107 @@
+"""
+后台任务跟踪模块
+
+生成波次、生成快递单、打印等操作在ERP服务器上以后台任务执行，进度显示在任务面板（#panelTask）中。
+操作前在页面中安装监听，记录任务面板状态的变化：任务完成立即返回，并记录实际耗时；
+任务失败立即以面板中的错误信息报错，不再等到超时。
+面板上的完成或失败状态只在看到本次任务“执行中”之后才采用，避免把之前任务留下的结果当作本次结果；
+操作没有产生后台任务（没有看到执行中）时按页面空闲判断完成。
+"""
+from config import TASK_PANEL
+from logger import logger
+from tracing import tracer
+from step_engine import page_idle
+
+# 重置任务状态，并在任务面板上安装监听（每个文档只安装一次）
+TASK_HOOK_SCRIPT = """
+var config = arguments[0];
+window.__autoPrintTask = {state: 'pending', title: '', message: '',
+                          reset: performance.now(), started: null, finished: null};
+var panel = document.querySelector(config.panel);
+if (!panel) return false;
+if (panel.__autoPrintObserver) return true;
+function text(selector) {
+    var el = selector ? panel.querySelector(selector) : null;
+    return ((el || panel).innerText || '').trim();
+}
+function matches(value, words) {
+    for (var i = 0; i < words.length; i++) {
+        if (value.indexOf(words[i]) >= 0) return true;
+    }
+    return false;
+}
+function update() {
+    var task = window.__autoPrintTask;
+    if (!task || task.state === 'done' || task.state === 'failed') return;
+    var scoped = config.status && panel.querySelector(config.status);
+    var status = text(config.status), now = performance.now(), state = null;
+    if (!scoped) {
+        // 没有状态元素时整个面板的文字可能还含有之前任务的结果，执行中优先
+        if (matches(status, config.running)) state = 'running';
+        else if (matches(status, config.failed)) state = 'failed';
+        else if (matches(status, config.done)) state = 'done';
+    } else if (matches(status, config.failed)) {
+        state = 'failed';
+    } else if (matches(status, config.done)) {
+        state = 'done';
+    } else if (matches(status, config.running)) {
+        state = 'running';
+    }
+    if (state === null) return;
+    if (state === 'running') {
+        if (task.started === null) task.started = now;
+    } else if (task.started === null) {
+        // 还没看到本次任务开始，面板上的结果属于之前的任务
+        return;
+    } else {
+        task.finished = now;
+    }
+    task.state = state;
+    task.title = config.title ? text(config.title) : '';
+    task.message = config.message ? text(config.message) : '';
+}
+panel.__autoPrintObserver = new MutationObserver(update);
+panel.__autoPrintObserver.observe(panel, {subtree: true, childList: true, characterData: true,
+                                          attributes: true});
+return true;
+"""
+
+TASK_STATE_SCRIPT = "return window.__autoPrintTask || null;"
+
+class TaskFailedError(Exception):
+    """ERP后台任务执行失败"""
+    pass
+
+class TaskTracker:
+    """ERP后台任务跟踪"""
+    def __init__(self, driver):
+        self.driver = driver
+
+    def watch(self, action):
+        """返回先重置任务状态再执行action的操作，用作步骤的action"""
+        def run():
+            self.driver.execute_script(TASK_HOOK_SCRIPT, TASK_PANEL)
+            return action()
+        return run
+
+    def finished(self, quiet=0.5):
+        """后台任务完成的条件，用作步骤的until
+
+        任务失败时抛出TaskFailedError；没有看到任务开始执行时按页面空闲quiet秒判断完成。
+        """
+        idle = page_idle(quiet)
+
+        def condition(driver):
+            task = driver.execute_script(TASK_STATE_SCRIPT)
+            if not task or task['state'] == 'pending':
+                return idle(driver)
+            if task['state'] == 'running':
+                return False
+            name = task['title'] or '后台任务'
+            seconds = max(task['finished'] - task['started'], 0) / 1000
+            tracer.current().set(task=name, task_seconds=round(seconds, 3))
+            if task['state'] == 'failed':
+                raise TaskFailedError(f"{name}失败: {task['message'] or '未知错误'}")
+            logger.info(f"{name}完成，任务耗时{seconds:.2f}秒")
+            return True
+        return condition
@@ -0,0 +1,166 @@
+"""
+邮件发送队列测试
+
+在本地启动一个简单的SMTP服务器代替邮件服务商，验证有界队列丢弃最早的邮件、
+连接空闲过久或被服务器断开后重新连接，以及shutdown()发送完队列中的邮件。
+
+运行: python -m unittest discover tests
+"""
+import smtplib
+import threading
+import socketserver
+import unittest
+from unittest import mock
+from email import message_from_bytes
+from email.header import decode_header, make_header
+
+from config import MAIL_QUEUE_CONFIG
+from mail_sender import EmailSender
+
+class SmtpHandler(socketserver.StreamRequestHandler):
+    """SMTP会话：只实现发送邮件用到的命令，不加密"""
+    def reply(self, line):
+        self.wfile.write((line + '\r\n').encode('ascii'))
+
+    def handle(self):
+        server = self.server
+        with server.lock:
+            server.connections += 1
+        self.reply('220 localhost ESMTP test')
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode('utf-8', 'replace').strip().split(' ')[0].upper()
+            if command == 'EHLO':
+                self.wfile.write(b'250-localhost\r\n250 AUTH PLAIN\r\n')
+            elif command in ('HELO', 'AUTH', 'MAIL', 'RCPT', 'RSET', 'NOOP'):
+                self.reply('235 ok' if command == 'AUTH' else '250 ok')
+            elif command == 'DATA':
+                self.reply('354 end with .')
+                lines = []
+                while True:
+                    data = self.rfile.readline()
+                    if not data or data == b'.\r\n':
+                        break
+                    lines.append(data)
+                with server.lock:
+                    server.messages.append(b''.join(lines))
+                self.reply('250 queued')
+                if server.drop_after_message:
+                    # 模拟服务器关闭空闲连接
+                    return
+            elif command == 'QUIT':
+                self.reply('221 bye')
+                return
+            else:
+                self.reply('502 not implemented')
+
+class SmtpServer(socketserver.ThreadingTCPServer):
+    """本地SMTP服务器，记录连接次数和收到的邮件"""
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), SmtpHandler)
+        self.lock = threading.Lock()
+        self.connections = 0
+        self.messages = []
+        self.drop_after_message = False
+
+class LocalEmailSender(EmailSender):
+    """连接本地SMTP服务器（不使用SSL和STARTTLS）的邮件发送器"""
+    def connect(self):
+        server = smtplib.SMTP(self.smtp_server, self.smtp_port, timeout=MAIL_QUEUE_CONFIG['timeout'])
+        server.login(self.sender_email, self.sender_password)
+        return server
+
+class EmailSenderTest(unittest.TestCase):
+    def setUp(self):
+        self.server = SmtpServer()
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+
+        patcher = mock.patch.dict(MAIL_QUEUE_CONFIG, {'max_size': 3, 'timeout': 5, 'flush_timeout': 5})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.sender = self.new_sender()
+
+    def new_sender(self):
+        sender = LocalEmailSender()
+        sender.smtp_server = '127.0.0.1'
+        sender.smtp_port = self.server.server_address[1]
+        sender.sender_email = 'robot@example.com'
+        sender.sender_password = 'secret'
+        sender.receiver_email = 'ops@example.com'
+        self.addCleanup(sender.shutdown)
+        return sender
+
+    def send(self, subject, callback=None):
+        self.assertTrue(self.sender.send_error_notification(subject, f"{subject}的错误信息",
+                                                            callback=callback, aggregate=False))
+
+    def subjects(self):
+        """按收到的顺序返回各邮件的标题"""
+        with self.server.lock:
+            messages = list(self.server.messages)
+        return [str(make_header(decode_header(message_from_bytes(raw)['Subject']))).split(' - ')[0]
+                for raw in messages]
+
+    def test_full_queue_drops_oldest(self):
+        results = {}
+
+        def callback(subject):
+            return lambda ok: results.__setitem__(subject, ok)
+
+        # 后台线程启动前放入5封邮件，队列上限为3
+        with mock.patch.object(self.sender, 'start_worker'):
+            for index in range(5):
+                self.send(f"错误{index}", callback(f"错误{index}"))
+        self.assertEqual(self.sender.queue.qsize(), 3)
+        self.assertEqual(results, {'错误0': False, '错误1': False})
+
+        self.sender.start_worker()
+        self.sender.shutdown()
+        self.assertEqual(self.subjects(), ['错误2', '错误3', '错误4'])
+        self.assertEqual(results, {'错误0': False, '错误1': False,
+                                   '错误2': True, '错误3': True, '错误4': True})
+
+    def test_reuses_connection(self):
+        self.send("错误0")
+        self.send("错误1")
+        self.sender.shutdown()
+        self.assertEqual(self.subjects(), ['错误0', '错误1'])
+        self.assertEqual(self.server.connections, 1)
+
+    def test_reconnects_after_idle_timeout(self):
+        self.send("错误0")
+        self.sender.queue.join()
+        # 连接空闲超过上限后下次发送重新连接
+        self.sender.last_used -= MAIL_QUEUE_CONFIG['idle_timeout'] + 1
+        self.send("错误1")
+        self.sender.shutdown()
+        self.assertEqual(self.subjects(), ['错误0', '错误1'])
+        self.assertEqual(self.server.connections, 2)
+
+    def test_reconnects_after_server_disconnect(self):
+        self.server.drop_after_message = True
+        self.send("错误0")
+        self.sender.queue.join()
+        self.send("错误1")
+        self.sender.shutdown()
+        self.assertEqual(self.subjects(), ['错误0', '错误1'])
+        self.assertEqual(self.server.connections, 2)
+
+    def test_shutdown_flushes_queue(self):
+        for index in range(3):
+            self.send(f"错误{index}")
+        self.sender.shutdown()
+        self.assertEqual(self.subjects(), ['错误0', '错误1', '错误2'])
+        self.assertFalse(self.sender.worker.is_alive())
+        self.assertIsNone(self.sender.connection)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,132 @@
+"""
+待打单数量接口查询测试
+
+在本地启动模拟ERP（mock_erp.py），验证OrderCountProbe从浏览器同步登录Cookie、
+按字段路径解析接口返回的数量，以及接口返回非200时的处理。
+
+运行: python -m unittest discover tests
+"""
+import unittest
+from unittest import mock
+
+import requests
+
+from config import ORDER_PROBE, MOCK_ERP_CONFIG
+from mock_erp import MockErpServer, SESSION_COOKIE
+from order_probe import OrderCountProbe
+
+try:
+    from web_automation import WebAutomation
+except ImportError:
+    # 没有安装selenium等浏览器依赖时跳过回退测试
+    WebAutomation = None
+
+class FakeDriver:
+    """只提供OrderCountProbe用到的接口：读取Cookie和User-Agent"""
+    def __init__(self, cookies):
+        self.cookies = cookies
+        self.user_agent = 'Mozilla/5.0 (probe test)'
+
+    def get_cookies(self):
+        return list(self.cookies)
+
+    def execute_script(self, script):
+        return self.user_agent
+
+class OrderCountProbeTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = MockErpServer(port=0, orders=7, page_latency=0, api_latency=0, task_latency=0,
+                                   jitter=0).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+
+    def setUp(self):
+        self.server.state.reset(7)
+        patcher = mock.patch.dict(ORDER_PROBE, {
+            'url': f"{self.server.base_url}/api/order_count",
+            'method': 'GET',
+            'params': {},
+            'count_field': 'data.count',
+            'timeout': 3
+        })
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.probe = OrderCountProbe()
+        self.addCleanup(self.probe.close)
+
+    def login(self):
+        """登录模拟ERP，返回浏览器中的会话Cookie"""
+        response = requests.post(f"{self.server.base_url}/api/login", timeout=3,
+                                 json={'username': MOCK_ERP_CONFIG['username'],
+                                       'password': MOCK_ERP_CONFIG['password']})
+        self.assertEqual(response.status_code, 200)
+        return {'name': SESSION_COOKIE, 'value': response.cookies[SESSION_COOKIE],
+                'domain': '127.0.0.1', 'path': '/'}
+
+    def test_syncs_cookies_from_browser(self):
+        driver = FakeDriver([self.login()])
+        self.assertEqual(self.probe.get_count(driver), 7)
+        self.assertTrue(self.probe.synced)
+        self.assertEqual(self.probe.session.cookies.get(SESSION_COOKIE), driver.cookies[0]['value'])
+        self.assertEqual(self.probe.session.headers['User-Agent'], driver.user_agent)
+
+    def test_reuses_synced_cookies(self):
+        driver = FakeDriver([self.login()])
+        self.probe.get_count(driver)
+        with mock.patch.object(self.probe, 'sync_cookies') as sync:
+            self.server.state.reset(3)
+            self.assertEqual(self.probe.get_count(driver), 3)
+        sync.assert_not_called()
+
+    def test_parses_nested_field_path(self):
+        driver = FakeDriver([self.login()])
+        self.probe.sync_cookies(driver)
+        self.assertEqual(self.probe.query(), 7)
+        with mock.patch.dict(ORDER_PROBE, {'count_field': 'data.total'}):
+            with self.assertRaisesRegex(ValueError, 'data.total'):
+                self.probe.query()
+
+    def test_parses_list_index_in_field_path(self):
+        response = mock.Mock(status_code=200)
+        response.json.return_value = {'data': [{'count': '12'}]}
+        with mock.patch.dict(ORDER_PROBE, {'count_field': 'data.0.count'}), \
+                mock.patch.object(self.probe.session, 'get', return_value=response):
+            self.assertEqual(self.probe.query(), 12)
+
+    def test_non_200_raises_without_following_redirect(self):
+        # 没有登录Cookie时接口重定向到登录页
+        with self.assertRaisesRegex(ValueError, '302'):
+            self.probe.query()
+
+    def test_resyncs_cookies_after_non_200(self):
+        # 上次同步的Cookie已失效，浏览器中已重新登录
+        self.probe.sync_cookies(FakeDriver([{'name': SESSION_COOKIE, 'value': 'expired',
+                                             'domain': '127.0.0.1', 'path': '/'}]))
+        driver = FakeDriver([self.login()])
+        self.assertEqual(self.probe.get_count(driver), 7)
+
+    def test_raises_when_browser_session_is_expired(self):
+        driver = FakeDriver([self.login()])
+        self.probe.get_count(driver)
+        self.server.state.expire_sessions()
+        with self.assertRaisesRegex(ValueError, '302'):
+            self.probe.get_count(driver)
+
+@unittest.skipIf(WebAutomation is None, '需要安装selenium和webdriver_manager')
+class OrderCountFallbackTest(unittest.TestCase):
+    """接口查询失败时WebAutomation回退到重新加载首页查询"""
+    def test_falls_back_to_page_with_reload(self):
+        automation = WebAutomation.__new__(WebAutomation)
+        automation.driver = object()
+        automation.order_probe = mock.Mock()
+        automation.order_probe.is_enabled.return_value = True
+        automation.order_probe.get_count.side_effect = ValueError("接口返回状态码 302")
+        with mock.patch.object(WebAutomation, 'order_count_from_page', return_value=4) as page:
+            self.assertEqual(automation.order_count(), 4)
+        page.assert_called_once_with(reload=True)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,223 @@
+"""
+步骤追踪模块
+
+记录每个步骤的耗时、结果和上下文（波次序号、订单数量等），
+写入logs目录下的JSONL文件，并汇总为Prometheus textfile collector格式的指标文件。
+追踪记录由后台线程写入文件，步骤结束时只在内存中汇总指标。
+"""
+import os
+import json
+import time
+import uuid
+import atexit
+import threading
+import functools
+from contextlib import contextmanager
+from datetime import datetime
+
+from config import TRACE_CONFIG
+from logger import logger, log_dir, log_stats, QueuedSink
+
+class Span:
+    """一个步骤的追踪记录"""
+    def __init__(self, name, parent=None, **attrs):
+        self.name = name
+        self.parent = parent
+        self.trace_id = parent.trace_id if parent else uuid.uuid4().hex[:16]
+        # 子步骤继承上层的上下文（如波次序号）
+        self.attrs = dict(parent.attrs) if parent else {}
+        self.attrs.update(attrs)
+        self.outcome = 'ok'
+        self.error = None
+        self.start = time.time()
+        self.duration = None
+
+    def set(self, **attrs):
+        """补充上下文信息"""
+        self.attrs.update(attrs)
+
+    def fail(self, error=None):
+        """标记步骤失败"""
+        self.outcome = 'error'
+        if error is not None:
+            self.error = str(error)
+
+    def to_dict(self):
+        return {
+            'time': datetime.fromtimestamp(self.start).strftime('%Y-%m-%d %H:%M:%S.%f')[:-3],
+            'trace_id': self.trace_id,
+            'span': self.name,
+            'parent': self.parent.name if self.parent else None,
+            'duration': round(self.duration, 4),
+            'outcome': self.outcome,
+            'error': self.error,
+            'attrs': self.attrs
+        }
+
+class NullSpan:
+    """不在任何步骤中时的占位记录，补充的上下文信息直接丢弃"""
+    def set(self, **attrs):
+        pass
+
+    def fail(self, error=None):
+        pass
+
+NULL_SPAN = NullSpan()
+
+class Tracer:
+    """步骤追踪器"""
+    def __init__(self):
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.jsonl_path = os.path.join(log_dir, TRACE_CONFIG['jsonl_file'])
+        self.prom_path = os.path.join(log_dir, TRACE_CONFIG['prom_file'])
+        self.metrics = {}
+        self.labels = ''
+        self.dirty = False
+        # 追踪记录和指标文件由后台线程写入，队列满时丢弃最早的记录
+        self.sink = QueuedSink('trace', self.write_jsonl, TRACE_CONFIG['queue_size'],
+                               flush=self.flush, flush_interval=TRACE_CONFIG['prom_interval'])
+
+    def configure(self, instance):
+        """多账号运行时每个进程使用单独的追踪文件，并在指标上附加账号标签"""
+        self.jsonl_path = os.path.join(log_dir, f"{instance}_{TRACE_CONFIG['jsonl_file']}")
+        self.prom_path = os.path.join(log_dir, f"{instance}_{TRACE_CONFIG['prom_file']}")
+        self.labels = f',account="{instance}"'
+
+    def current(self):
+        """返回当前线程正在执行的步骤，不在任何步骤中时返回NULL_SPAN"""
+        stack = getattr(self.local, 'stack', None)
+        return stack[-1] if stack else NULL_SPAN
+
+    @contextmanager
+    def span(self, name, **attrs):
+        """追踪一个步骤，with块内抛出的异常记为失败
+
+        追踪关闭时步骤仍然入栈（供current()补充上下文），只是不记录。
+        """
+        if not hasattr(self.local, 'stack'):
+            self.local.stack = []
+        stack = self.local.stack
+        span = Span(name, stack[-1] if stack else None, **attrs)
+        stack.append(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.fail(f"{type(e).__name__}: {e}")
+            raise
+        finally:
+            span.duration = time.time() - span.start
+            stack.pop()
+            if TRACE_CONFIG['enabled']:
+                self.finish(span)
+
+    def finish(self, span):
+        """记录结束的步骤：在内存中汇总指标，JSON记录交给后台线程写入"""
+        try:
+            with self.lock:
+                self.update_metrics(span)
+                self.dirty = True
+            self.sink.write(json.dumps(span.to_dict(), ensure_ascii=False, default=str) + '\n')
+        except Exception as e:
+            logger.debug(f"记录追踪信息失败: {str(e)}")
+
+    def write_jsonl(self, line):
+        """写入JSONL文件，超过大小上限时轮转（在后台线程中调用）"""
+        if os.path.exists(self.jsonl_path) and os.path.getsize(self.jsonl_path) >= TRACE_CONFIG['max_bytes']:
+            for index in range(TRACE_CONFIG['backup_count'] - 1, 0, -1):
+                source = f"{self.jsonl_path}.{index}"
+                if os.path.exists(source):
+                    os.replace(source, f"{self.jsonl_path}.{index + 1}")
+            os.replace(self.jsonl_path, f"{self.jsonl_path}.1")
+        with open(self.jsonl_path, 'a', encoding='utf-8') as f:
+            f.write(line)
+
+    def update_metrics(self, span):
+        """汇总步骤耗时直方图和失败次数"""
+        metric = self.metrics.get(span.name)
+        if metric is None:
+            metric = {'count': 0, 'sum': 0.0, 'errors': 0, 'last_end': 0,
+                      'buckets': [0] * len(TRACE_CONFIG['buckets'])}
+            self.metrics[span.name] = metric
+        metric['count'] += 1
+        metric['sum'] += span.duration
+        metric['last_end'] = span.start + span.duration
+        if span.outcome != 'ok':
+            metric['errors'] += 1
+        for index, bound in enumerate(TRACE_CONFIG['buckets']):
+            if span.duration <= bound:
+                metric['buckets'][index] += 1
+
+    def write_prom(self):
+        """写入Prometheus textfile collector指标文件（先写临时文件再替换，在后台线程中调用）"""
+        with self.lock:
+            lines = self.prom_lines()
+            self.dirty = False
+        tmp_path = self.prom_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write('\n'.join(lines) + '\n')
+        os.replace(tmp_path, self.prom_path)
+
+    def prom_lines(self):
+        """生成指标文件的内容"""
+        lines = [
+            '# HELP autoprint_step_duration_seconds 自动化步骤耗时',
+            '# TYPE autoprint_step_duration_seconds histogram'
+        ]
+        for name, metric in sorted(self.metrics.items()):
+            for bound, count in zip(TRACE_CONFIG['buckets'], metric['buckets']):
+                lines.append(f'autoprint_step_duration_seconds_bucket{{step="{name}"{self.labels},le="{bound}"}} {count}')
+            lines.append(f'autoprint_step_duration_seconds_bucket{{step="{name}"{self.labels},le="+Inf"}} {metric["count"]}')
+            lines.append(f'autoprint_step_duration_seconds_sum{{step="{name}"{self.labels}}} {metric["sum"]:.4f}')
+            lines.append(f'autoprint_step_duration_seconds_count{{step="{name}"{self.labels}}} {metric["count"]}')
+        lines.append('# HELP autoprint_step_failures_total 自动化步骤失败次数')
+        lines.append('# TYPE autoprint_step_failures_total counter')
+        for name, metric in sorted(self.metrics.items()):
+            lines.append(f'autoprint_step_failures_total{{step="{name}"{self.labels}}} {metric["errors"]}')
+        lines.append('# HELP autoprint_step_last_end_timestamp_seconds 步骤最近一次结束时间')
+        lines.append('# TYPE autoprint_step_last_end_timestamp_seconds gauge')
+        for name, metric in sorted(self.metrics.items()):
+            lines.append(f'autoprint_step_last_end_timestamp_seconds{{step="{name}"{self.labels}}} {metric["last_end"]:.3f}')
+
+        # 日志队列状态
+        lines.append('# HELP autoprint_log_queue_depth 日志队列中等待写入的行数')
+        lines.append('# TYPE autoprint_log_queue_depth gauge')
+        stats = log_stats()
+        for sink, stat in sorted(stats.items()):
+            lines.append(f'autoprint_log_queue_depth{{sink="{sink}"{self.labels}}} {stat["depth"]}')
+        lines.append('# HELP autoprint_log_dropped_total 队列满时丢弃的日志行数')
+        lines.append('# TYPE autoprint_log_dropped_total counter')
+        for sink, stat in sorted(stats.items()):
+            lines.append(f'autoprint_log_dropped_total{{sink="{sink}"{self.labels}}} {stat["dropped"]}')
+        return lines
+
+    def flush(self):
+        """有新的步骤记录时更新指标文件（后台线程按刷新间隔和退出时调用）"""
+        if self.dirty:
+            self.write_prom()
+
+    def shutdown(self):
+        """程序退出时写完队列中的追踪记录并更新指标文件"""
+        self.sink.stop()
+
+def traced(name, false_is_error=False):
+    """追踪函数调用的装饰器
+
+    参数:
+        name: 步骤名称
+        false_is_error: 函数返回False时是否记为失败（如登录失败返回False）
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with tracer.span(name) as span:
+                result = func(*args, **kwargs)
+                if false_is_error and result is False:
+                    span.fail()
+                return result
+        return wrapper
+    return decorator
+
+# 创建全局追踪器实例
+tracer = Tracer()
+atexit.register(tracer.shutdown)
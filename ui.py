@@ -1,22 +1,32 @@
 """
 UI界面程序
+
+启动时只导入Qt和配置，Selenium、邮件等模块在使用时或后台线程中再导入，
+窗口可以尽快显示。
 """
+import time
+# 启动耗时从这里开始计算，包括导入Qt的耗时（日志模块在Qt之后导入，导入完成后再补记）
+LAUNCH_TIME = time.perf_counter()
 import sys
 import os
 import json
 from PyQt6.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, 
                             QHBoxLayout, QLabel, QLineEdit, QCheckBox, 
                             QPushButton, QTimeEdit, QTextEdit, QGroupBox,
-                            QTabWidget, QSpinBox)
-from PyQt6.QtCore import Qt, QTime, QThread, pyqtSignal
+                            QTabWidget, QSpinBox, QComboBox)
+from PyQt6.QtCore import Qt, QTime, QThread, QTimer, pyqtSignal
 from datetime import datetime, time as datetime_time
-import time as time_module
+QT_LOADED_TIME = time.perf_counter()
 
-from logger import logger, set_ui_signal
-from main import main as run_task
-from config import time_config
-from mail_sender import email_sender
+from logger import logger, set_ui_callback
+from log_view import LogModel, LogView, LEVELS
+from config import time_config, BROWSER_CONFIG, CANCEL_CONFIG
 from version import VERSION, VERSION_DATE, VERSION_INFO
+from startup import startup_profiler, browser_prewarmer
+
+startup_profiler.set_start(LAUNCH_TIME)
+startup_profiler.mark('qt_loaded', "Qt模块加载完成", at=QT_LOADED_TIME)
+from cancellation import cancel_token, CancelledError
 
 class LogHandler:
     """日志处理器，用于将日志输出到UI"""
@@ -27,30 +37,44 @@ class LogHandler:
         self.signal.emit(text)
 
 class WorkerThread(QThread):
-    """工作线程，用于运行自动化任务"""
-    finished = pyqtSignal()
+    """工作线程，用于运行自动化任务
+
+    停止时设置全局取消标记，正在执行的步骤在一秒内退出（正在处理的波次会先处理完），
+    线程退出时发出QThread的finished信号。
+    """
     log_signal = pyqtSignal(str)
 
     def __init__(self):
         super().__init__()
-        self.is_running = True
+        # 清除上次运行的取消标记
+        cancel_token.reset()
 
     def run(self):
-        while self.is_running:
-            try:
-                run_task()
-                # 等待10分钟
-                for i in range(10):
-                    if not self.is_running:
-                        break
-                    time_module.sleep(60)
-            except Exception as e:
-                # 使用logger记录错误，而不是直接使用信号
-                logger.error(f"任务执行出错: {str(e)}")
-                time_module.sleep(60)
+        # 自动化模块在工作线程中导入，不阻塞界面
+        from main import main as run_task
+        from session_manager import SessionManager
+        from scheduler import Scheduler
+
+        session = SessionManager()
+        try:
+            # 使用预启动的浏览器，省去启动浏览器的时间
+            automation = browser_prewarmer.take()
+            if automation is not None:
+                session.attach(automation)
+            startup_profiler.mark('first_task', "开始执行首个任务")
+            Scheduler(run_task, session, cancel_token.event).run()
+        except CancelledError:
+            logger.info("任务已停止")
+        except Exception as e:
+            # 使用logger记录错误，而不是直接使用信号
+            logger.error(f"任务执行出错: {str(e)}")
+        finally:
+            # 线程退出时关闭浏览器会话
+            session.close()
 
     def stop(self):
-        self.is_running = False
+        """请求停止，立即返回"""
+        cancel_token.cancel()
 
 class MainWindow(QMainWindow):
     """主窗口类"""
@@ -62,8 +86,10 @@ class MainWindow(QMainWindow):
         self.setGeometry(100, 100, 800, 600)
         self.worker_thread = None
         
-        # 设置日志信号
-        set_ui_signal(self.log_signal)
+        # 日志模型由两个标签页的日志视图共用，日志定时批量刷新到界面
+        self.log_model = LogModel(parent=self)
+        set_ui_callback(self.log_model.append)
+        self.log_signal.connect(self.log_model.append)
         
         # 创建中心组件
         central_widget = QWidget()
@@ -127,9 +153,14 @@ class MainWindow(QMainWindow):
         # 记住密码
         self.remember_checkbox = QCheckBox("记住密码")
         
+        # 无头模式
+        self.headless_checkbox = QCheckBox("后台运行浏览器（无头模式，不显示浏览器窗口）")
+        self.headless_checkbox.setChecked(BROWSER_CONFIG['headless'])
+        
         login_layout.addLayout(username_layout)
         login_layout.addLayout(password_layout)
         login_layout.addWidget(self.remember_checkbox)
+        login_layout.addWidget(self.headless_checkbox)
         login_group.setLayout(login_layout)
 
         # 时间设置组
@@ -178,8 +209,7 @@ class MainWindow(QMainWindow):
         # 日志显示
         log_group = QGroupBox("运行日志")
         log_layout = QVBoxLayout()
-        self.log_text = QTextEdit()
-        self.log_text.setReadOnly(True)
+        self.log_text = LogView(self.log_model)
         log_layout.addWidget(self.log_text)
         log_group.setLayout(log_layout)
 
@@ -189,9 +219,6 @@ class MainWindow(QMainWindow):
         layout.addLayout(button_layout)
         layout.addWidget(log_group)
 
-        # 连接日志信号
-        self.log_signal.connect(self.update_log)
-
     def _setup_mail_tab(self, tab):
         """设置邮件配置页面"""
         layout = QVBoxLayout()
@@ -272,17 +299,24 @@ class MainWindow(QMainWindow):
         self.save_settings()
         self.update_mail_settings_from_ui()
         
-        # 测试邮件发送
-        try:
-            result = email_sender.send_error_notification(
-                "测试邮件",
-                "这是一封测试邮件，如果您收到此邮件，说明邮件配置正确。",
-                "测试堆栈跟踪信息"
-            )
+        from mail_sender import email_sender
+
+        # 测试邮件在后台发送，完成后通过信号回到界面线程显示结果
+        def on_sent(result):
             if result:
                 self.log_signal.emit("测试邮件发送成功，请检查您的邮箱")
             else:
                 self.log_signal.emit("测试邮件发送失败，请检查邮件配置")
+
+        try:
+            if email_sender.send_error_notification(
+                "测试邮件",
+                "这是一封测试邮件，如果您收到此邮件，说明邮件配置正确。",
+                "测试堆栈跟踪信息",
+                callback=on_sent,
+                aggregate=False
+            ):
+                self.log_signal.emit("测试邮件正在发送...")
         except Exception as e:
             self.log_signal.emit(f"测试邮件发送异常: {str(e)}")
     
@@ -296,6 +330,7 @@ class MainWindow(QMainWindow):
         os.environ['RECEIVER_EMAIL'] = self.receiver_email_input.text()
         
         # 更新email_sender对象的配置
+        from mail_sender import email_sender
         email_sender.smtp_server = self.smtp_server_input.text()
         email_sender.smtp_port = self.smtp_port_input.value()
         email_sender.sender_email = self.sender_email_input.text()
@@ -324,19 +359,14 @@ class MainWindow(QMainWindow):
                     os.environ['SENDER_EMAIL'] = mail_settings.get('sender_email', '')
                     os.environ['SENDER_PASSWORD'] = mail_settings.get('sender_password', '')
                     os.environ['RECEIVER_EMAIL'] = mail_settings.get('receiver_email', '')
-                    
-                    # 更新email_sender对象
-                    email_sender.smtp_server = mail_settings.get('smtp_server', '')
-                    email_sender.smtp_port = int(mail_settings.get('smtp_port', 465))
-                    email_sender.sender_email = mail_settings.get('sender_email', '')
-                    email_sender.sender_password = mail_settings.get('sender_password', '')
-                    email_sender.receiver_email = mail_settings.get('receiver_email', '')
+                    # 邮件模块在首次使用时导入，从环境变量读取以上配置
                     
                 # 加载其他设置
                 self.username_input.setText(settings.get('username', ''))
                 if settings.get('remember_password', False):
                     self.password_input.setText(settings.get('password', ''))
                     self.remember_checkbox.setChecked(True)
+                self.headless_checkbox.setChecked(settings.get('headless', BROWSER_CONFIG['headless']))
                     
                 # 加载时间设置
                 start = settings.get('start_time', '07:30').split(':')
@@ -347,7 +377,7 @@ class MainWindow(QMainWindow):
                 self.middle_time.setTime(QTime(int(middle[0]), int(middle[1])))
                 self.end_time.setTime(QTime(int(end[0]), int(end[1])))
             except Exception as e:
-                self.log_text.append(f"加载设置失败: {str(e)}")
+                self.log_model.append(f"加载设置失败: {str(e)}")
 
     def start_program(self):
         """启动程序"""
@@ -370,10 +400,14 @@ class MainWindow(QMainWindow):
         os.environ['USERNAME'] = self.username_input.text()
         os.environ['PASSWORD'] = self.password_input.text()
         
+        # 更新浏览器模式
+        BROWSER_CONFIG['headless'] = self.headless_checkbox.isChecked()
+        
         # 禁用输入和启动按钮
         self.username_input.setEnabled(False)
         self.password_input.setEnabled(False)
         self.remember_checkbox.setEnabled(False)
+        self.headless_checkbox.setEnabled(False)
         self.start_time.setEnabled(False)
         self.middle_time.setEnabled(False)
         self.end_time.setEnabled(False)
@@ -382,7 +416,8 @@ class MainWindow(QMainWindow):
         
         # 启动工作线程
         self.worker_thread = WorkerThread()
-        self.worker_thread.log_signal.connect(self.update_log)
+        self.worker_thread.log_signal.connect(self.log_model.append)
+        self.worker_thread.finished.connect(self.on_worker_finished)
         self.worker_thread.start()
         
         logger.info("程序已启动，工作时间设置为：")
@@ -391,16 +426,23 @@ class MainWindow(QMainWindow):
         logger.info(f"结束时间：{end.toString('HH:mm')}")
 
     def stop_program(self):
-        """终止程序"""
-        if self.worker_thread:
+        """终止程序：通知工作线程停止后立即返回，界面不等待"""
+        if self.worker_thread and self.worker_thread.isRunning():
             self.worker_thread.stop()
-            self.worker_thread.wait()
-            self.worker_thread = None
-        
+            self.stop_button.setEnabled(False)
+            logger.info("正在停止程序...")
+            return
+        self.on_worker_finished()
+
+    def on_worker_finished(self):
+        """工作线程退出后恢复界面"""
+        self.worker_thread = None
+
         # 启用输入和启动按钮
         self.username_input.setEnabled(True)
         self.password_input.setEnabled(True)
         self.remember_checkbox.setEnabled(True)
+        self.headless_checkbox.setEnabled(True)
         self.start_time.setEnabled(True)
         self.middle_time.setEnabled(True)
         self.end_time.setEnabled(True)
@@ -409,14 +451,6 @@ class MainWindow(QMainWindow):
         
         logger.info("程序已终止")
 
-    def update_log(self, text):
-        """更新日志显示"""
-        self.log_text.append(text)
-        # 自动滚动到底部
-        self.log_text.verticalScrollBar().setValue(
-            self.log_text.verticalScrollBar().maximum()
-        )
-
     def save_settings(self):
         """保存设置"""
         try:
@@ -433,6 +467,7 @@ class MainWindow(QMainWindow):
             settings.update({
                 'username': self.username_input.text(),
                 'remember_password': self.remember_checkbox.isChecked(),
+                'headless': self.headless_checkbox.isChecked(),
                 'start_time': self.start_time.time().toString('HH:mm'),
                 'middle_time': self.middle_time.time().toString('HH:mm'),
                 'end_time': self.end_time.time().toString('HH:mm')
@@ -459,9 +494,35 @@ class MainWindow(QMainWindow):
         except Exception as e:
             logger.error(f"保存设置失败: {str(e)}")
 
+    def showEvent(self, event):
+        """窗口显示后在后台预启动浏览器"""
+        super().showEvent(event)
+        QTimer.singleShot(0, self.on_first_shown)
+
+    def on_first_shown(self):
+        if 'window_shown' in startup_profiler.marks:
+            return
+        startup_profiler.mark('window_shown', "窗口显示")
+        # 按已保存的无头模式设置预启动
+        BROWSER_CONFIG['headless'] = self.headless_checkbox.isChecked()
+        browser_prewarmer.start()
+
     def closeEvent(self, event):
         """关闭窗口事件"""
+        worker = self.worker_thread
         self.stop_program()
+        # 等待工作线程关闭浏览器（有上限，不会无限等待）
+        if worker is not None and not worker.wait(CANCEL_CONFIG['close_timeout'] * 1000):
+            if cancel_token.busy():
+                # ERP后台任务执行到一半时退出会留下处理了一半的波次，等这一步完成（受步骤超时限制）
+                logger.info("等待当前ERP任务完成后退出")
+                while worker.isRunning() and cancel_token.busy():
+                    worker.wait(int(CANCEL_CONFIG['check_interval'] * 1000))
+                    QApplication.processEvents()
+                worker.wait(CANCEL_CONFIG['close_timeout'] * 1000)
+            if worker.isRunning():
+                logger.warning("任务未能及时停止，直接退出")
+        browser_prewarmer.discard()
         self.save_settings()
         event.accept()
 
@@ -475,14 +536,26 @@ class MainWindow(QMainWindow):
         log_layout = QVBoxLayout()
         log_group.setLayout(log_layout)
         
-        # 创建日志文本框
-        self.log_tab_text = QTextEdit()
-        self.log_tab_text.setReadOnly(True)
+        # 创建日志列表（与主配置页共用日志模型）
+        self.log_tab_text = LogView(self.log_model)
         log_layout.addWidget(self.log_tab_text)
         
         # 控制按钮
         button_layout = QHBoxLayout()
         
+        # 日志级别过滤
+        level_label = QLabel("显示级别:")
+        self.level_combo = QComboBox()
+        self.level_combo.addItem("全部", LEVELS['INFO'])
+        self.level_combo.addItem("警告及以上", LEVELS['WARNING'])
+        self.level_combo.addItem("仅错误", LEVELS['ERROR'])
+        self.level_combo.currentIndexChanged.connect(
+            lambda: self.log_model.set_min_level(self.level_combo.currentData())
+        )
+        button_layout.addWidget(level_label)
+        button_layout.addWidget(self.level_combo)
+        button_layout.addStretch()
+        
         # 清除日志按钮
         clear_button = QPushButton("清除日志")
         clear_button.clicked.connect(self.clear_log)
@@ -497,13 +570,9 @@ class MainWindow(QMainWindow):
         
         layout.addWidget(log_group)
         
-        # 连接日志信号到这个页面
-        self.log_signal.connect(self.update_log_tab)
-        
     def clear_log(self):
         """清除日志内容"""
-        self.log_tab_text.clear()
-        self.log_text.clear()
+        self.log_model.clear()
         logger.info("日志已清除")
         
     def save_log(self):
@@ -515,28 +584,12 @@ class MainWindow(QMainWindow):
             
             # 保存日志内容
             with open(filename, 'w', encoding='utf-8') as f:
-                f.write(self.log_tab_text.toPlainText())
+                f.write(self.log_model.to_text())
                 
             logger.info(f"日志已保存到文件: {filename}")
         except Exception as e:
             logger.error(f"保存日志失败: {str(e)}")
             
-    def update_log_tab(self, text):
-        """更新日志标签页中的日志显示"""
-        self.log_tab_text.append(text)
-        # 自动滚动到底部
-        self.log_tab_text.verticalScrollBar().setValue(
-            self.log_tab_text.verticalScrollBar().maximum()
-        )
-        
-    def update_log(self, text):
-        """更新日志显示"""
-        self.log_text.append(text)
-        # 自动滚动到底部
-        self.log_text.verticalScrollBar().setValue(
-            self.log_text.verticalScrollBar().maximum()
-        )
-
     def _setup_about_tab(self, tab):
         """设置关于页面"""
         layout = QVBoxLayout()
@@ -0,0 +1,121 @@
+"""
+波次处理日志模块
+
+在本地SQLite数据库（WAL模式）中记录每个波次已完成的处理步骤。
+任务失败或程序崩溃后重新运行时，每个波次从上次完成的步骤之后继续，
+不重复生成快递单，也不重复打印。
+"""
+import os
+import time
+import sqlite3
+import threading
+
+from config import WAVE_JOURNAL_CONFIG
+from logger import logger, log_dir
+
+# 波次处理步骤（按执行顺序）
+STEPS = ('selected', 'express_generated', 'picking_printed', 'express_printed', 'confirmed')
+
+STEP_NAMES = {
+    'selected': '已勾选',
+    'express_generated': '已生成快递单',
+    'picking_printed': '已打配货单',
+    'express_printed': '已打快递单',
+    'confirmed': '已确认配货'
+}
+
+def completed(progress, step):
+    """progress（已完成的最后一步）是否已包含step"""
+    return progress is not None and STEPS.index(progress) >= STEPS.index(step)
+
+class WaveJournal:
+    """波次处理日志"""
+    def __init__(self, path=None):
+        self.path = path or os.path.join(log_dir, WAVE_JOURNAL_CONFIG['file'])
+        self.conn = None
+        self.pid = None
+        self.lock = threading.Lock()
+
+    def use(self, path):
+        """改用另一个数据库文件（如基准测试）"""
+        self.close()
+        self.path = path
+
+    def connect(self):
+        """打开数据库（每个进程一个连接），并删除过期的记录"""
+        if self.conn is not None and self.pid == os.getpid():
+            return self.conn
+        conn = sqlite3.connect(self.path, timeout=WAVE_JOURNAL_CONFIG['busy_timeout'],
+                               isolation_level=None, check_same_thread=False)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=FULL')
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS wave_steps (
+                account TEXT NOT NULL,
+                wave_id TEXT NOT NULL,
+                step TEXT NOT NULL,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (account, wave_id)
+            )
+        """)
+        cutoff = time.time() - WAVE_JOURNAL_CONFIG['retention_days'] * 86400
+        conn.execute('DELETE FROM wave_steps WHERE updated_at < ?', (cutoff,))
+        self.conn = conn
+        self.pid = os.getpid()
+        return conn
+
+    def progress(self, account, wave_ids):
+        """返回各波次已完成的最后一步，没有记录的波次不在结果中
+
+        返回:
+            dict: 波次ID -> 步骤
+        """
+        wave_ids = [wave_id for wave_id in wave_ids if wave_id]
+        if not WAVE_JOURNAL_CONFIG['enabled'] or not wave_ids:
+            return {}
+        try:
+            with self.lock:
+                conn = self.connect()
+                placeholders = ','.join('?' * len(wave_ids))
+                rows = conn.execute(
+                    f'SELECT wave_id, step FROM wave_steps WHERE account = ? AND wave_id IN ({placeholders})',
+                    [account] + wave_ids
+                ).fetchall()
+            return dict(rows)
+        except sqlite3.Error as e:
+            logger.warning(f"读取波次处理日志失败: {str(e)}")
+            return {}
+
+    def record(self, account, wave_ids, step):
+        """记录波次已完成的步骤（提交后才返回）"""
+        wave_ids = [wave_id for wave_id in wave_ids if wave_id]
+        if not WAVE_JOURNAL_CONFIG['enabled'] or not wave_ids:
+            return
+        now = time.time()
+        try:
+            with self.lock:
+                conn = self.connect()
+                # 一批波次在一个事务中写入，只需一次落盘
+                conn.execute('BEGIN IMMEDIATE')
+                try:
+                    conn.executemany(
+                        'INSERT INTO wave_steps (account, wave_id, step, updated_at) VALUES (?, ?, ?, ?) '
+                        'ON CONFLICT (account, wave_id) DO UPDATE SET step = excluded.step, '
+                        'updated_at = excluded.updated_at',
+                        [(account, wave_id, step, now) for wave_id in wave_ids]
+                    )
+                    conn.execute('COMMIT')
+                except sqlite3.Error:
+                    conn.execute('ROLLBACK')
+                    raise
+        except sqlite3.Error as e:
+            logger.warning(f"写入波次处理日志失败: {str(e)}")
+
+    def close(self):
+        with self.lock:
+            if self.conn is not None and self.pid == os.getpid():
+                self.conn.close()
+            self.conn = None
+
+# 创建全局实例
+wave_journal = WaveJournal()
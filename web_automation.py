@@ -3,111 +3,147 @@
 """
 from selenium import webdriver
 from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
+from selenium.common.exceptions import TimeoutException
 from webdriver_manager.chrome import ChromeDriverManager
 from datetime import datetime
-import time
+import os
 import traceback
 
-from config import URLS, SELECTORS, WAIT_TIME, ORDER_THRESHOLDS, time_config
+from config import URLS, SELECTORS, BROWSER_CONFIG, WAIT_TIME, ORDER_THRESHOLDS, WAVE_CONFIG, time_config
 from logger import logger
 from mail_sender import email_sender
+from browser_profile import BrowserProfile
+from browser_options import build_chrome_options, apply_resource_blocking
+from order_probe import OrderCountProbe
+from dom_batch import DomBatch, SCRIPT_TIMEOUT
+from selector_registry import SelectorRegistry
+from navigator import Navigator, SessionExpiredError
+from task_tracker import TaskTracker
+from tracing import tracer, traced
+from cancellation import cancel_token
+from wave_journal import wave_journal, completed, STEP_NAMES
+from step_engine import (StepEngine, element_clickable, element_gone, url_not_contains,
+                         page_idle, all_of)
+
+# 生成快递单之后的波次处理步骤：(处理日志中的步骤, 按钮名称)
+WAVE_STEPS = (
+    ('picking_printed', 'print_picking'),
+    ('express_printed', 'print_express'),
+    ('confirmed', 'confirm_picking'),
+)
 
 class WebAutomation:
-    def __init__(self):
+    def __init__(self, profile=None):
         """初始化WebAutomation类"""
         self.driver = None
+        self.steps = None
+        self.batch = None
+        self.selectors = None
+        self.navigator = None
+        self.tasks = None
+        self.profile = profile or BrowserProfile()
+        self.order_probe = OrderCountProbe()
+        self.logged_in = False  # 是否在本浏览器中登录过，未登录的浏览器关闭时不保存Cookie
         self.setup_driver()
-        self.is_in_iframe = False  # 添加标记，记录是否在iframe中
 
     def setup_driver(self):
         """设置浏览器驱动"""
         try:
-            chrome_options = Options()
-            chrome_options.add_argument('--start-maximized')
-            chrome_options.add_argument('--disable-gpu')
-            chrome_options.add_argument('--no-sandbox')
-            chrome_options.add_argument('--disable-dev-shm-usage')
+            chrome_options = build_chrome_options(self.profile)
             
-            service = Service('./chromedriver.exe')
+            driver_path = BROWSER_CONFIG['driver_path']
+            service = Service(driver_path) if os.path.exists(driver_path) else Service()
             self.driver = webdriver.Chrome(service=service, options=chrome_options)
+            apply_resource_blocking(self.driver)
+            # 批量DOM操作的分段等待不超过该时间，只需设置一次
+            self.driver.set_script_timeout(SCRIPT_TIMEOUT)
+            self.steps = StepEngine(self.driver)
+            self.selectors = SelectorRegistry(self.driver)
+            self.batch = DomBatch(self.driver, self.selectors)
+            self.navigator = Navigator(self.driver, self.steps, self.selectors)
+            self.tasks = TaskTracker(self.driver)
+            self.steps.recover = self.recover
             logger.info("浏览器驱动初始化成功")
         except Exception as e:
             logger.error(f"浏览器驱动初始化失败: {str(e)}")
             raise
 
-    def get_iframe_xpath(self, url):
-        """根据不同的页面返回对应的iframe xpath"""
-        if URLS['home'] in url:
-            return '//*[@id="tabsetMain"]/contents/content/c-iframe/iframe'
-        elif URLS['wave_picking'] in url:
-            return '//*[@id="tabsetMain"]/contents/content[2]/c-iframe/iframe'
-        else:
-            return '//*[@id="tabsetMain"]/contents/content/c-iframe/iframe'  # 默认xpath
-
-    def switch_to_iframe(self):
-        """切换到iframe"""
-        if not self.is_in_iframe:  # 只有不在iframe中才需要切换
-            try:
-                # 先切换到默认内容
-                self.driver.switch_to.default_content()
-                time.sleep(WAIT_TIME['short'])
-                
-                # 根据当前URL获取对应的iframe xpath
-                iframe_xpath = self.get_iframe_xpath(self.driver.current_url)
-                iframe = WebDriverWait(self.driver, WAIT_TIME['short']).until(
-                    EC.presence_of_element_located((By.XPATH, iframe_xpath))
-                )
-                self.driver.switch_to.frame(iframe)
-                time.sleep(WAIT_TIME['short'])
-                self.is_in_iframe = True  # 设置标记
-                logger.info("切换iframe成功")
-                
-            except Exception as e:
-                logger.error(f"切换iframe失败: {str(e)}")
-                raise
-
     def switch_to_default(self):
         """切换回主文档"""
-        if self.is_in_iframe:  # 只有在iframe中才需要切换回主文档
-            self.driver.switch_to.default_content()
-            self.is_in_iframe = False  # 重置标记
-            logger.info("切换回主文档")
+        self.navigator.leave_frame()
+
+    def recover(self, mode):
+        """步骤重试前恢复页面状态
+
+        参数:
+            mode: 'reswitch'重新切换到当前页面的iframe，'renavigate'重新加载当前页面
+        """
+        page = self.navigator.tab
+        if page is None:
+            return
+        if mode == 'renavigate':
+            logger.info("重新加载页面后重试")
+            self.navigate_to(page, reload=True)
+        elif mode == 'reswitch':
+            self.navigator.refresh_frame()
+
+    @traced('navigate_to')
+    def navigate_to(self, url, reload=False):
+        """导航到页面
 
-    def navigate_to(self, url):
-        """导航到新页面"""
+        已在目标页面时不重新加载，目标页面已在标签页中打开时直接切换。
+
+        参数:
+            reload: 为True时总是重新加载页面
+        """
         try:
-            # 切换回主文档
-            self.switch_to_default()
-            # 导航到新页面
-            self.driver.get(url)
-            time.sleep(WAIT_TIME['medium'])
-            # 如果不是登录页面，就切换到iframe
-            if URLS['login'] not in url:
-                self.switch_to_iframe()
+            self.navigator.goto(url, reload)
+        except SessionExpiredError:
+            raise
         except Exception as e:
             logger.error(f"导航到页面失败: {str(e)}")
             raise
 
-    def wait_for_element(self, xpath, timeout=WAIT_TIME['medium'], need_iframe=True):
-        """等待元素可见"""
+    def is_alive(self):
+        """检查浏览器是否仍然可用"""
+        if not self.driver:
+            return False
         try:
-            # 只在登录页面不使用 iframe
-            if not need_iframe:
-                self.switch_to_default()
-            
-            # 等待并返回元素
-            element = WebDriverWait(self.driver, timeout).until(
-                EC.element_to_be_clickable((By.XPATH, xpath))
-            )
-            return element
-        except Exception as e:
-            logger.error(f"等待元素超时 {xpath}: {str(e)}")
-            raise
+            self.driver.current_url
+            return True
+        except Exception:
+            return False
+
+    def check_session(self):
+        """检查登录会话是否仍然有效
+        
+        返回:
+            bool: 会话有效返回True，被重定向回登录页返回False
+        """
+        try:
+            # 重新加载才能确认会话有效，之后查询首页数量时不再重复加载
+            self.navigate_to(URLS['home'], reload=True)
+            return True
+        except SessionExpiredError:
+            logger.info("检测到登录会话已过期")
+            return False
+
+    def benchmark_selectors(self, keys=None, repeat=20):
+        """测量当前页面中各元素定位方式的耗时"""
+        return self.selectors.log_benchmark(keys, repeat)
 
+    def click(self, xpath, timeout=WAIT_TIME['medium']):
+        """等待元素可见可用后点击，只需一次浏览器调用"""
+        self.batch.run([('element', xpath, 'click')], timeout)
+
+    def read_text(self, xpath, timeout=WAIT_TIME['medium']):
+        """等待元素可见后读取文本，只需一次浏览器调用"""
+        return self.batch.run([('element', xpath, 'none')], timeout)['element']['text']
+
+    @traced('login', false_is_error=True)
     def login(self, username, password):
         """登录系统
         
@@ -115,29 +151,38 @@ class WebAutomation:
             bool: 如果登录成功返回True，失败返回False
         """
         try:
+            # 优先使用保存的Cookie恢复登录状态，跳过登录表单
+            if self.profile.restore_cookies(self.driver) and self.check_session():
+                logger.info("使用保存的Cookie恢复登录状态成功")
+                self.order_probe.synced = False
+                self.logged_in = True
+                return True
+
             logger.info("开始登录系统")
             self.navigate_to(URLS['login'])
             
             # 检查当前登录方式
-            login_type_element = self.wait_for_element(SELECTORS['login']['login_type'], need_iframe=False)
-            login_type = login_type_element.text
+            login_type = self.read_text('login.login_type')
             
             # 如果是扫码登录，切换到密码登录
             if "扫码登录" in login_type:
                 logger.info("当前为扫码登录页面，切换到密码登录")
-                switch_button = self.wait_for_element(SELECTORS['login']['input'], need_iframe=False)
-                switch_button.click()
-                time.sleep(WAIT_TIME['short'])
+                self.steps.run('login_switch', lambda: self.click('login.input'),
+                               until=element_clickable(SELECTORS['login']['username']),
+                               timeout=WAIT_TIME['medium'])
             
-            # 输入用户名和密码
-            username_input = self.wait_for_element(SELECTORS['login']['username'], need_iframe=False)
-            password_input = self.wait_for_element(SELECTORS['login']['password'], need_iframe=False)
-            submit_button = self.wait_for_element(SELECTORS['login']['submit'], need_iframe=False)
-
-            username_input.send_keys(username)
-            password_input.send_keys(password)
-            submit_button.click()
-            time.sleep(WAIT_TIME['medium'])
+            # 一次调用完成用户名、密码输入并提交
+            self.batch.run([
+                ('username', 'login.username', 'input', username),
+                ('password', 'login.password', 'input', password),
+                ('submit', 'login.submit', 'click')
+            ])
+            # 等待跳转离开登录页，超时说明登录失败，在下面检查错误信息
+            try:
+                self.steps.run('login_submit', until=url_not_contains(URLS['login']),
+                               timeout=WAIT_TIME['long'])
+            except TimeoutException:
+                pass
             
             # 验证登录是否成功 - 简化异常处理结构
             current_url = self.driver.current_url
@@ -164,6 +209,9 @@ class WebAutomation:
             # 如果不在登录页面，说明登录成功
             logger.info("登录验证通过：已成功跳转到系统页面")
             logger.info("登录系统成功")
+            self.profile.save_cookies(self.driver)
+            self.order_probe.synced = False
+            self.logged_in = True
             return True
                 
         except Exception as e:
@@ -174,37 +222,59 @@ class WebAutomation:
             email_sender.send_error_notification("登录失败", error_msg, stack_trace)
             return False
 
+    @traced('order_count')
     def order_count(self):
-        """查询待打单数量"""
+        """查询待打单数量，优先使用数据接口，失败时回退到页面查询"""
+        if self.order_probe.is_enabled():
+            try:
+                order_count = self.order_probe.get_count(self.driver)
+                tracer.current().set(order_count=order_count, source='api')
+                logger.info(f"当前订单数量: {order_count}（接口查询）")
+                return order_count
+            except Exception as e:
+                logger.warning(f"接口查询待打单数量失败，改用页面查询: {str(e)}")
+                # 接口失败可能是登录已过期，重新加载首页确认会话
+                return self.order_count_from_page(reload=True)
+        return self.order_count_from_page()
+
+    @traced('order_count_from_page')
+    def order_count_from_page(self, reload=False):
+        """通过首页查询待打单数量
+
+        参数:
+            reload: 为True时重新加载首页（登录已过期时抛出SessionExpiredError）
+        """
         try:
             logger.info("开始查询待打单数量")
-            self.navigate_to(URLS['home'])
+            self.navigate_to(URLS['home'], reload=reload)
             
             # 检查是否有广告弹窗
             try:
-                ad_close = self.wait_for_element(SELECTORS['home']['ad_close'], timeout=WAIT_TIME['short'])
-                if ad_close:
-                    logger.info("检测到广告弹窗，尝试关闭")
-                    ad_close.click()
-                    time.sleep(WAIT_TIME['short'])
+                self.steps.run('close_ad',
+                               lambda: self.click('home.ad_close', timeout=WAIT_TIME['short']),
+                               until=element_gone(SELECTORS['home']['ad_close']),
+                               timeout=WAIT_TIME['medium'])
+                logger.info("检测到广告弹窗，已关闭")
             except Exception as e:
                 logger.info("未检测到广告弹窗，继续执行")
             
             # 刷新
-            refresh_button = self.wait_for_element(SELECTORS['home']['refresh_button'])
-            refresh_button.click()
-            time.sleep(WAIT_TIME['medium'])
+            self.steps.run('refresh_order_count', lambda: self.click('home.refresh_button'),
+                           until=page_idle(), timeout=WAIT_TIME['medium'])
 
             # 查询待打单数量
-            order_count_element = self.wait_for_element(SELECTORS['home']['order_count'])
-            order_count = int(order_count_element.text)
+            order_count = int(self.read_text('home.order_count'))
+            tracer.current().set(order_count=order_count, source='page')
             logger.info(f"当前订单数量: {order_count}")
             
             return order_count
+        except SessionExpiredError:
+            raise
         except Exception as e:
             logger.error(f"查询待打单数量失败: {str(e)}")
             return 0
 
+    @traced('create_wave')
     def create_wave(self, wave_time):
         """生成波次"""
         try:
@@ -212,36 +282,39 @@ class WebAutomation:
             self.navigate_to(URLS['wave_picking'])
 
             # 点击生成波次
-            create_wave = self.wait_for_element(SELECTORS['wave']['create_wave'])
-            create_wave.click()
-            time.sleep(WAIT_TIME['short'])
+            self.steps.run('open_create_wave', lambda: self.click('wave.create_wave'),
+                           until=element_clickable(SELECTORS['wave']['create_wave_2']),
+                           timeout=WAIT_TIME['medium'])
 
             # 判断当前时间应该生成什么波次
             current_time = datetime.now().time()
             if time_config.WORK_START_TIME <= current_time < time_config.WORK_MIDDLE_TIME:
                 # 勾选整波
                 logger.info("勾选整波")
-                first_checkbox = self.wait_for_element(SELECTORS['wave']['first_checkbox'])
-                first_checkbox_2 = self.wait_for_element(SELECTORS['wave']['first_checkbox_2'])
-                first_checkbox.click()
-                first_checkbox_2.click()
+                items = [
+                    ('first_checkbox', 'wave.first_checkbox', 'click'),
+                    ('first_checkbox_2', 'wave.first_checkbox_2', 'click')
+                ]
             else:
                 # 勾选散单
                 logger.info("勾选散单")
-                second_checkbox = self.wait_for_element(SELECTORS['wave']['second_checkbox'])
-                second_checkbox.click()
+                items = [('second_checkbox', 'wave.second_checkbox', 'click')]
             
-            # 点击生成波次
+            # 勾选和点击生成波次在一次调用中完成
             logger.info("生成波次")
-            create_wave_2 = self.wait_for_element(SELECTORS['wave']['create_wave_2'])
-            create_wave_2.click()
-            time.sleep(WAIT_TIME['long'])
+            items.append(('create_wave_2', 'wave.create_wave_2', 'click'))
+            # 等待弹窗关闭且后台生成任务完成
+            self.steps.run('create_wave', self.tasks.watch(lambda: self.batch.run(items)),
+                           until=all_of(element_gone(SELECTORS['wave']['create_wave_2']),
+                                        self.tasks.finished()),
+                           timeout=WAIT_TIME['task_timeout'])
             
             logger.info("生成波次完成")
         except Exception as e:
             logger.error(f"生成波次失败: {str(e)}")
             raise
 
+    @traced('execute_wave_picking')
     def execute_wave_picking(self):
         """执行波次配货"""
         try:
@@ -249,35 +322,18 @@ class WebAutomation:
             self.navigate_to(URLS['wave_picking'])
             
             # 点击查询按钮
-            query_button = self.wait_for_element(SELECTORS['wave']['query_button'])
-            query_button.click()
-            time.sleep(WAIT_TIME['medium'])
+            self.steps.run('query_waves', lambda: self.click('wave.query_button'),
+                           until=page_idle(), timeout=WAIT_TIME['medium'])
 
             # 查询波次数量
-            wave_count_element = self.wait_for_element(SELECTORS['wave']['wave_count'])
-            wave_count = int(wave_count_element.text)
+            wave_count = int(self.read_text('wave.wave_count'))
+            tracer.current().set(wave_count=wave_count)
             logger.info(f"当前波次数量: {wave_count}")
 
-            # 依次处理波次
-            for i in range(wave_count):
-                logger.info(f"处理第{i+1}个波次")
-                # 打单配货
-                first_row = self.wait_for_element(SELECTORS['wave']['first_row'])
-                generate_express = self.wait_for_element(SELECTORS['wave']['generate_express'])
-                print_picking = self.wait_for_element(SELECTORS['wave']['print_picking'])
-                print_express = self.wait_for_element(SELECTORS['wave']['print_express'])
-                confirm_picking = self.wait_for_element(SELECTORS['wave']['confirm_picking'])
-
-                first_row.click()
-                generate_express.click()
-                time.sleep(WAIT_TIME['generate_express'])
-                print_picking.click()
-                time.sleep(WAIT_TIME['medium'])
-                print_express.click()
-                time.sleep(WAIT_TIME['medium'])
-                confirm_picking.click()
-                time.sleep(WAIT_TIME['medium'])
-                logger.info(f"第{i+1}个波次处理完成")
+            if WAVE_CONFIG['bulk']:
+                self.process_waves_bulk(wave_count)
+            else:
+                self.process_waves_one_by_one(wave_count)
 
         except Exception as e:
             error_msg = f"执行波次配货失败: {str(e)}"
@@ -287,8 +343,240 @@ class WebAutomation:
             email_sender.send_error_notification("执行波次配货失败", error_msg, stack_trace)
             raise
 
+    @traced('execute_order_picking')
+    def execute_order_picking(self):
+        """执行订单配货：全选待打单订单，取号打单、打配货单并确认配货，不生成波次
+
+        返回:
+            bool: 订单配货页面的订单数超过ORDER_THRESHOLDS['few']（查询首页后又有新订单）时
+                  不处理并返回False，由调用方改为生成波次；否则返回True
+        """
+        try:
+            logger.info("开始执行订单配货")
+            self.navigate_to(URLS['order_picking'])
+
+            # 点击查询按钮
+            self.steps.run('query_orders', lambda: self.click('order.query_button'),
+                           until=page_idle(), timeout=WAIT_TIME['medium'])
+
+            # 查询订单数量
+            order_count = int(self.read_text('order.order_count'))
+            tracer.current().set(order_count=order_count)
+            logger.info(f"当前待配货订单数量: {order_count}")
+            if order_count == 0:
+                logger.info("没有待配货订单")
+                return True
+            # 全选会处理列表中的全部订单，订单已增加时不能绕过波次
+            if order_count > ORDER_THRESHOLDS['few']:
+                logger.info(f"待配货订单已增加到{order_count}个，超过{ORDER_THRESHOLDS['few']}个，不直接取号打单")
+                return False
+
+            # 订单配货不写处理日志，中途停止后无法续做；订单不超过few个，三步任务都很短，完整处理完再响应停止
+            with cancel_token.shield("订单配货"):
+                self.process_orders()
+
+            self.steps.run('query_orders', lambda: self.click('order.query_button'),
+                           until=page_idle(), timeout=WAIT_TIME['medium'])
+            remaining = int(self.read_text('order.order_count'))
+            if remaining >= order_count:
+                raise RuntimeError(f"订单数量未减少（处理前{order_count}个，处理后{remaining}个）")
+            logger.info(f"{order_count - remaining}个订单配货完成")
+            return True
+
+        except Exception as e:
+            error_msg = f"执行订单配货失败: {str(e)}"
+            stack_trace = traceback.format_exc()
+            logger.error(error_msg)
+            # 发送邮件通知
+            email_sender.send_error_notification("执行订单配货失败", error_msg, stack_trace)
+            raise
+
+    def process_orders(self):
+        """对列表中的全部订单取号打单、打配货单并确认配货"""
+        # 一次调用确认用到的按钮都已就绪，并全选订单、取号打单
+        self.steps.run('order_get_express', self.tasks.watch(lambda: self.batch.run([
+            ('print_picking', 'order.print_picking', 'none'),
+            ('confirm_picking', 'order.confirm_picking', 'none'),
+            ('checkbox_all', 'order.checkbox_all', 'click'),
+            ('get_express', 'order.get_express', 'click')
+        ])), until=self.tasks.finished(quiet=1), timeout=WAIT_TIME['task_timeout'])
+        for name in ('print_picking', 'confirm_picking'):
+            self.steps.run(f'order_{name}', self.tasks.watch(lambda name=name: self.click(f'order.{name}')),
+                           until=self.tasks.finished(), timeout=WAIT_TIME['task_timeout'])
+
+    def wave_ids(self):
+        """返回波次列表中各行的波次ID（按列表顺序）"""
+        return self.batch.row_ids(SELECTORS['wave']['wave_rows'], SELECTORS['wave']['row_checkbox'])
+
+    def wave_progress(self, wave_ids):
+        """从波次处理日志读取各波次上次完成的步骤，只返回需要继续处理的波次
+
+        返回:
+            dict: 波次ID -> 已完成的最后一步
+        """
+        progress = {}
+        for wave_id, step in wave_journal.progress(self.profile.name, wave_ids).items():
+            if step == 'selected':
+                continue
+            if step == 'confirmed':
+                # 已确认配货但仍在列表中，说明确认未生效，只需重新确认
+                logger.warning(f"波次{wave_id}已确认配货但仍在列表中，重新确认配货")
+                step = 'express_printed'
+            progress[wave_id] = step
+        return progress
+
+    def record_waves(self, wave_ids, step):
+        """把波次已完成的步骤写入波次处理日志"""
+        wave_journal.record(self.profile.name, wave_ids, step)
+
+    def run_wave_step(self, wave_ids, step, name, action, until, timeout, units=1):
+        """执行一步波次处理，完成后写入波次处理日志
+
+        ERP后台任务开始后不能中途停止，任务和处理日志放在同一个保护区内；
+        步骤之间可以停止，下次运行从处理日志中的下一步继续。
+        """
+        with cancel_token.shield(f"{STEP_NAMES[step]}（{len(wave_ids)}个波次）"):
+            self.steps.run(name, action, until=until, timeout=timeout, units=units)
+            self.record_waves(wave_ids, step)
+
+    def process_waves_bulk(self, wave_count):
+        """多选波次，一次性生成快递单、打印和确认配货，完成后检查每个波次的状态"""
+        # 先继续处理上次中断的波次
+        if self.resume_waves_bulk():
+            wave_count = int(self.read_text('wave.wave_count'))
+
+        batch_no = 0
+        while wave_count > 0:
+            cancel_token.check()
+            batch_no += 1
+            selected = self.batch.select_rows(SELECTORS['wave']['wave_rows'],
+                                              SELECTORS['wave']['row_checkbox'],
+                                              WAVE_CONFIG['batch_size'])
+            if not selected:
+                raise RuntimeError("波次列表中没有可勾选的波次")
+            logger.info(f"第{batch_no}批: 勾选{len(selected)}个波次")
+            self.record_waves(selected, 'selected')
+            with tracer.span('wave_batch', batch=batch_no, waves=len(selected)):
+                self.process_selected_waves(selected)
+            logger.info(f"第{batch_no}批{len(selected)}个波次处理完成")
+
+            remaining = int(self.read_text('wave.wave_count'))
+            if remaining >= wave_count:
+                raise RuntimeError(f"波次数量未减少（处理前{wave_count}个，处理后{remaining}个）")
+            wave_count = remaining
+
+    def resume_waves_bulk(self):
+        """继续处理上次中断的波次，进度相同的波次一起勾选处理
+
+        返回:
+            bool: 是否处理了中断的波次
+        """
+        progress = self.wave_progress(self.wave_ids())
+        if not progress:
+            return False
+        groups = {}
+        for wave_id, step in progress.items():
+            groups.setdefault(step, []).append(wave_id)
+        for step, wave_ids in groups.items():
+            cancel_token.check()
+            logger.info(f"继续处理上次中断的{len(wave_ids)}个波次（{STEP_NAMES[step]}）")
+            selected = self.batch.select_rows(SELECTORS['wave']['wave_rows'],
+                                              SELECTORS['wave']['row_checkbox'], ids=wave_ids)
+            if not selected:
+                continue
+            with tracer.span('wave_resume', waves=len(selected), step=step):
+                self.process_selected_waves(selected, step)
+        return True
+
+    def process_selected_waves(self, selected, done=None):
+        """对已勾选的波次批量生成快递单、打印、确认配货，并检查状态
+
+        参数:
+            done: 这些波次上次已完成的最后一步，已完成的步骤不再执行
+        """
+        # 批量任务耗时随波次数增长，按每个波次记录耗时和计算超时
+        units = len(selected)
+        if not completed(done, 'express_generated'):
+            self.run_wave_step(selected, 'express_generated', 'generate_express_bulk',
+                               self.tasks.watch(lambda: self.batch.run([
+                                   ('print_picking', 'wave.print_picking', 'none'),
+                                   ('print_express', 'wave.print_express', 'none'),
+                                   ('confirm_picking', 'wave.confirm_picking', 'none'),
+                                   ('generate_express', 'wave.generate_express', 'click')
+                               ])), until=self.tasks.finished(quiet=1),
+                               timeout=WAIT_TIME['task_timeout'], units=units)
+        for step, name in WAVE_STEPS:
+            if completed(done, step):
+                continue
+            self.run_wave_step(selected, step, f'{name}_bulk',
+                               self.tasks.watch(lambda name=name: self.click(f'wave.{name}')),
+                               until=self.tasks.finished(), timeout=WAIT_TIME['task_timeout'], units=units)
+
+        # 刷新列表，确认所选波次都已离开待处理列表
+        self.steps.run('query_waves', lambda: self.click('wave.query_button'),
+                       until=page_idle(), timeout=WAIT_TIME['medium'])
+        pending = set(self.wave_ids())
+        if None in selected:
+            logger.warning("波次行没有rowid，无法逐个检查波次状态")
+        else:
+            unchanged = [wave_id for wave_id in selected if wave_id in pending]
+            if unchanged:
+                raise RuntimeError(f"{len(unchanged)}个波次确认配货后状态未变更: {', '.join(unchanged)}")
+
+    def process_waves_one_by_one(self, wave_count):
+        """逐个处理波次"""
+        for i in range(wave_count):
+            cancel_token.check()
+            with tracer.span('wave', wave_index=i + 1):
+                self.process_first_wave(i)
+
+    def process_first_wave(self, i):
+        """处理列表中的第一个波次（i为本次运行中的序号，从0开始）
+
+        波次上次处理中断时，从已完成的步骤之后继续。
+        """
+        logger.info(f"处理第{i+1}个波次")
+        wave_ids = self.wave_ids()[:1]
+        done = self.wave_progress(wave_ids).get(wave_ids[0]) if wave_ids else None
+        if done:
+            logger.info(f"波次{wave_ids[0]}上次处理中断（{STEP_NAMES[done]}），从下一步继续")
+        else:
+            self.record_waves(wave_ids, 'selected')
+
+        # 一次调用确认本波次用到的按钮都已就绪，并勾选第一行、生成快递单
+        items = [
+            ('print_picking', 'wave.print_picking', 'none'),
+            ('print_express', 'wave.print_express', 'none'),
+            ('confirm_picking', 'wave.confirm_picking', 'none'),
+            ('first_row', 'wave.first_row', 'click')
+        ]
+        if completed(done, 'express_generated'):
+            self.steps.run('select_wave', lambda: self.batch.run(items),
+                           until=page_idle(), timeout=WAIT_TIME['long'])
+        else:
+            items.append(('generate_express', 'wave.generate_express', 'click'))
+            self.run_wave_step(wave_ids, 'express_generated', 'generate_express',
+                               self.tasks.watch(lambda: self.batch.run(items)),
+                               until=self.tasks.finished(quiet=1), timeout=WAIT_TIME['task_timeout'])
+        for step, name in WAVE_STEPS:
+            if completed(done, step):
+                continue
+            self.run_wave_step(wave_ids, step, name,
+                               self.tasks.watch(lambda name=name: self.click(f'wave.{name}')),
+                               until=self.tasks.finished(), timeout=WAIT_TIME['long'])
+        logger.info(f"第{i+1}个波次处理完成")
+
     def close(self):
         """关闭浏览器"""
+        self.order_probe.close()
         if self.driver:
-            self.driver.quit()
+            # 关闭前保存最新的Cookie，供下次启动恢复登录
+            # （未登录的浏览器如备用浏览器不保存，避免覆盖同账号共用的Cookie）
+            if self.logged_in and self.is_alive() and URLS['login'] not in self.driver.current_url:
+                self.profile.save_cookies(self.driver)
+            try:
+                self.driver.quit()
+            except Exception as e:
+                logger.warning(f"关闭浏览器异常: {str(e)}")
+            self.driver = None
             logger.info("浏览器已关闭")